@@ -0,0 +1,195 @@
+"""
+asyncio 版抖音弹幕接收器
+签名、加入房间、心跳、ACK、解码和 handle_* 钩子都沿用 DouyinDanmaku，只把网络 I/O 换成 asyncio：
+每个直播间是事件循环上的一个任务，不再占用接收线程和心跳线程，一个进程可以同时接收数百个直播间
+"""
+import asyncio
+import ssl
+import threading
+
+try:
+    import websockets
+except ImportError:  # 只有使用 asyncio 版接收器时才需要
+    websockets = None
+
+from douyin_danmaku import DouyinDanmaku, USER_AGENT, ORIGIN, HEARTBEAT_INTERVAL
+
+# 与 DouyinDanmaku 一致，不校验推送服务器证书
+_SSL_CONTEXT = ssl.create_default_context()
+_SSL_CONTEXT.check_hostname = False
+_SSL_CONTEXT.verify_mode = ssl.CERT_NONE
+
+
+class AsyncDouyinDanmaku(DouyinDanmaku):
+    """抖音弹幕接收器（asyncio 版）"""
+
+    pipeline_can_block = False
+
+    def __init__(self, room_id, cookie=None, unique_id=None, pipeline=None, subscriptions=None):
+        super().__init__(room_id, cookie, unique_id, pipeline, subscriptions)
+        self._outbox = []  # 待发送的帧，由接收循环统一发送
+        self._loop = None
+        self._task = None
+        self._flush_task = None
+
+    def send_bytes(self, data):
+        """放入待发送列表（handle_* 钩子和 ACK 在同步代码中调用，不能直接 await）"""
+        self._outbox.append(data)
+
+    async def _flush(self):
+        """发送待发送列表中的帧"""
+        outbox, self._outbox = self._outbox, []
+        for data in outbox:
+            await self.ws.send(data)
+
+    def on_decoded(self, log_id, result):
+        """解码进程池在结果线程中交回结果，转到事件循环中处理"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._on_decoded_in_loop, log_id, result)
+
+    def _on_decoded_in_loop(self, log_id, result):
+        super().on_decoded(log_id, result)
+        if self._outbox and self.ws is not None:
+            self._flush_task = self._loop.create_task(self._flush_quietly())
+
+    async def _flush_quietly(self):
+        try:
+            await self._flush()
+        except websockets.ConnectionClosed:
+            pass
+
+    def start_heartbeat(self):
+        """启动心跳任务（协程，不占用线程）"""
+        self.heartbeat_timer = asyncio.get_running_loop().create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        while self.running:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            self.heartbeat()
+            try:
+                await self._flush()
+            except websockets.ConnectionClosed:
+                break
+
+    async def connect_async(self):
+        """建立连接并接收消息，断线后按重连策略自动重连，直到被 close() 取消或连续失败超过次数上限"""
+        if websockets is None:
+            raise RuntimeError("asyncio 版接收器需要 websockets 库: pip install websockets")
+
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+
+        attempt = 0
+        while not self.closed.is_set():
+            await self.connect_once_async()
+            if self.closed.is_set():
+                break
+            delay, attempt = self.next_reconnect(attempt)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+
+    async def connect_once_async(self):
+        """建立一次连接，断开时返回"""
+        self.ws = None
+        self.opened_at = None
+        self.last_error = None
+
+        # 签名可能需要调用 JS，放到线程池中执行，避免阻塞其他直播间
+        url = await self._loop.run_in_executor(None, self.sign_url)
+        if url is None:
+            return
+        print(f"🔗 正在连接: {self.room_id}")
+
+        try:
+            async with websockets.connect(
+                url,
+                extra_headers={"Cookie": self.cookie},
+                origin=ORIGIN,
+                user_agent_header=USER_AGENT,
+                ssl=_SSL_CONTEXT if url.startswith("wss://") else None,
+                compression=None,
+                ping_interval=None,  # 使用抖音自己的 hb 帧
+                max_size=None,
+            ) as ws:
+                self.ws = ws
+                self.on_open(ws)
+                await self._flush()
+
+                async for message in ws:
+                    if isinstance(message, bytes):
+                        self.on_message(ws, message)
+                        if self._outbox:
+                            await self._flush()
+        except websockets.WebSocketException as e:
+            self.on_error(self.ws, e)
+        except OSError as e:
+            self.on_error(self.ws, e)
+        finally:
+            close_code = getattr(self.ws, 'close_code', None)
+            close_msg = getattr(self.ws, 'close_reason', None)
+            self.on_close(self.ws, close_code, close_msg)
+
+    def connect(self):
+        """建立连接（阻塞，单独使用时与 DouyinDanmaku.connect 相同）"""
+        asyncio.run(self.connect_async())
+
+    def close(self):
+        """关闭连接，不再重连（可以在任意线程调用）"""
+        self.closed.set()
+        self.running = False
+        if self.message_queue is not None:
+            self.message_queue.close()
+        self.flush_pending()
+        if self._task and self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+
+class AsyncRoomHost:
+    """在一个后台线程中运行事件循环，承载所有 AsyncDouyinDanmaku"""
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._futures = set()
+
+    def start(self):
+        """启动事件循环线程（已启动时不做任何事）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+            self._thread.start()
+
+    def submit(self, receiver):
+        """在事件循环上启动接收器，返回 concurrent.futures.Future（连接结束时完成）"""
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(receiver.connect_async(), self._loop)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def stats(self):
+        with self._lock:
+            return {'rooms': len(self._futures)}
+
+
+_host = None
+_host_lock = threading.Lock()
+
+
+def get_room_host():
+    """获取进程内共享的事件循环宿主"""
+    global _host
+    if _host is None:
+        with _host_lock:
+            if _host is None:
+                _host = AsyncRoomHost()
+    return _host
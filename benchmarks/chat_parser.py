@@ -0,0 +1,121 @@
+"""
+聊天消息解析基准：chat_parser 快速解析 与 douyin_pb2 完整解析，分别在 protobuf 的
+C 实现（upb）和纯 Python 实现下测量
+
+消息按线上聊天的结构构造：Common、带三种尺寸头像 / 徽章 / 关注信息的 User、rtfContent 等，
+另有只含内容和昵称的精简消息作对比。每种 protobuf 实现在独立子进程中测量。
+
+用法（在仓库根目录）:
+  python -m benchmarks.chat_parser [--count 20000] [--json 结果.json]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+
+from benchmarks.common import run_timed, summarize, print_header, print_row, write_json
+
+BACKENDS = ('upb', 'python')
+
+
+def build_image(rng, urls=3):
+    from douyin_pb2 import Image
+
+    key = f"tos-cn-avt-0015_{rng.getrandbits(64):x}"
+    image = Image(uri=f"aweme-avatar/{key}", height=100, width=100, avgColor="#A3B2C1")
+    for i in range(urls):
+        image.urlListList.append(f"https://p{i}.douyinpic.com/aweme/100x100/aweme-avatar/{key}.jpeg?from=3067671334")
+    return image
+
+
+def build_chat(rng, full=True):
+    """构造一条聊天消息，full=False 时只有内容、昵称和 ID"""
+    from douyin_pb2 import ChatMessage
+
+    user_id = rng.randrange(10 ** 15, 10 ** 16)
+    chat = ChatMessage(content=rng.choice(["主播好", "这波操作可以", "哈哈哈哈哈", "666"]), eventTime=1700000000)
+    chat.common.msgId = rng.randrange(10 ** 18)
+    chat.user.id = user_id
+    chat.user.nickName = f"观众{user_id % 100000}"
+    if full:
+        chat.common.method = "WebcastChatMessage"
+        chat.common.roomId = 7376429659866598196
+        chat.common.createTime = 1700000000000
+        chat.common.describe = f"{chat.user.nickName}:{chat.content}"
+        user = chat.user
+        user.shortId = rng.randrange(10 ** 10)
+        user.gender = 1
+        user.Level = rng.randint(1, 50)
+        user.AvatarThumb.CopyFrom(build_image(rng))
+        user.AvatarMedium.CopyFrom(build_image(rng))
+        user.AvatarLarge.CopyFrom(build_image(rng))
+        for _ in range(3):
+            user.BadgeImageList.add().CopyFrom(build_image(rng, 2))
+        user.FollowInfo.followerCount = rng.randrange(10 ** 5)
+        user.FollowInfo.followerCountStr = "1.2万"
+        user.secUid = "MS4wLjABAAAA" + "x" * 60
+        user.displayId = f"dy_{user_id % 100000}"
+        user.idStr = str(user_id)
+        chat.publicAreaCommon.userLabel.CopyFrom(build_image(rng, 2))
+        chat.rtfContent.defaultPatter = "{0:user} {1:string}"
+    return chat.SerializeToString()
+
+
+def worker(count):
+    """在当前 protobuf 实现下测量，输出一行 JSON"""
+    from google.protobuf.internal import api_implementation
+    from chat_parser import parse_chat_fast, parse_chat_full
+
+    rng = random.Random(1)
+    results = {'backend': api_implementation.Type()}
+    for kind, full in (('完整消息', True), ('精简消息', False)):
+        payloads = [build_chat(rng, full) for _ in range(200)]
+        assert all(parse_chat_fast(p) == parse_chat_full(p) for p in payloads)
+        results[f'{kind} 平均字节'] = sum(map(len, payloads)) // len(payloads)
+        for name, func in (('快速解析', parse_chat_fast), ('完整解析', parse_chat_full)):
+            it = iter(payloads * (count // len(payloads) + 2))
+            results[f'{kind} [{name}]'] = summarize(*run_timed(lambda: func(next(it)), count, warmup=len(payloads)))
+    print(json.dumps(results, ensure_ascii=False))
+
+
+def run_worker(backend, count):
+    env = dict(os.environ, PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION=backend)
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.chat_parser', '--worker', '--count', str(count)],
+                            capture_output=True, text=True, env=env, timeout=600)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr else 'worker failed')
+    lines = [line for line in output.stdout.splitlines() if line.startswith('{')]
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="聊天消息解析基准")
+    parser.add_argument('--count', type=int, default=20000, help="每项解析次数")
+    parser.add_argument('--json', help="结果保存路径")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.count)
+        return
+
+    results = {}
+    print_header()
+    for backend in BACKENDS:
+        r = run_worker(backend, args.count)
+        results[backend] = r
+        for kind in ('完整消息', '精简消息'):
+            full = r[f'{kind} [完整解析]']
+            for name in ('完整解析', '快速解析'):
+                result = r[f'{kind} [{name}]']
+                print_row(f"{r['backend']} {kind} {r[f'{kind} 平均字节']}B [{name}]", result,
+                          f"{result['ops_per_sec'] / full['ops_per_sec']:.2f}x")
+
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
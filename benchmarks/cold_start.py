@@ -0,0 +1,102 @@
+"""
+冷启动基准：从零开始到拿到第一个签名的耗时
+
+对比:
+  execjs            旧实现（每次 execjs.compile + call，每次调用都重新解析 SDK）
+  pool/raw          常驻 Node 签名池，加载原始 douyin_sdk.js
+  pool/artifact     常驻 Node 签名池，加载精简产物，V8 代码缓存尚未生成
+  pool/artifact+v8  常驻 Node 签名池，加载精简产物 + V8 代码缓存
+
+用法（在仓库根目录）:
+  python -m benchmarks.cold_start [重复次数]
+"""
+import os
+import statistics
+import sys
+import time
+
+import execjs
+
+from douyin_sign import DEFAULT_USER_AGENT, get_ms_stub
+from sdk_artifact import SDK_PATH, build_artifact
+from signer_pool import SignerPool
+
+MS_STUB = get_ms_stub("7376429659866598196", "123456789012")
+
+# 首个签名之后再签几次，对比稳态下每次签名的耗时
+FOLLOW_UP_CALLS = 10
+
+
+def first_signature_execjs():
+    """旧实现：每次签名都读文件 + compile + call"""
+    def run_once():
+        with open(SDK_PATH, 'r', encoding='utf-8') as f:
+            ctx = execjs.compile(f.read())
+        ctx.call("getMSSDKSignature", MS_STUB, DEFAULT_USER_AGENT)
+
+    start = time.perf_counter()
+    run_once()
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(FOLLOW_UP_CALLS):
+        run_once()
+    return first, (time.perf_counter() - start) / FOLLOW_UP_CALLS
+
+
+def first_signature_pool(use_artifact):
+    """新建签名池并签第一个名"""
+    start = time.perf_counter()
+    pool = SignerPool(size=1, use_artifact=use_artifact)
+    pool.call("getMSSDKSignatureBatch", [MS_STUB], DEFAULT_USER_AGENT)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(FOLLOW_UP_CALLS):
+        pool.call("getMSSDKSignatureBatch", [MS_STUB], DEFAULT_USER_AGENT)
+    follow_up = (time.perf_counter() - start) / FOLLOW_UP_CALLS
+    pool.close()
+    return first, follow_up
+
+
+def drop_code_cache():
+    """删除 V8 代码缓存，模拟首次运行"""
+    _, code_cache_path = build_artifact()
+    if os.path.exists(code_cache_path):
+        os.remove(code_cache_path)
+
+
+def measure(name, func, repeat, before=None):
+    firsts, follow_ups = [], []
+    for _ in range(repeat):
+        if before:
+            before()
+        first, follow_up = func()
+        firsts.append(first)
+        follow_ups.append(follow_up)
+    first = statistics.median(firsts)
+    print(f"{name:<20} 首个签名 {first * 1000:8.1f} ms   "
+          f"之后每次 {statistics.median(follow_ups) * 1000:8.1f} ms")
+    return first
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    build_artifact()
+
+    print(f"⏱️  首个签名耗时（中位数，重复 {repeat} 次）")
+    print("-" * 60)
+    baseline = measure("execjs", first_signature_execjs, repeat)
+    results = {
+        'pool/raw': measure("pool/raw", lambda: first_signature_pool(False), repeat),
+        'pool/artifact': measure("pool/artifact", lambda: first_signature_pool(True), repeat, drop_code_cache),
+    }
+    # 上一轮最后一次已经生成了代码缓存
+    results['pool/artifact+v8'] = measure("pool/artifact+v8", lambda: first_signature_pool(True), repeat)
+    print("-" * 60)
+    for name, value in results.items():
+        print(f"{name:<20} 首个签名相对 execjs: {baseline / value:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+基准测试公共工具：计时、分位数、结果输出
+"""
+import json
+import time
+
+
+def percentile(samples, q):
+    """线性插值分位数，q 取 0~100"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def run_timed(func, iterations, warmup=0):
+    """执行 func 若干次，返回 (每次耗时列表, 总耗时)，单位秒"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed, **extra):
+    """汇总为 p50/p95/p99（毫秒）和吞吐量（次/秒）"""
+    result = {
+        'count': len(samples),
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'ops_per_sec': len(samples) / elapsed if elapsed else 0.0,
+    }
+    result.update(extra)
+    return result
+
+
+def print_header():
+    print(f"{'项目':<36}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'次/秒':>12}  备注")
+    print("-" * 96)
+
+
+def print_row(name, result, note=''):
+    print(f"{name:<36}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+          f"{result['p99_ms']:>10.3f}{result['ops_per_sec']:>12.1f}  {note}")
+
+
+def write_json(path, results):
+    """保存结果，方便 SDK 更新后对比回归"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"💾 结果已保存到 {path}")
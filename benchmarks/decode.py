@@ -0,0 +1,154 @@
+"""
+多进程解码吞吐基准：读取线程内解码 与 decode_pool.DecodePool（1..N 个进程）对比
+
+默认使用合成的推送帧（每帧聊天、点赞、进场、礼物消息混合），也可以用 --frames 读取
+录制的帧文件（每帧前 4 字节大端长度 + PushFrame 原始字节）。
+
+用法（在仓库根目录）:
+  python -m benchmarks.decode [--frames 帧文件] [--count 2000] [--workers 4] [--batch 64] [--json 结果.json]
+"""
+import argparse
+import gzip
+import os
+import random
+import struct
+import threading
+import time
+
+from benchmarks.common import write_json
+from decode_pool import DecodePool, decode_payload
+from douyin_pb2 import PushFrame, Response, ChatMessage, LikeMessage, MemberMessage, GiftMessage
+
+# 每帧的消息组成（方法, 数量），接近热门直播间的比例
+FRAME_MIX = (
+    ("WebcastChatMessage", 8),
+    ("WebcastLikeMessage", 12),
+    ("WebcastMemberMessage", 6),
+    ("WebcastGiftMessage", 2),
+)
+
+WORDS = ["主播好", "666", "来了来了", "这波操作可以", "哈哈哈哈", "求带", "好听", "支持一下", "关注了"]
+
+
+def build_message(method, rng):
+    user_id = rng.randrange(10 ** 15, 10 ** 16)
+    if method == "WebcastChatMessage":
+        msg = ChatMessage(content="".join(rng.choices(WORDS, k=rng.randint(1, 4))), eventTime=int(time.time()))
+    elif method == "WebcastLikeMessage":
+        msg = LikeMessage(count=rng.randint(1, 15), total=rng.randrange(10 ** 6))
+    elif method == "WebcastMemberMessage":
+        msg = MemberMessage(memberCount=rng.randrange(10 ** 5))
+    else:
+        msg = GiftMessage(giftId=rng.randrange(1000), repeatCount=rng.randint(1, 10), comboCount=1)
+    msg.common.msgId = rng.randrange(10 ** 18)
+    msg.user.id = user_id
+    msg.user.nickName = f"观众{user_id % 100000}"
+    return msg.SerializeToString()
+
+
+def synthetic_frames(count, seed=1, mix=FRAME_MIX):
+    """生成 count 个推送帧，mix 为每帧的 (方法, 数量)"""
+    rng = random.Random(seed)
+    frames = []
+    for i in range(count):
+        response = Response(cursor=f"t-{i}", internalExt=f"internal_src:dim|seq:{i}", needAck=True)
+        for method, n in mix:
+            for _ in range(n):
+                message = response.messagesList.add()
+                message.method = method
+                message.payload = build_message(method, rng)
+                message.msgId = rng.randrange(10 ** 18)
+        frame = PushFrame(logId=i, payloadType="msg", payload=gzip.compress(response.SerializeToString()))
+        frames.append(frame.SerializeToString())
+    return frames
+
+
+def load_frames(path):
+    """读取录制的帧文件"""
+    frames = []
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                break
+            frames.append(f.read(struct.unpack('>I', header)[0]))
+    return frames
+
+
+def bench_inline(frames):
+    """读取线程内解码（当前默认路径）"""
+    events = 0
+    start = time.perf_counter()
+    for data in frames:
+        frame = PushFrame()
+        frame.ParseFromString(data)
+        events += len(decode_payload(frame.payload).events)
+    elapsed = time.perf_counter() - start
+    return {'frames_per_sec': len(frames) / elapsed, 'events_per_sec': events / elapsed, 'seconds': elapsed}
+
+
+def bench_pool(frames, workers, batch_size):
+    """DecodePool：提交全部帧并等待全部结果交回"""
+    pool = DecodePool(workers=workers, batch_size=batch_size)
+    try:
+        # 预热：启动子进程并完成 import
+        warm = threading.Event()
+        pool.submit(PushFrame.FromString(frames[0]).payload, lambda result: warm.set())
+        warm.wait(60)
+
+        done = threading.Event()
+        counts = {'frames': 0, 'events': 0}
+        lock = threading.Lock()
+
+        def callback(result):
+            with lock:
+                counts['frames'] += 1
+                counts['events'] += len(result.events)
+                if counts['frames'] == len(frames):
+                    done.set()
+
+        start = time.perf_counter()
+        for data in frames:
+            frame = PushFrame()
+            frame.ParseFromString(data)
+            pool.submit(frame.payload, callback)
+        done.wait(300)
+        elapsed = time.perf_counter() - start
+        stats = pool.stats()
+    finally:
+        pool.close()
+
+    return {'frames_per_sec': counts['frames'] / elapsed, 'events_per_sec': counts['events'] / elapsed,
+            'seconds': elapsed, 'avg_batch': stats['avg_batch']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程解码吞吐基准")
+    parser.add_argument('--frames', help="录制的帧文件（默认使用合成帧）")
+    parser.add_argument('--count', type=int, default=2000, help="合成帧数量")
+    parser.add_argument('--workers', type=int, default=max(2, os.cpu_count() or 1), help="最多测到几个解码进程")
+    parser.add_argument('--batch', type=int, default=64, help="每批帧数")
+    parser.add_argument('--json', help="结果保存路径")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames) if args.frames else synthetic_frames(args.count)
+    size = sum(len(f) for f in frames) / len(frames)
+    print(f"📦 {len(frames)} 帧，平均 {size:.0f} 字节，本机 {os.cpu_count()} 核")
+
+    results = {'inline': bench_inline(frames)}
+    for workers in range(1, args.workers + 1):
+        results[f'pool x{workers}'] = bench_pool(frames, workers, args.batch)
+
+    baseline = results['inline']['frames_per_sec']
+    print(f"{'方式':<14}{'帧/秒':>12}{'消息/秒':>14}{'相对读取线程内':>16}{'平均批大小':>12}")
+    print("-" * 68)
+    for name, r in results.items():
+        print(f"{name:<14}{r['frames_per_sec']:>12.0f}{r['events_per_sec']:>14.0f}"
+              f"{r['frames_per_sec'] / baseline:>15.2f}x{r.get('avg_batch', 0):>12.1f}")
+
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+消息分发基准：订阅全部消息类型 与 只订阅聊天 的每帧 CPU 耗时对比
+
+使用点赞为主的合成帧（热门直播间的典型情况），每帧走完整的 decode_message
+（解压、解析 Response、按分发表处理消息），不访问网络。
+
+用法（在仓库根目录）:
+  python -m benchmarks.dispatch [--count 2000] [--json 结果.json]
+"""
+import argparse
+import contextlib
+import io
+
+from benchmarks.common import run_timed, summarize, print_header, print_row, write_json
+from benchmarks.decode import synthetic_frames
+from douyin_danmaku import DouyinDanmaku
+
+# 点赞为主的直播间
+LIKE_HEAVY_MIX = (
+    ("WebcastLikeMessage", 30),
+    ("WebcastMemberMessage", 8),
+    ("WebcastChatMessage", 3),
+    ("WebcastGiftMessage", 1),
+)
+
+CASES = {
+    '全部订阅': None,
+    '只订阅聊天': ('chat',),
+    '聊天 + 礼物': ('chat', 'gift'),
+}
+
+
+class BenchReceiver(DouyinDanmaku):
+    """不发送 ACK 的接收器"""
+
+    def send_ack(self, log_id, internal_ext):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="消息分发基准")
+    parser.add_argument('--count', type=int, default=2000, help="帧数")
+    parser.add_argument('--json', help="结果保存路径")
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.count, mix=LIKE_HEAVY_MIX)
+    results = {}
+    for name, subscriptions in CASES.items():
+        receiver = BenchReceiver("7376429659866598196", unique_id="000000000000", subscriptions=subscriptions)
+        it = iter(frames * 2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = summarize(*run_timed(lambda: receiver.decode_message(next(it)), len(frames),
+                                                 warmup=len(frames) // 10))
+        results[name]['method_counts'] = receiver.method_counts
+
+    print_header()
+    baseline = results['全部订阅']['ops_per_sec']
+    for name, result in results.items():
+        print_row(f"每帧 decode_message [{name}]", result, f"{result['ops_per_sec'] / baseline:.2f}x")
+
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+弹幕事件内存基准：每条弹幕一个 7 键字典（原来的做法）与 DanmakuEvent + 共享 RoomDescriptor 对比
+
+测量缓冲区中每条弹幕常驻的内存和内存块数（tracemalloc，不含消息内容和用户名本身，两种方式相同），
+以及 emit_chat 中构建事件、写入全局和房间缓冲区、转成推送格式的耗时。
+
+用法（在仓库根目录）:
+  python -m benchmarks.events [--count 20000] [--json 结果.json]
+"""
+import argparse
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+from benchmarks.common import run_timed, summarize, print_header, print_row, write_json
+from danmaku_event import DanmakuEvent, get_room_descriptor
+from web_server_multi import BEIJING_TZ
+
+ROOM = ("7376429659866598196", "4253196531", "王者荣耀巅峰赛", "某主播")
+
+
+def old_event(message, username, room_id, web_rid, title, owner):
+    timestamp = datetime.now(BEIJING_TZ).strftime('%H:%M:%S')
+    return {
+        'message': message,
+        'username': username,
+        'timestamp': timestamp,
+        'room_id': room_id,
+        'web_rid': web_rid,
+        'room_title': title,
+        'room_owner': owner
+    }
+
+
+def new_event(message, username, room):
+    return DanmakuEvent(message, username, time.time(), room)
+
+
+def retained(build, count):
+    """把 count 条弹幕写入缓冲区，返回每条弹幕常驻的 (字节, 内存块数)"""
+    buffer = deque(maxlen=count)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(count):
+        buffer.append(build(i))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    # 扣除 deque 自身的块（两种方式相同）
+    return (size - deque_overhead(count)) / count, blocks / count, buffer
+
+
+def deque_overhead(count):
+    buffer = deque(maxlen=count)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(count):
+        buffer.append(None)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="弹幕事件内存基准")
+    parser.add_argument('--count', type=int, default=20000, help="缓冲区弹幕数")
+    parser.add_argument('--json', help="结果保存路径")
+    args = parser.parse_args()
+
+    messages = [f"王者荣耀【{i}】今天{i % 1000}块" for i in range(args.count)]
+    usernames = [f"观众{i}" for i in range(args.count)]
+    room = get_room_descriptor(*ROOM)
+
+    old_bytes, old_blocks, _ = retained(lambda i: old_event(messages[i], usernames[i], *ROOM), args.count)
+    new_bytes, new_blocks, _ = retained(lambda i: new_event(messages[i], usernames[i], room), args.count)
+
+    print(f"{'方式':<28}{'字节/条':>10}{'内存块/条':>12}")
+    print("-" * 50)
+    print(f"{'7 键字典':<28}{old_bytes:>10.1f}{old_blocks:>12.2f}")
+    print(f"{'DanmakuEvent':<28}{new_bytes:>10.1f}{new_blocks:>12.2f}")
+    print(f"缓冲区常驻内存减少 {1 - new_bytes / old_bytes:.0%}（全局 200 条 + 每个直播间 100 条）\n")
+
+    global_buffer = deque(maxlen=200)
+    room_buffer = deque(maxlen=100)
+    it = iter(range(10 ** 9))
+
+    def emit_old():
+        i = next(it) % args.count
+        data = old_event(messages[i], usernames[i], *ROOM)
+        global_buffer.append(data)
+        room_buffer.append(data)
+        return data
+
+    def emit_new():
+        i = next(it) % args.count
+        event = new_event(messages[i], usernames[i], room)
+        global_buffer.append(event)
+        room_buffer.append(event)
+        return event.to_dict(BEIJING_TZ)
+
+    results = {
+        'retained': {'dict': {'bytes': old_bytes, 'blocks': old_blocks},
+                     'event': {'bytes': new_bytes, 'blocks': new_blocks}},
+        'emit_dict': summarize(*run_timed(emit_old, args.count, warmup=1000)),
+        'emit_event': summarize(*run_timed(emit_new, args.count, warmup=1000)),
+        'history_event': summarize(*run_timed(
+            lambda: [event.to_dict(BEIJING_TZ) for event in list(global_buffer)[-20:]], 1000, warmup=100)),
+    }
+    print_header()
+    print_row("emit（7 键字典）", results['emit_dict'])
+    print_row("emit（DanmakuEvent + 推送时转换）", results['emit_event'],
+              f"{results['emit_event']['ops_per_sec'] / results['emit_dict']['ops_per_sec']:.2f}x")
+    print_row("history 20 条转换", results['history_event'])
+
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
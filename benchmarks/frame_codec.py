@@ -0,0 +1,87 @@
+"""
+帧编解码微基准：原来的解码 / ACK 构造路径 与 frame_codec 对比
+
+分别测量整帧解码（PushFrame + 解压 + Response）、只解压、构造 ack 帧三项，
+使用 benchmarks.decode 的合成帧，也可以用 --frames 读取录制的帧文件。
+
+用法（在仓库根目录）:
+  python -m benchmarks.frame_codec [--frames 帧文件] [--count 2000] [--json 结果.json]
+"""
+import argparse
+import gzip
+import itertools
+
+from benchmarks.common import run_timed, summarize, print_header, print_row, write_json
+from benchmarks.decode import synthetic_frames, load_frames
+from douyin_pb2 import PushFrame, Response
+from frame_codec import parse_frame, decode_response, decompress, detect_encoding, encode_ack
+
+
+def old_decode(data):
+    push_frame = PushFrame()
+    push_frame.ParseFromString(data)
+    response = Response()
+    response.ParseFromString(gzip.decompress(push_frame.payload))
+    return response
+
+
+def new_decode(data):
+    return decode_response(parse_frame(data))
+
+
+def old_ack(log_id, internal_ext):
+    ack_frame = PushFrame()
+    ack_frame.logId = log_id
+    ack_frame.payloadType = "ack"
+    ack_frame.payload = internal_ext.encode('utf-8')
+    return ack_frame.SerializeToString()
+
+
+def bench(func, items):
+    """对 items 中每一项执行一次 func(item)"""
+    it = itertools.cycle(items)
+    return summarize(*run_timed(lambda: func(next(it)), len(items), warmup=len(items) // 10))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="帧编解码微基准")
+    parser.add_argument('--frames', help="录制的帧文件（默认使用合成帧）")
+    parser.add_argument('--count', type=int, default=2000, help="合成帧数量")
+    parser.add_argument('--json', help="结果保存路径")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames) if args.frames else synthetic_frames(args.count)
+    parsed = [parse_frame(data) for data in frames]
+    payloads = [frame.payload for frame in parsed]
+    encodings = [detect_encoding(frame) for frame in parsed]
+    acks = [(frame.logId, decode_response(frame).internalExt) for frame in parsed]
+
+    # 两条路径的结果必须一致
+    assert all(old_decode(data) == new_decode(data) for data in frames[:50])
+    assert all(old_ack(*ack) == encode_ack(*ack) for ack in acks[:50])
+
+    pairs = [
+        ('整帧解码', bench(old_decode, frames), bench(new_decode, frames)),
+        ('解压', bench(gzip.decompress, payloads),
+         bench(lambda i: decompress(payloads[i], encodings[i]), range(len(payloads)))),
+        ('解压 memoryview', None,
+         bench(lambda i: decompress(memoryview(payloads[i]), encodings[i]), range(len(payloads)))),
+        ('构造 ack 帧', bench(lambda ack: old_ack(*ack), acks), bench(lambda ack: encode_ack(*ack), acks)),
+    ]
+
+    results = {}
+    print_header()
+    for name, old, new in pairs:
+        if old is not None:
+            results[f'{name} [原路径]'] = old
+            print_row(f"{name} [原路径]", old)
+        results[f'{name} [frame_codec]'] = new
+        note = f"{new['ops_per_sec'] / old['ops_per_sec']:.2f}x" if old is not None else ''
+        print_row(f"{name} [frame_codec]", new, note)
+
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
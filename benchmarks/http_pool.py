@@ -0,0 +1,123 @@
+"""
+HTTP 连接池基准：本地模拟接口服务器上对比 urlopen（每次新建连接）和
+http_client.HttpClient（keep-alive 连接池）的单次请求耗时
+
+本机有 openssl 命令时额外测 HTTPS（自签名证书），可以看到省掉的 TLS 握手。
+
+用法（在仓库根目录）:
+  python -m benchmarks.http_pool [请求次数]
+"""
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+
+from benchmarks.common import run_timed, summarize, print_header, print_row
+from get_real_room_id import API_HEADERS
+from http_client import HttpClient
+
+# 模拟 /webcast/room/web/enter/ 的返回
+RESPONSE_BODY = json.dumps({
+    "status_code": 0,
+    "data": {
+        "data": [{"id_str": "7376429659866598196", "title": "示例直播间", "status": 2,
+                  "owner": {"nickname": "主播名称", "id_str": "1", "sec_uid": "x" * 76}}],
+        "user": {"nickname": "游客"},
+    },
+}, ensure_ascii=False).encode('utf-8')
+
+PATH = "/webcast/room/web/enter/?aid=6383&app_name=douyin_web&web_rid=4253196531"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """支持 keep-alive 的本地模拟接口"""
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分两次写出，不关 Nagle 会和客户端的延迟确认叠加出 40ms 停顿
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(cert_dir=None):
+    """启动本地服务器，返回 (server, base_url)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    scheme = 'http'
+    if cert_dir:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(os.path.join(cert_dir, 'cert.pem'), os.path.join(cert_dir, 'key.pem'))
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}"
+
+
+def make_cert(cert_dir):
+    """用 openssl 生成自签名证书，没有 openssl 时返回 False"""
+    if not shutil.which('openssl'):
+        return False
+    result = subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=localhost',
+         '-keyout', os.path.join(cert_dir, 'key.pem'), '-out', os.path.join(cert_dir, 'cert.pem')],
+        capture_output=True)
+    return result.returncode == 0
+
+
+def bench(base_url, iterations):
+    """同一服务器上分别测 urlopen 和连接池"""
+    client_context = ssl.create_default_context()
+    client_context.check_hostname = False
+    client_context.verify_mode = ssl.CERT_NONE
+
+    url = base_url + PATH
+
+    def with_urlopen():
+        request = Request(url, headers=API_HEADERS)
+        with urlopen(request, timeout=10, context=client_context if url.startswith('https') else None) as response:
+            json.loads(response.read().decode('utf-8'))
+
+    client = HttpClient(ssl_context=client_context, headers=API_HEADERS)
+    results = {
+        'urlopen': summarize(*run_timed(with_urlopen, iterations, warmup=5)),
+        'HttpClient': summarize(*run_timed(lambda: client.get_json(url), iterations, warmup=5)),
+    }
+    client.close()
+    return results
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    with tempfile.TemporaryDirectory() as cert_dir:
+        targets = [('http', None)]
+        if make_cert(cert_dir):
+            targets.append(('https', cert_dir))
+
+        print_header()
+        for name, certs in targets:
+            server, base_url = start_server(certs)
+            results = bench(base_url, iterations)
+            server.shutdown()
+
+            saved = results['urlopen']['p50_ms'] - results['HttpClient']['p50_ms']
+            for client_name, result in results.items():
+                note = f"每次请求节省 {saved:.3f} ms（p50）" if client_name == 'HttpClient' else ''
+                print_row(f"[{name}] {client_name}", result, note)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+过滤规则字面量预过滤基准
+
+生成一份接近真实直播间的弹幕语料（普通聊天为主，少量商品、口令、引流弹幕），
+对比 FilterPlan 开启和关闭预过滤时的过滤耗时，并统计预过滤直接拒绝（没执行正则）的比例；
+同时检查每组规则是否按预期建立了预过滤，以及开启前后的过滤结果完全一致。
+另外对比字面量判断的两种实现（转义分支正则 / Aho-Corasick 自动机）在不同字面量数量下的耗时，
+literal_prefilter.AUTOMATON_MIN_LITERALS 按这组结果选取。
+
+用法（在仓库根目录）:
+  python -m benchmarks.prefilter [--count 20000] [--repeat 5] [--json 结果.json]
+"""
+import argparse
+import random
+
+from benchmarks.common import run_timed, summarize, print_header, print_row, write_json
+from filter_rules import FilterPlan, normalize_rule
+from literal_prefilter import AhoCorasick, AUTOMATON_MIN_LITERALS
+
+WORDS = ["主播好", "666", "来了来了", "这波操作可以", "哈哈哈哈", "求带", "好听", "支持一下", "关注了",
+         "晚上好", "牛啊", "这把能赢", "打野呢", "上分", "点赞了", "主播几点下播", "?", "冲冲冲", "太秀了"]
+HEROES = ["李白", "韩信", "露娜", "貂蝉", "诸葛亮", "孙尚香"]
+
+CONFIG_EXAMPLE = r"王者荣耀【[^】]+】.*?今天(9[0-9]{2}|[1-9]\d{3,})块"
+
+RULE_SETS = {
+    # config_example.json 的规则：正则本身有字面量前缀，sre 已经很快
+    'config_example': [
+        {'mode': 'include', 'pattern': CONFIG_EXAMPLE},
+    ],
+    # 没有字面量前缀的正则：sre 要在每个位置尝试匹配
+    'mixed': [
+        {'mode': 'include', 'pattern': CONFIG_EXAMPLE},
+        {'mode': 'include', 'pattern': r"(口令|暗号)[:：]\s*\S+"},
+        {'mode': 'include', 'pattern': r"[一-龥]{2,}今天\d+块"},
+        {'mode': 'exclude', 'pattern': r"[一-龥]*加(微信|vx|VX)\s*\w{5,}"},
+        {'mode': 'exclude', 'keywords': ["刷屏", "广告"]},
+    ],
+    # 多条以字面量开头的正则：合并成分支后没有共同前缀，sre 要在每个位置尝试每个分支
+    'literal_prefixes': [
+        {'mode': 'include', 'pattern': CONFIG_EXAMPLE},
+        {'mode': 'include', 'pattern': r"口令[:：]\s*\d+"},
+        {'mode': 'include', 'pattern': r"暗号[:：]\s*\d+"},
+        {'mode': 'include', 'pattern': r"福袋(口令)?[:：].+"},
+    ],
+    # 大量屏蔽词 + 正则：关键词仍由一个分支正则判断，预过滤只覆盖正则规则
+    'blocklist': [
+        {'mode': 'exclude', 'keywords': [f"屏蔽词{i}" for i in range(400)]},
+        {'mode': 'exclude', 'pattern': r"\w*加(微信|vx|VX)\s*\w{5,}"},
+        {'mode': 'include', 'pattern': CONFIG_EXAMPLE},
+        {'mode': 'include', 'pattern': r"(口令|暗号)[:：]\s*\S+"},
+    ],
+}
+
+# 会建立预过滤的规则组（只有一条以字面量开头的正则时由 sre 自己查找前缀）
+PREFILTERED = {'mixed', 'literal_prefixes', 'blocklist'}
+
+
+def build_corpus(count, seed=42):
+    """约 97% 普通聊天，其余为商品、口令、引流弹幕"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.015:
+            corpus.append(f"王者荣耀【{rng.choice(HEROES)}】皮肤今天{rng.randint(500, 3000)}块")
+        elif roll < 0.022:
+            corpus.append(f"{rng.choice(['口令', '暗号'])}：{rng.randint(1000, 9999)}")
+        elif roll < 0.03:
+            corpus.append(f"想上分的加vx{rng.randint(10 ** 6, 10 ** 7)}")
+        else:
+            corpus.append("".join(rng.choices(WORDS, k=rng.randint(1, 4))))
+    return corpus
+
+
+def bench_plans(corpus, repeat):
+    results = {}
+    for name, rules in RULE_SETS.items():
+        rules = [normalize_rule(rule, i) for i, rule in enumerate(rules)]
+        plain = FilterPlan(rules, prefilter=False)
+        fast = FilterPlan(rules)
+        has_prefilter = fast.include_prefilter is not None or fast.exclude_prefilter is not None
+        assert has_prefilter == (name in PREFILTERED), name
+        assert [plain.allows(m) for m in corpus] == [fast.allows(m) for m in corpus], name
+        fast.prefiltered = 0
+
+        def run(plan):
+            allows = plan.allows
+            for message in corpus:
+                allows(message)
+
+        base = summarize(*run_timed(lambda: run(plain), repeat, warmup=1))
+        pre = summarize(*run_timed(lambda: run(fast), repeat, warmup=1))
+        passed = sum(map(fast.allows, corpus))
+        results[name] = {
+            'no_prefilter': base,
+            'prefilter': pre,
+            'prefiltered_rate': fast.prefiltered / ((repeat + 2) * len(corpus)),
+            'passed': passed,
+            'us_per_msg_no_prefilter': base['p50_ms'] * 1000 / len(corpus),
+            'us_per_msg_prefilter': pre['p50_ms'] * 1000 / len(corpus),
+        }
+    return results
+
+
+def bench_literals(corpus, repeat, sizes=(8, 50, 150, 500, 2000)):
+    """字面量判断两种实现在整份语料上的每条耗时（微秒）"""
+    import re
+    rng = random.Random(7)
+    results = {}
+    for size in sizes:
+        # 首字各不相同的 2~4 字词（常用汉字区间随机），接近真实屏蔽词表
+        literals = ["".join(chr(0x4e00 + rng.randrange(3000)) for _ in range(rng.randint(2, 4)))
+                    for _ in range(size)]
+        search = re.compile('|'.join(map(re.escape, literals))).search
+        automaton = AhoCorasick(literals)
+        assert [search(m) is not None for m in corpus] == [automaton.contains_any(m) for m in corpus]
+
+        def run(func):
+            for message in corpus:
+                func(message)
+
+        results[size] = {
+            'regex_us': summarize(*run_timed(lambda: run(search), repeat, warmup=1))['p50_ms'] * 1000 / len(corpus),
+            'automaton_us': summarize(*run_timed(lambda: run(automaton.contains_any), repeat,
+                                                 warmup=1))['p50_ms'] * 1000 / len(corpus),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="过滤规则字面量预过滤基准")
+    parser.add_argument('--count', type=int, default=20000, help="语料弹幕数")
+    parser.add_argument('--repeat', type=int, default=5, help="整份语料过滤次数")
+    parser.add_argument('--json', help="结果保存路径")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.count)
+    plans = bench_plans(corpus, args.repeat)
+    print(f"语料 {len(corpus)} 条，每行为过滤整份语料一次的耗时\n")
+    print_header()
+    for name, result in plans.items():
+        print_row(f"{name}（不预过滤）", result['no_prefilter'])
+        print_row(f"{name}（预过滤）", result['prefilter'],
+                  f"{result['no_prefilter']['p50_ms'] / result['prefilter']['p50_ms']:.2f}x，"
+                  f"预过滤拒绝 {result['prefiltered_rate']:.1%}，通过 {result['passed']} 条")
+
+    literals = bench_literals(corpus, args.repeat)
+    print(f"\n{'字面量数':<10}{'分支正则 µs/条':>16}{'自动机 µs/条':>16}  "
+          f"（AUTOMATON_MIN_LITERALS = {AUTOMATON_MIN_LITERALS}）")
+    print("-" * 60)
+    for size, result in literals.items():
+        print(f"{size:<10}{result['regex_us']:>16.3f}{result['automaton_us']:>16.3f}")
+
+    if args.json:
+        write_json(args.json, {'plans': plans, 'literals': literals})
+
+
+if __name__ == "__main__":
+    main()
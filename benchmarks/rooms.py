@@ -0,0 +1,211 @@
+"""
+单进程承载直播间数量基准：线程版 DouyinDanmaku 与 asyncio 版 AsyncDouyinDanmaku 对比
+
+在本地启动模拟推送服务器（定时推送 gzip 压缩的聊天消息、要求 ACK），
+每种引擎在独立子进程中同时连接 N 个直播间，测量连接数、线程数、
+常驻内存（RSS）增量、每个直播间的内存和收到的消息数。不访问网络、不签名。
+
+用法（在仓库根目录）:
+  python -m benchmarks.rooms [--rooms 50 200] [--duration 5] [--json 结果.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import write_json
+from douyin_pb2 import PushFrame, Response, ChatMessage
+
+ENGINES = ('thread', 'async')
+
+
+def build_chat_frame():
+    """一条需要 ACK 的聊天消息帧"""
+    chat = ChatMessage()
+    chat.content = "主播好！" * 4
+    chat.user.nickName = "观众"
+    response = Response()
+    message = response.messagesList.add()
+    message.method = "WebcastChatMessage"
+    message.payload = chat.SerializeToString()
+    response.needAck = True
+    response.internalExt = "internal_src:dim|first_req_ms:0"
+    frame = PushFrame()
+    frame.logId = 1
+    frame.payloadType = "msg"
+    frame.payload = gzip.compress(response.SerializeToString())
+    return frame.SerializeToString()
+
+
+def serve(port_file, interval):
+    """模拟推送服务器：每个连接每 interval 秒推送一条消息，忽略客户端发来的 hb/ack"""
+    import websockets
+
+    frame = build_chat_frame()
+
+    async def handler(ws, path=None):
+        async def drain():
+            async for _ in ws:
+                pass
+
+        reader = asyncio.ensure_future(drain())
+        try:
+            while not reader.done():
+                await ws.send(frame)
+                await asyncio.sleep(interval)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            reader.cancel()
+
+    async def main():
+        async with websockets.serve(handler, '127.0.0.1', 0, max_size=None, ping_interval=None) as server:
+            port = server.sockets[0].getsockname()[1]
+            with open(port_file, 'w') as f:
+                f.write(str(port))
+            await asyncio.Future()
+
+    asyncio.run(main())
+
+
+def rss_kb():
+    """当前进程常驻内存（KB），读取 /proc"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def worker(engine, room_count, port, duration):
+    """在本进程中连接 room_count 个直播间，输出一行 JSON 结果"""
+    from douyin_danmaku import DouyinDanmaku
+    from async_danmaku import AsyncDouyinDanmaku, get_room_host
+
+    base = AsyncDouyinDanmaku if engine == 'async' else DouyinDanmaku
+    counters = {'open': 0, 'messages': 0}
+    lock = threading.Lock()
+
+    class BenchReceiver(base):
+        def construct_ws_url(self):
+            return f"ws://127.0.0.1:{port}/?room_id={self.room_id}"
+
+        def on_open(self, ws):
+            super().on_open(ws)
+            with lock:
+                counters['open'] += 1
+
+        def handle_chat_message(self, payload):
+            chat = ChatMessage()
+            chat.ParseFromString(payload)
+            with lock:
+                counters['messages'] += 1
+
+        def handle_event(self, event):
+            # DOUYIN_DECODE_WORKERS > 0 时由解码进程池解析
+            with lock:
+                counters['messages'] += 1
+
+    baseline_rss = rss_kb()
+    baseline_threads = threading.active_count()
+    receivers = [BenchReceiver(str(7000000000000000000 + i), unique_id=f"{i:012d}") for i in range(room_count)]
+
+    quiet = open(os.devnull, 'w')
+    with contextlib.redirect_stdout(quiet):
+        start = time.perf_counter()
+        if engine == 'async':
+            host = get_room_host()
+            for receiver in receivers:
+                host.submit(receiver)
+        else:
+            for receiver in receivers:
+                threading.Thread(target=receiver.connect, daemon=True).start()
+
+        deadline = time.monotonic() + 60
+        while counters['open'] < room_count and time.monotonic() < deadline:
+            time.sleep(0.05)
+        connect_seconds = time.perf_counter() - start
+
+        time.sleep(duration)
+        result = {
+            'engine': engine,
+            'rooms': room_count,
+            'connected': counters['open'],
+            'connect_seconds': connect_seconds,
+            'messages': counters['messages'],
+            'threads': threading.active_count() - baseline_threads,
+            'rss_delta_kb': rss_kb() - baseline_rss,
+        }
+        for receiver in receivers:
+            receiver.close()
+
+    result['kb_per_room'] = result['rss_delta_kb'] / room_count
+    result['threads_per_room'] = result['threads'] / room_count
+    print(json.dumps(result))
+
+
+def run_worker(engine, room_count, port, duration):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.rooms', '--worker', engine,
+         '--port', str(port), '--duration', str(duration), '--rooms', str(room_count)],
+        capture_output=True, text=True, timeout=duration + 120)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr else 'worker failed')
+    # 关闭连接后仍可能有日志输出，取最后一行 JSON
+    lines = [line for line in output.stdout.splitlines() if line.startswith('{')]
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="单进程承载直播间数量基准")
+    parser.add_argument('--rooms', type=int, nargs='+', default=[50, 200], help="同时连接的直播间数量")
+    parser.add_argument('--duration', type=float, default=5, help="全部连接后保持的秒数")
+    parser.add_argument('--interval', type=float, default=0.5, help="模拟服务器每个连接的推送间隔（秒）")
+    parser.add_argument('--json', help="结果保存路径")
+    parser.add_argument('--worker', choices=ENGINES, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.rooms[0], args.port, args.duration)
+        return
+
+    port_file = f"/tmp/douyin_bench_push_{os.getpid()}.port"
+    server = subprocess.Popen([sys.executable, '-c',
+                               f"from benchmarks.rooms import serve; serve({port_file!r}, {args.interval})"])
+    try:
+        deadline = time.monotonic() + 10
+        while not os.path.exists(port_file) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with open(port_file) as f:
+            port = int(f.read())
+
+        results = []
+        print(f"{'引擎':<8}{'直播间':>8}{'已连接':>8}{'连接耗时 s':>12}{'线程':>8}"
+              f"{'线程/间':>10}{'RSS 增量 MB':>14}{'KB/间':>10}{'消息数':>10}")
+        print("-" * 90)
+        for room_count in args.rooms:
+            for engine in ENGINES:
+                r = run_worker(engine, room_count, port, args.duration)
+                results.append(r)
+                print(f"{r['engine']:<8}{r['rooms']:>8}{r['connected']:>8}{r['connect_seconds']:>12.2f}"
+                      f"{r['threads']:>8}{r['threads_per_room']:>10.2f}{r['rss_delta_kb'] / 1024:>14.1f}"
+                      f"{r['kb_per_room']:>10.1f}{r['messages']:>10}")
+    finally:
+        server.terminate()
+        server.wait()
+        if os.path.exists(port_file):
+            os.remove(port_file)
+
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+签名与连接准备耗时基准（离线运行，不访问网络）
+
+测量 get_ms_stub、generate_ms_token、get_signature（含重试次数）、
+get_abogus_signature、construct_ws_url 的 p50/p95/p99 和吞吐量；
+JS 相关项目对本机可用的每个 JS 后端分别测量。douyin_sdk.js 更新后
+用 --json 保存结果，与上一次对比即可发现回归。
+
+用法（在仓库根目录）:
+  python -m benchmarks.signing [--iterations 50] [--json 结果.json]
+"""
+import os
+
+# 只测进程内签名：不落盘签名缓存，不使用签名守护进程
+os.environ['DOUYIN_SIGNATURE_CACHE_FILE'] = ''
+os.environ['DOUYIN_SIGNER_SOCKET'] = ''
+
+import argparse
+import contextlib
+import io
+import itertools
+import shutil
+
+import execjs
+
+from benchmarks.common import run_timed, summarize, print_header, print_row, write_json
+from douyin_danmaku import DouyinDanmaku
+from douyin_sign import DEFAULT_USER_AGENT, get_ms_stub, generate_ms_token, get_signature, sign
+from get_real_room_id import USER_AGENT, get_abogus_signature
+from signer_pool import SignerPool, set_signer_pool
+
+ROOM_ID = "7376429659866598196"
+ENTER_URL = "https://live.douyin.com/webcast/room/web/enter/?aid=6383&app_name=douyin_web&web_rid=4253196531"
+
+
+def available_backends():
+    """本机可用的 JS 后端：常驻 Node 进程 + PyExecJS 可用的运行时"""
+    backends = []
+    if shutil.which('node') or shutil.which('nodejs'):
+        backends.append('node')
+    for name, runtime in execjs.runtimes().items():
+        if runtime.is_available():
+            backends.append(name)
+    return backends
+
+
+def bench_python(iterations):
+    """纯 Python 部分"""
+    results = {}
+    unique_ids = (f"{i:012d}" for i in itertools.count())
+    results['get_ms_stub'] = summarize(*run_timed(lambda: get_ms_stub(ROOM_ID, next(unique_ids)), iterations))
+    results['generate_ms_token(107)'] = summarize(*run_timed(lambda: generate_ms_token(107), iterations))
+    results['generate_ms_token(12)'] = summarize(*run_timed(lambda: generate_ms_token(12), iterations))
+    return results
+
+
+def bench_backend(backend, iterations):
+    """某个 JS 后端上的签名相关项目"""
+    pool = SignerPool(size=1, backend=backend)
+    previous = set_signer_pool(pool)
+    results = {}
+    quiet = io.StringIO()
+    # unique_id 带上后端名，不同后端之间也不会命中签名缓存
+    unique_ids = (f"{backend[:4]}{i:08d}" for i in itertools.count())
+
+    try:
+        pool.warm_up()
+        pool.call("getMSSDKSignatureBatch", [get_ms_stub(ROOM_ID, "warmup")], DEFAULT_USER_AGENT)
+
+        with contextlib.redirect_stdout(quiet):
+            # 每次换一个 unique_id，保证不命中签名缓存
+            results['get_signature'] = summarize(
+                *run_timed(lambda: get_signature(ROOM_ID, next(unique_ids)), iterations))
+
+        # 重试次数：一次批量调用返回每个签名的尝试次数
+        stubs = [get_ms_stub(ROOM_ID, next(unique_ids)) for _ in range(iterations)]
+        attempts = []
+
+        def batch():
+            results = pool.call("getMSSDKSignatureBatch", stubs, DEFAULT_USER_AGENT)
+            attempts.extend(count for _, count in results)
+
+        samples, elapsed = run_timed(batch, 1)
+        retried = sum(1 for a in attempts if a > 1)
+        results['sign_batch'] = summarize(
+            [s / len(stubs) for s in samples], elapsed / len(stubs),
+            mean_attempts=sum(attempts) / len(attempts), max_attempts=max(attempts),
+            retry_rate=retried / len(attempts))
+
+        fixed_uid = next(unique_ids)
+        sign(ROOM_ID, fixed_uid)
+        results['sign(cache hit)'] = summarize(*run_timed(lambda: sign(ROOM_ID, fixed_uid), iterations))
+
+        urls = []
+        with contextlib.redirect_stdout(quiet):
+            results['get_abogus_signature'] = summarize(
+                *run_timed(lambda: urls.append(get_abogus_signature(ENTER_URL, USER_AGENT)), iterations))
+        results['get_abogus_signature']['signed'] = sum('a_bogus=' in url for url in urls)
+
+        results['construct_ws_url'] = summarize(
+            *run_timed(lambda: DouyinDanmaku(ROOM_ID).construct_ws_url(), iterations))
+        receiver = DouyinDanmaku(ROOM_ID)
+        receiver.construct_ws_url()
+        results['construct_ws_url(cache hit)'] = summarize(*run_timed(receiver.construct_ws_url, iterations))
+    finally:
+        set_signer_pool(previous)
+        pool.close()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="签名与连接准备耗时基准")
+    parser.add_argument('--iterations', type=int, default=50, help="每个 JS 项目的次数（纯 Python 项目 ×100）")
+    parser.add_argument('--json', help="结果保存路径")
+    args = parser.parse_args()
+
+    all_results = {'python': bench_python(args.iterations * 100)}
+    for backend in available_backends():
+        all_results[backend] = bench_backend(backend, args.iterations)
+
+    print_header()
+    for group, results in all_results.items():
+        for name, result in results.items():
+            note = ''
+            if 'mean_attempts' in result:
+                note = (f"平均尝试 {result['mean_attempts']:.2f} 次，最多 {result['max_attempts']} 次，"
+                        f"{result['retry_rate']:.1%} 需要重试（每个签名）")
+            elif 'signed' in result:
+                note = f"成功签名 {result['signed']}/{result['count']}"
+            print_row(f"[{group}] {name}", result, note)
+
+    if args.json:
+        write_json(args.json, all_results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+聊天消息快速解析
+热路径上只需要 ChatMessage 的内容、昵称、用户 ID、时间和消息 ID，完整解析会为 Common、User（头像、
+徽章、关注信息等大量子消息）和 rtfContent 创建对象。这里按 douyin.proto 的字段号直接读取 protobuf
+编码，只解码需要的字段，其余字段按长度跳过。
+protobuf 使用 C 实现（upb）时完整解析本身更快，快速解析只在纯 Python 实现下默认启用
+"""
+import os
+from collections import namedtuple
+
+# fast：按字段号读取需要的字段；full：douyin_pb2 完整解析；auto：protobuf 为纯 Python 实现时用 fast
+CHAT_PARSER = os.environ.get('DOUYIN_CHAT_PARSER', 'auto')
+
+ChatFields = namedtuple('ChatFields', 'msg_id user_id nickname content event_time')
+
+# 字段号（douyin.proto）
+_CHAT_COMMON = 1
+_CHAT_USER = 2
+_CHAT_CONTENT = 3
+_CHAT_EVENT_TIME = 15
+
+# 编码类型
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH = 2
+_FIXED32 = 5
+
+# 子消息中要读取的字段的 tag（字段号 << 3 | 编码类型）
+_COMMON_MSG_ID_TAG = 2 << 3 | _VARINT
+_USER_ID_TAG = 1 << 3 | _VARINT
+_USER_NICKNAME_TAG = 3 << 3 | _LENGTH
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _skip(data, pos, wire_type):
+    """跳过一个字段的值，返回下一个字段的位置"""
+    if wire_type == _VARINT:
+        while data[pos] & 0x80:
+            pos += 1
+        return pos + 1
+    if wire_type == _LENGTH:
+        length, pos = _read_varint(data, pos)
+        return pos + length
+    if wire_type == _FIXED64:
+        return pos + 8
+    if wire_type == _FIXED32:
+        return pos + 4
+    raise ValueError(f"不支持的编码类型: {wire_type}")
+
+
+def _scan_common(data, pos, end):
+    """读取 Common.msgId，读到后不再扫描其余字段"""
+    while pos < end:
+        tag = data[pos]
+        pos += 1
+        if tag == _COMMON_MSG_ID_TAG:
+            return _read_varint(data, pos)[0]
+        if tag & 0x80:
+            tag, pos = _read_varint(data, pos - 1)
+        pos = _skip(data, pos, tag & 7)
+    return 0
+
+
+def _scan_user(data, pos, end):
+    """读取 User.id 和 User.nickName（按字段号顺序编码，读到 nickName 后不再扫描其余字段）"""
+    user_id = 0
+    while pos < end:
+        tag = data[pos]
+        pos += 1
+        if tag == _USER_ID_TAG:
+            user_id, pos = _read_varint(data, pos)
+        elif tag == _USER_NICKNAME_TAG:
+            length = data[pos]
+            pos += 1
+            if length & 0x80:
+                length, pos = _read_varint(data, pos - 1)
+            if pos + length > end:
+                raise ValueError("User 长度不符")
+            return user_id, data[pos:pos + length].decode('utf-8')
+        else:
+            if tag & 0x80:
+                tag, pos = _read_varint(data, pos - 1)
+            pos = _skip(data, pos, tag & 7)
+    return user_id, ''
+
+
+def parse_chat_fast(payload):
+    """按字段号读取 ChatMessage 的需要字段，编码不合法时抛出 ValueError"""
+    msg_id = user_id = event_time = 0
+    nickname = content = ''
+    data = payload
+    end = len(data)
+    pos = 0
+    try:
+        while pos < end:
+            tag = data[pos]
+            pos += 1
+            if tag & 0x80:
+                tag, pos = _read_varint(data, pos - 1)
+            field = tag >> 3
+            wire_type = tag & 7
+            if wire_type == _LENGTH:
+                length = data[pos]
+                pos += 1
+                if length & 0x80:
+                    length, pos = _read_varint(data, pos - 1)
+                sub_end = pos + length
+                if sub_end > end:
+                    raise ValueError("字段长度超出消息")
+                if field == _CHAT_CONTENT:
+                    content = data[pos:sub_end].decode('utf-8')
+                elif field == _CHAT_USER:
+                    user_id, nickname = _scan_user(data, pos, sub_end)
+                elif field == _CHAT_COMMON:
+                    msg_id = _scan_common(data, pos, sub_end)
+                pos = sub_end
+            elif field == _CHAT_EVENT_TIME and wire_type == _VARINT:
+                event_time, pos = _read_varint(data, pos)
+            else:
+                pos = _skip(data, pos, wire_type)
+    except (IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"ChatMessage 编码不合法: {e}") from None
+    if pos != end:
+        raise ValueError("ChatMessage 编码不合法: 消息被截断")
+    return ChatFields(msg_id, user_id, nickname, content, event_time)
+
+
+def parse_chat_full(payload):
+    """douyin_pb2 完整解析"""
+    from douyin_pb2 import ChatMessage
+
+    chat = ChatMessage()
+    chat.ParseFromString(payload)
+    return ChatFields(chat.common.msgId, chat.user.id, chat.user.nickName, chat.content, chat.eventTime)
+
+
+def _use_fast_parser():
+    if CHAT_PARSER != 'auto':
+        return CHAT_PARSER == 'fast'
+    from google.protobuf.internal import api_implementation
+    return api_implementation.Type() == 'python'
+
+
+_FAST = _use_fast_parser()
+
+
+def parse_chat(payload):
+    """解析聊天消息，快速解析失败时退回完整解析（完整解析仍失败则抛出 DecodeError）"""
+    if not _FAST:
+        return parse_chat_full(payload)
+    try:
+        return parse_chat_fast(payload)
+    except ValueError:
+        return parse_chat_full(payload)
@@ -0,0 +1,77 @@
+"""
+弹幕事件
+缓冲区里的每条弹幕只保存内容、用户名、时间和一个指向直播间描述的引用；同一直播间的所有弹幕共用
+一个 RoomDescriptor（直播间 ID、标题、主播等字符串只存一份）。推送到前端或接口返回时才由
+to_dict() 转成原来的字典格式
+"""
+import sys
+import threading
+import weakref
+from datetime import datetime
+
+
+class RoomDescriptor:
+    """直播间描述（不可变），相同内容的描述在进程内只有一个实例"""
+
+    __slots__ = ('room_id', 'web_rid', 'title', 'owner', '__weakref__')
+
+    def __init__(self, room_id, web_rid, title, owner):
+        self.room_id = sys.intern(str(room_id))
+        self.web_rid = sys.intern(str(web_rid))
+        self.title = title
+        self.owner = owner
+
+
+_descriptors = weakref.WeakValueDictionary()
+_descriptors_lock = threading.Lock()
+
+
+def get_room_descriptor(room_id, web_rid, title, owner):
+    """获取直播间描述，内容相同时返回同一个实例；不再被弹幕引用的描述会自动释放"""
+    key = (room_id, web_rid, title, owner)
+    with _descriptors_lock:
+        descriptor = _descriptors.get(key)
+        if descriptor is None:
+            descriptor = RoomDescriptor(room_id, web_rid, title, owner)
+            _descriptors[key] = descriptor
+        return descriptor
+
+
+# 最近一次格式化的 (整秒, 时区, 字符串)，同一秒内的弹幕直接复用
+_last_timestamp = (None, None, '')
+
+
+def format_timestamp(t, tz=None):
+    """time.time() 格式化为 时:分:秒"""
+    global _last_timestamp
+    second = int(t)
+    cached_second, cached_tz, text = _last_timestamp
+    if second != cached_second or tz is not cached_tz:
+        text = datetime.fromtimestamp(second, tz).strftime('%H:%M:%S')
+        _last_timestamp = (second, tz, text)
+    return text
+
+
+class DanmakuEvent:
+    """一条弹幕"""
+
+    __slots__ = ('message', 'username', 'time', 'room')
+
+    def __init__(self, message, username, time, room):
+        self.message = message
+        self.username = username
+        self.time = time  # time.time()
+        self.room = room  # RoomDescriptor
+
+    def to_dict(self, tz=None):
+        """转成推送和接口使用的字典，timestamp 按 tz 格式化为 时:分:秒"""
+        room = self.room
+        return {
+            'message': self.message,
+            'username': self.username,
+            'timestamp': format_timestamp(self.time, tz),
+            'room_id': room.room_id,
+            'web_rid': room.web_rid,
+            'room_title': room.title,
+            'room_owner': room.owner
+        }
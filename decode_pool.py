@@ -0,0 +1,200 @@
+"""
+多进程解码
+解压和 protobuf 解析是 CPU 密集的，同一进程内受 GIL 限制只能用一个核。
+开启后读取线程把 PushFrame 的负载交给进程池，子进程返回精简的事件（方法、用户、内容、ID、时间，
+礼物和点赞另外带上连击/窗口合并需要的字段）；只解析直播间订阅的消息方法，其余只带方法和 ID 用于计数。
+多帧合并成一批提交以减少进程间通信开销；同一直播间的结果按提交顺序交回
+"""
+import multiprocessing
+import os
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from frame_codec import DEFAULT_ENCODING, decompress
+
+# 解码进程数，0 表示不使用进程池（在读取线程中解码）
+DECODE_WORKERS = int(os.environ.get('DOUYIN_DECODE_WORKERS', 0))
+
+# 每批最多帧数，以及凑批最多等待的时间（秒）
+DECODE_BATCH_SIZE = int(os.environ.get('DOUYIN_DECODE_BATCH_SIZE', 64))
+DECODE_BATCH_WAIT = float(os.environ.get('DOUYIN_DECODE_BATCH_WAIT', 0.005))
+
+# 解码后的消息：user_id、user 对聊天和礼物消息填写，content、event_time 只对聊天消息填写；
+# fields 为礼物、点赞消息的 gift_fields / like_fields（合并器 add 的参数），其余为 None
+DecodedEvent = namedtuple('DecodedEvent', 'method msg_id user_id user content event_time fields',
+                          defaults=(None,))
+
+# 一帧的解码结果：ACK 和断线续传需要的字段 + 事件列表
+DecodedFrame = namedtuple('DecodedFrame', 'need_ack internal_ext cursor events')
+
+
+def decode_payload(payload, encoding=DEFAULT_ENCODING, methods=None):
+    """按 encoding 解压并解析一帧的负载（Response），返回 DecodedFrame。
+    methods 为要解析的消息方法集合（None 表示全部），其余消息的事件只有 method 和 msg_id"""
+    from douyin_pb2 import Response, GiftMessage, LikeMessage
+    from chat_parser import parse_chat
+    from gift_streaks import gift_fields
+    from like_windows import like_fields
+
+    response = Response()
+    response.ParseFromString(decompress(payload, encoding))
+
+    events = []
+    for msg in response.messagesList:
+        if methods is not None and msg.method not in methods:
+            events.append(DecodedEvent(msg.method, msg.msgId, None, None, None, None))
+        elif msg.method == "WebcastChatMessage":
+            chat = parse_chat(msg.payload)
+            events.append(DecodedEvent(msg.method, msg.msgId or chat.msg_id, chat.user_id,
+                                       chat.nickname, chat.content, chat.event_time))
+        elif msg.method == "WebcastGiftMessage":
+            gift_msg = GiftMessage()
+            gift_msg.ParseFromString(msg.payload)
+            fields = gift_fields(gift_msg)
+            events.append(DecodedEvent(msg.method, msg.msgId, fields['user_id'], fields['user'],
+                                       None, None, fields))
+        elif msg.method == "WebcastLikeMessage":
+            like_msg = LikeMessage()
+            like_msg.ParseFromString(msg.payload)
+            events.append(DecodedEvent(msg.method, msg.msgId, like_msg.user.id, None, None, None,
+                                       like_fields(like_msg)))
+        else:
+            events.append(DecodedEvent(msg.method, msg.msgId, None, None, None, None))
+
+    return DecodedFrame(response.needAck, response.internalExt, response.cursor, events)
+
+
+def decode_batch(payloads):
+    """子进程中执行：解码一批 (负载, 压缩方式, 消息方法集合)，单帧解码失败时该帧的结果为 ValueError"""
+    results = []
+    for payload, encoding, methods in payloads:
+        try:
+            results.append(decode_payload(payload, encoding, methods))
+        except Exception as e:
+            results.append(ValueError(f"解码失败: {e}"))
+    return results
+
+
+class DecodePool:
+    """解码进程池（线程安全）"""
+
+    def __init__(self, workers=DECODE_WORKERS, batch_size=DECODE_BATCH_SIZE, batch_wait=DECODE_BATCH_WAIT):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.batches = 0
+        self.frames = 0
+        self.errors = 0
+        # 用 spawn 启动子进程：fork 会复制签名进程池等线程持有的锁
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        self._pending = []  # 正在凑批的 (负载, 压缩方式, 消息方法集合, 回调)
+        self._inflight = deque()  # 已提交的批次，按提交顺序交回结果
+        self._lock = threading.Lock()
+        self._deliver_lock = threading.Lock()
+        self._has_pending = threading.Condition(self._lock)
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run_flusher, daemon=True)
+        self._flusher.start()
+
+    def submit(self, payload, callback, encoding=DEFAULT_ENCODING, methods=None):
+        """提交一帧负载，解码完成后在结果线程中调用 callback(DecodedFrame 或 异常)；
+        methods 为要解析的消息方法集合（None 表示全部），同一直播间传同一个 frozenset，一批中只序列化一次"""
+        future = None
+        with self._lock:
+            self._pending.append((payload, encoding, methods, callback))
+            if len(self._pending) >= self.batch_size:
+                future = self._submit_pending()
+            elif len(self._pending) == 1:
+                # 唤醒凑批线程开始计时
+                self._has_pending.notify()
+        if future is not None:
+            future.add_done_callback(self._deliver)
+
+    def _run_flusher(self):
+        """凑不满一批时，等待 batch_wait 后提交"""
+        while True:
+            future = None
+            with self._lock:
+                if self._closed:
+                    return
+                if not self._pending:
+                    self._has_pending.wait()
+                    continue
+                self._has_pending.wait(self.batch_wait)
+                if self._pending:
+                    future = self._submit_pending()
+            # 回调可能立即执行，不能在持有 self._lock 时注册
+            if future is not None:
+                future.add_done_callback(self._deliver)
+
+    def _submit_pending(self):
+        """提交当前凑好的一批（调用方持有 self._lock），返回 Future"""
+        batch, self._pending = self._pending, []
+        future = self._executor.submit(decode_batch, [item[:3] for item in batch])
+        self._inflight.append((future, [item[3] for item in batch]))
+        self.batches += 1
+        self.frames += len(batch)
+        return future
+
+    def _deliver(self, _future):
+        """按提交顺序交回已完成批次的结果，保证同一直播间的消息顺序"""
+        with self._deliver_lock:
+            while True:
+                with self._lock:
+                    if not self._inflight or not self._inflight[0][0].done():
+                        return
+                    future, callbacks = self._inflight.popleft()
+
+                try:
+                    results = future.result()
+                except Exception as e:
+                    self.errors += 1
+                    results = [e] * len(callbacks)
+
+                for callback, result in zip(callbacks, results):
+                    try:
+                        callback(result)
+                    except Exception as e:
+                        print(f"❌ 消息处理错误: {e}")
+
+    def stats(self):
+        with self._lock:
+            inflight = len(self._inflight)
+            pending = len(self._pending)
+        return {
+            'workers': self.workers,
+            'batches': self.batches,
+            'frames': self.frames,
+            'avg_batch': self.frames / self.batches if self.batches else 0.0,
+            'inflight_batches': inflight,
+            'pending_frames': pending,
+            'errors': self.errors,
+        }
+
+    def close(self):
+        future = None
+        with self._lock:
+            self._closed = True
+            if self._pending:
+                future = self._submit_pending()
+            self._has_pending.notify()
+        if future is not None:
+            future.add_done_callback(self._deliver)
+        self._executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_decode_pool():
+    """获取进程内共享的解码进程池，未开启（DOUYIN_DECODE_WORKERS=0）时返回 None"""
+    global _pool
+    if DECODE_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DecodePool()
+    return _pool
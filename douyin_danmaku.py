@@ -3,36 +3,121 @@
 基于 pure_live 项目的 Dart 实现移植
 """
 import websocket
+import os
+import random
 import ssl
-import time
-import gzip
 import threading
-from douyin_sign import get_signature, generate_ms_token
-from douyin_pb2 import PushFrame, Response, ChatMessage, RoomUserSeqMessage
+import time
+from douyin_sign import sign, generate_ms_token
+from signer_pool import SignerError
+from douyin_pb2 import (Response, RoomUserSeqMessage,
+                        GiftMessage, LikeMessage, MemberMessage)
+from heartbeat_scheduler import get_heartbeat_scheduler
+from message_pipeline import get_pipeline_dispatcher, PIPELINE_QUEUE_SIZE, PIPELINE_FULL_POLICY
+from decode_pool import get_decode_pool
+from chat_parser import parse_chat
+from gift_streaks import GiftStreakAggregator, gift_fields
+from like_windows import LikeWindowAggregator, like_fields
+from msg_dedup import MsgIdDeduper, DEDUP_MAX_IDS
+from flush_timer import get_flush_timer
+from frame_codec import HEARTBEAT_FRAME, parse_frame, decode_response, detect_encoding, encode_ack
 
 # 常量定义
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.5845.97 Safari/537.36 Core/1.116.567.400 QQBrowser/19.7.6764.400"
 WS_URL_BASE = "wss://webcast3-ws-web-lq.douyin.com/webcast/im/push/v2/"
 DEFAULT_COOKIE = "ttwid=1%7CB1qls3GdnZhUov9o2NxOMxxYS2ff6OSvEWbv0ytbES4%7C1680522049%7C280d802d6d478e3e78d0c807f7c487e7ffec0ae4e5fdd6a0fe74c3c6af149511"
+ORIGIN = "https://live.douyin.com"
 HEARTBEAT_INTERVAL = 10  # 心跳间隔（秒）
 
+# 断线重连：连续失败的最多重连次数（0 表示不重连）
+RECONNECT_MAX_ATTEMPTS = int(os.environ.get('DOUYIN_RECONNECT_MAX_ATTEMPTS', 10))
+
+# 重连等待时间的基数和上限（秒），第 n 次在 [0, min(上限, 基数 * 2^n)] 内随机
+RECONNECT_BASE_DELAY = float(os.environ.get('DOUYIN_RECONNECT_BASE_DELAY', 2))
+RECONNECT_MAX_DELAY = float(os.environ.get('DOUYIN_RECONNECT_MAX_DELAY', 60))
+
+# 流水线模式：读取线程只收帧、解压和 ACK，消息交给共享处理线程（见 message_pipeline）
+PIPELINE = os.environ.get('DOUYIN_PIPELINE', '0') == '1'
+
+# 消息方法 -> 处理方法名；没有订阅的方法只计数，不解析负载
+METHOD_HANDLERS = {
+    "WebcastChatMessage": "handle_chat_message",
+    "WebcastRoomUserSeqMessage": "handle_online_message",
+    "WebcastGiftMessage": "handle_gift_message",
+    "WebcastMemberMessage": "handle_member_message",
+    "WebcastLikeMessage": "handle_like_message",
+}
+
+# 订阅时可以使用的简写
+SUBSCRIPTION_ALIASES = {
+    "chat": "WebcastChatMessage",
+    "online": "WebcastRoomUserSeqMessage",
+    "gift": "WebcastGiftMessage",
+    "member": "WebcastMemberMessage",
+    "like": "WebcastLikeMessage",
+}
+
+# 连接保持超过这个时间（秒）才算稳定，之后断开重新从第 1 次开始计数
+RECONNECT_STABLE_SECONDS = 30
+
+
+def reconnect_delay(attempt):
+    """第 attempt 次重连前的等待时间（指数退避 + 完全随机抖动，大量直播间同时断线时错开重连）"""
+    return random.uniform(0, min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** attempt))
+
 
 class DouyinDanmaku:
     """抖音弹幕接收器"""
 
-    def __init__(self, room_id, cookie=None):
+    # 读取线程能否在队列满时等待（asyncio 版等待会卡住所有直播间）
+    pipeline_can_block = True
+
+    def __init__(self, room_id, cookie=None, unique_id=None, pipeline=None, subscriptions=None):
+        """subscriptions: 要处理的消息类型（方法名或 chat/gift/like 等简写），默认全部"""
         self.room_id = room_id
-        self.unique_id = generate_ms_token(12)
+        # 固定 unique_id 可以复用缓存的签名（msStub 由 room_id + unique_id 决定）
+        self.unique_id = unique_id or generate_ms_token(12)
         self.cookie = cookie or DEFAULT_COOKIE
         self.ws = None
         self.heartbeat_timer = None
         self.running = False
+        # 最近一次收到的 Response.cursor / internalExt，重连时从这里继续
+        self.cursor = None
+        self.internal_ext = None
+        self.opened_at = None  # 本次连接成功的时间，未连接成功为 None
+        self.last_error = None
+        self.resign = False  # 下次连接是否重新签名（不使用签名缓存）
+        self.closed = threading.Event()
+
+        # 每种消息方法收到的数量（包括没有订阅的，不包括重复推送的）
+        self.method_counts = {}
+        # 按 msgId 去重，重连后跨连接保留；DOUYIN_DEDUP_MAX_IDS=0 时不去重
+        self.dedup = MsgIdDeduper() if DEDUP_MAX_IDS > 0 else None
+        self._dispatch = {}
+        self.decode_methods = frozenset()  # 解码进程池中要解析的消息方法（与订阅一致）
+        self.subscribe(subscriptions)
+
+        # 流水线模式下的消息队列，未开启为 None
+        self.message_queue = None
+        if PIPELINE if pipeline is None else pipeline:
+            policy = PIPELINE_FULL_POLICY
+            if policy == 'block' and not self.pipeline_can_block:
+                policy = 'drop_oldest'
+            self.message_queue = get_pipeline_dispatcher().create_queue(
+                self.dispatch, PIPELINE_QUEUE_SIZE, policy)
+
+        # 多进程解码（DOUYIN_DECODE_WORKERS > 0 时开启），未开启为 None
+        self.decode_pool = get_decode_pool()
+
+        # 礼物连击合并、点赞窗口合并，收到第一条相应消息时才登记到共享定时线程
+        self.gift_streaks = GiftStreakAggregator(self.on_gift_streak)
+        self.like_windows = LikeWindowAggregator(self.on_like_window)
+        self._flush_handle = None
 
     def construct_ws_url(self):
         """构建 WebSocket URL"""
-        signature = get_signature(self.room_id, self.unique_id)
-        if not signature:
-            raise Exception("Failed to generate signature")
+        signature = sign(self.room_id, self.unique_id, use_cache=not self.resign)
+        self.resign = False
 
         # 使用当前时间戳
         ts = int(time.time() * 1000)
@@ -46,7 +131,7 @@ class DouyinDanmaku:
             "compress": "gzip",
             # 注意：pure_live 中 internal_ext 是被注释掉的，我们也尝试不使用它
             # "internal_ext": f"internal_src:dim|wss_push_room_id:{self.room_id}|wss_push_did:{self.unique_id}|dim_log_id:202302171547011A03AD2B8D4AD9D56975|fetch_time:{ts}|seq:1|wss_info:0-{ts}-0-0|wrds_kvs:WebcastRoomStatsMessage-{ts}_WebcastRoomRankMessage-{ts}_AudienceGiftSyncData-{ts}_HighlightContainerSyncData-2",
-            "cursor": f"h-1_t-{ts}_r-1_d-1_u-1",
+            "cursor": self.cursor or f"h-1_t-{ts}_r-1_d-1_u-1",
             "host": "https://live.douyin.com",
             "aid": "6383",
             "live_id": "1",
@@ -73,6 +158,10 @@ class DouyinDanmaku:
             "signature": signature
         }
 
+        # 重连时带上服务器给的 cursor / internal_ext，从断开处继续推送
+        if self.internal_ext:
+            params["internal_ext"] = self.internal_ext
+
         # 构建 URL
         from urllib.parse import urlencode
         query = urlencode(params)
@@ -82,6 +171,7 @@ class DouyinDanmaku:
         """连接打开回调"""
         print("✅ WebSocket 连接成功！")
         self.running = True
+        self.opened_at = time.monotonic()
         # 发送加入房间消息（关键步骤！）
         self.join_room()
         # 启动心跳定时器
@@ -90,59 +180,144 @@ class DouyinDanmaku:
     def on_message(self, ws, message):
         """接收消息回调"""
         try:
-            self.decode_message(message)
+            if self.decode_pool is not None:
+                self.submit_frame(message)
+            elif self.message_queue is None:
+                self.decode_message(message)
+            else:
+                # ACK 在放入队列前发送，队列满被丢弃的帧也已确认
+                response = self.decode_frame(message)
+                if response is not None and response.messagesList:
+                    self.message_queue.put(response)
         except Exception as e:
             print(f"❌ 消息解析错误: {e}")
 
     def on_error(self, ws, error):
         """错误回调"""
         print(f"❌ WebSocket 错误: {error}")
+        self.last_error = error
 
     def on_close(self, ws, close_status_code, close_msg):
         """连接关闭回调"""
         print(f"🔌 连接已关闭: {close_status_code} - {close_msg}")
         self.running = False
-        if self.heartbeat_timer:
-            self.heartbeat_timer.cancel()
+        self.stop_heartbeat()
 
     def decode_message(self, data):
         """解码 Protobuf 消息"""
-        # 解析 PushFrame
-        push_frame = PushFrame()
-        push_frame.ParseFromString(data)
+        response = self.decode_frame(data)
+        if response is not None:
+            self.dispatch_response(response)
+
+    def decode_frame(self, data):
+        """解析 PushFrame、解压 Response、记录推送位置并发送 ACK，没有负载时返回 None"""
+        push_frame = parse_frame(data)
 
-        # GZIP 解压
+        # 按帧标明的压缩方式解压
         if push_frame.payload:
-            decompressed = gzip.decompress(push_frame.payload)
-            response = Response()
-            response.ParseFromString(decompressed)
+            response = decode_response(push_frame)
+
+            # 记录推送位置，断线重连时继续
+            if response.cursor:
+                self.cursor = response.cursor
+            if response.internalExt:
+                self.internal_ext = response.internalExt
 
             # 发送 ACK（如果需要）
             if response.needAck:
                 self.send_ack(push_frame.logId, response.internalExt)
 
-            # 处理消息列表
-            for msg in response.messagesList:
-                self.handle_message(msg)
+            return response
+        return None
+
+    def dispatch_response(self, response):
+        """处理 Response 中的消息列表"""
+        for msg in response.messagesList:
+            self.handle_message(msg)
+
+    def dispatch(self, item):
+        """处理流水线队列中的一项：Response，或多进程解码得到的事件列表"""
+        if isinstance(item, Response):
+            self.dispatch_response(item)
+        else:
+            self.handle_events(item)
+
+    def submit_frame(self, data):
+        """多进程解码：只解析 PushFrame，负载交给解码进程池"""
+        push_frame = parse_frame(data)
+        if push_frame.payload:
+            log_id = push_frame.logId
+            self.decode_pool.submit(push_frame.payload, lambda result: self.on_decoded(log_id, result),
+                                    detect_encoding(push_frame), self.decode_methods)
+
+    def on_decoded(self, log_id, result):
+        """解码进程池交回一帧的结果（DecodedFrame 或异常）：记录推送位置、ACK，再处理事件"""
+        if isinstance(result, Exception):
+            print(f"❌ 消息解析错误: {result}")
+            return
+
+        if result.cursor:
+            self.cursor = result.cursor
+        if result.internal_ext:
+            self.internal_ext = result.internal_ext
+        if result.need_ack and self.running:
+            self.send_ack(log_id, result.internal_ext)
+
+        if self.message_queue is not None:
+            self.message_queue.put(result.events)
+        else:
+            self.handle_events(result.events)
+
+    def handle_events(self, events):
+        """处理多进程解码得到的事件列表（同样计数并按订阅过滤）"""
+        counts = self.method_counts
+        dispatch = self._dispatch
+        dedup = self.dedup
+        for event in events:
+            if dedup is not None and dedup.is_duplicate(event.msg_id):
+                continue
+            counts[event.method] = counts.get(event.method, 0) + 1
+            if event.method in dispatch:
+                self.handle_event(event)
+
+    def handle_event(self, event):
+        """处理一条解码后的事件（DecodedEvent），与 handle_chat_message 等对应"""
+        if event.method == "WebcastChatMessage":
+            print(f"💬 [{event.user}]: {event.content}")
+        elif event.method == "WebcastGiftMessage":
+            self.add_gift(event.fields)
+        elif event.method == "WebcastLikeMessage":
+            self.add_like(event.fields)
+
+    def subscribe(self, subscriptions=None):
+        """设置要处理的消息类型（None 表示全部），可以在运行中调用"""
+        methods = METHOD_HANDLERS if subscriptions is None else [
+            SUBSCRIPTION_ALIASES.get(name, name) for name in subscriptions]
+        unknown = [method for method in methods if method not in METHOD_HANDLERS]
+        if unknown:
+            raise ValueError(f"未知的消息类型: {', '.join(unknown)}")
+        # 整体替换，读取线程不会看到一半的分发表
+        self._dispatch = {method: getattr(self, METHOD_HANDLERS[method]) for method in methods}
+        self.decode_methods = frozenset(self._dispatch)
+
+    @property
+    def subscriptions(self):
+        return list(self._dispatch)
 
     def handle_message(self, msg):
-        """处理不同类型的消息"""
-        if msg.method == "WebcastChatMessage":
-            self.handle_chat_message(msg.payload)
-        elif msg.method == "WebcastRoomUserSeqMessage":
-            self.handle_online_message(msg.payload)
-        elif msg.method == "WebcastGiftMessage":
-            pass  # 礼物消息
-        elif msg.method == "WebcastMemberMessage":
-            pass  # 用户进入/离开直播间
-        elif msg.method == "WebcastLikeMessage":
-            pass  # 点赞消息
+        """按分发表处理消息，重复推送的消息直接丢弃，没有订阅的方法不解析负载"""
+        if self.dedup is not None and self.dedup.is_duplicate(msg.msgId):
+            return
+        method = msg.method
+        self.method_counts[method] = self.method_counts.get(method, 0) + 1
+        handler = self._dispatch.get(method)
+        if handler is not None:
+            handler(msg.payload)
 
     def handle_chat_message(self, payload):
         """处理聊天消息"""
-        chat_msg = ChatMessage()
-        chat_msg.ParseFromString(payload)
-        print(f"💬 [{chat_msg.user.nickName}]: {chat_msg.content}")
+        chat = parse_chat(payload)
+        print(f"💬 [{chat.nickname}]: {chat.content}")
 
     def handle_online_message(self, payload):
         """处理在线人数消息"""
@@ -151,21 +326,74 @@ class DouyinDanmaku:
         # 不打印在线人数，避免刷屏
         pass
 
+    def handle_gift_message(self, payload):
+        """处理礼物消息"""
+        gift_msg = GiftMessage()
+        gift_msg.ParseFromString(payload)
+        self.add_gift(gift_fields(gift_msg))
+
+    def add_gift(self, fields):
+        """礼物消息的字段（gift_fields）加入连击合并"""
+        if self._flush_handle is None:
+            self.start_flush()
+        self.gift_streaks.add(**fields)
+
+    def start_flush(self):
+        """登记到共享定时线程，定时交出超时的礼物连击和结束的点赞窗口"""
+        self._flush_handle = get_flush_timer().add(self.flush_aggregates)
+
+    def flush_aggregates(self, now):
+        self.gift_streaks.flush_expired(now)
+        self.like_windows.flush(now)
+
+    def flush_pending(self):
+        """关闭时交出还在合并中的事件（未结束的礼物连击、当前点赞窗口）"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+            self.gift_streaks.flush_all()
+            self.like_windows.flush_all()
+
+    def on_gift_streak(self, streak):
+        """一次礼物连击结束（GiftStreak），每次连击只调用一次"""
+        print(f"🎁 [{streak.user}] 送出礼物 {streak.gift_name or streak.gift_id} x{streak.count}")
+
+    def handle_member_message(self, payload):
+        """处理用户进入直播间消息"""
+        member_msg = MemberMessage()
+        member_msg.ParseFromString(payload)
+        # 不打印进场消息，避免刷屏
+        pass
+
+    def handle_like_message(self, payload):
+        """处理点赞消息：按时间窗口合并"""
+        like_msg = LikeMessage()
+        like_msg.ParseFromString(payload)
+        self.add_like(like_fields(like_msg))
+
+    def add_like(self, fields):
+        """点赞消息的字段（like_fields）加入窗口合并"""
+        if self._flush_handle is None:
+            self.start_flush()
+        self.like_windows.add(**fields)
+
+    def on_like_window(self, window):
+        """一个点赞窗口结束（dict：count、messages、users、room_total 等），每个窗口只调用一次"""
+        print(f"👍 {window['window']:g} 秒内 {window['count']} 个赞（{window['users']} 人），累计 {window['likes']}")
+
     def send_ack(self, log_id, internal_ext):
         """发送 ACK 确认"""
-        ack_frame = PushFrame()
-        ack_frame.logId = log_id
-        ack_frame.payloadType = "ack"
-        ack_frame.payload = internal_ext.encode('utf-8')
-        self.ws.send(ack_frame.SerializeToString(), opcode=websocket.ABNF.OPCODE_BINARY)
+        self.send_bytes(encode_ack(log_id, internal_ext))
+
+    def send_bytes(self, data):
+        """发送二进制帧"""
+        self.ws.send(data, opcode=websocket.ABNF.OPCODE_BINARY)
 
     def heartbeat(self):
         """发送心跳"""
         if self.running and self.ws:
             try:
-                hb_frame = PushFrame()
-                hb_frame.payloadType = "hb"
-                self.ws.send(hb_frame.SerializeToString(), opcode=websocket.ABNF.OPCODE_BINARY)
+                self.send_bytes(HEARTBEAT_FRAME)
                 print("💓 发送心跳")
             except Exception as e:
                 print(f"❌ 心跳发送失败: {e}")
@@ -173,33 +401,76 @@ class DouyinDanmaku:
     def join_room(self):
         """加入房间（连接成功后立即调用）"""
         try:
-            hb_frame = PushFrame()
-            hb_frame.payloadType = "hb"
-            self.ws.send(hb_frame.SerializeToString(), opcode=websocket.ABNF.OPCODE_BINARY)
+            self.send_bytes(HEARTBEAT_FRAME)
             print("🚪 已发送加入房间消息")
         except Exception as e:
             print(f"❌ 加入房间失败: {e}")
 
     def start_heartbeat(self):
-        """启动心跳定时器"""
-        def heartbeat_loop():
-            while self.running:
-                time.sleep(HEARTBEAT_INTERVAL)
-                self.heartbeat()
+        """登记到共享心跳调度器（所有连接共用一个线程）"""
+        self.heartbeat_timer = get_heartbeat_scheduler(HEARTBEAT_INTERVAL).add(self)
 
-        self.heartbeat_timer = threading.Thread(target=heartbeat_loop, daemon=True)
-        self.heartbeat_timer.start()
+    def stop_heartbeat(self):
+        """取消心跳"""
+        if self.heartbeat_timer is not None:
+            self.heartbeat_timer.cancel()
+            self.heartbeat_timer = None
 
     def connect(self):
-        """建立连接"""
-        url = self.construct_ws_url()
+        """建立连接（阻塞），断线后按重连策略自动重连，直到 close() 或连续失败超过次数上限"""
+        attempt = 0
+        while not self.closed.is_set():
+            self.connect_once()
+            if self.closed.is_set():
+                break
+            delay, attempt = self.next_reconnect(attempt)
+            if delay is None or self.closed.wait(delay):
+                break
+
+    def next_reconnect(self, attempt):
+        """
+        连接断开后决定是否重连，返回 (等待秒数, 新的失败次数)，不再重连时等待秒数为 None
+
+        连接稳定保持过一段时间的从头计数；握手被拒绝（HTTP 4xx）可能是签名失效，下次重新签名，
+        其余情况沿用缓存的签名，大量直播间同时重连时不会同时压到签名进程
+        """
+        if self.opened_at is not None and time.monotonic() - self.opened_at >= RECONNECT_STABLE_SECONDS:
+            attempt = 0
+        if attempt >= RECONNECT_MAX_ATTEMPTS:
+            if RECONNECT_MAX_ATTEMPTS:
+                print(f"⏹️ 直播间 {self.room_id} 连续 {attempt} 次重连失败，停止重连")
+            return None, attempt
+
+        status = getattr(self.last_error, 'status_code', None)
+        if self.opened_at is None and status and 400 <= status < 500:
+            self.resign = True
+
+        delay = reconnect_delay(attempt)
+        print(f"🔄 直播间 {self.room_id} {delay:.1f} 秒后重连（第 {attempt + 1} 次）")
+        return delay, attempt + 1
+
+    def sign_url(self):
+        """签名并构建连接地址；签名失败（JS 出错、签名进程或守护进程不可用）时返回 None，按一次失败的连接重连"""
+        try:
+            return self.construct_ws_url()
+        except (SignerError, OSError) as e:
+            self.last_error = e
+            print(f"❌ 直播间 {self.room_id} 签名失败: {e}")
+            return None
+
+    def connect_once(self):
+        """建立一次连接，断开时返回"""
+        self.opened_at = None
+        self.last_error = None
+        url = self.sign_url()
+        if url is None:
+            return
         print(f"🔗 正在连接: {self.room_id}")
 
         # 请求头（匹配 pure_live 实现）
         headers = {
             "User-Agent": USER_AGENT,
-            "Cookie": self.cookie,
-            "Origin": "https://live.douyin.com"
+            "Cookie": self.cookie
         }
 
         # 创建 WebSocket 连接
@@ -213,11 +484,17 @@ class DouyinDanmaku:
         )
 
         # 运行（阻塞）
-        self.ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE})
+        # Origin 通过参数传入，放在 header 里会和 websocket-client 自动生成的 Origin 重复
+        self.ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE}, origin=ORIGIN)
 
     def close(self):
-        """关闭连接"""
+        """关闭连接（不再重连）"""
+        self.closed.set()
         self.running = False
+        self.stop_heartbeat()
+        if self.message_queue is not None:
+            self.message_queue.close()
+        self.flush_pending()
         if self.ws:
             self.ws.close()
 
@@ -1,8 +1,10 @@
 import hashlib
 import random
 import string
-import execjs
-import os
+from concurrent.futures import ThreadPoolExecutor
+from signer_pool import get_signer_pool, SignerError
+from signature_cache import get_signature_cache
+from signer_client import get_signer_client, SignerUnavailable
 
 # User Agent used in Dart codebase
 DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.5845.97 Safari/537.36 Core/1.116.567.400 QQBrowser/19.7.6764.400"
@@ -46,36 +48,83 @@ def generate_ms_token(length=107):
     characters = string.ascii_letters + string.digits
     return ''.join(random.choice(characters) for _ in range(length))
 
+def sign(room_id, unique_id, use_cache=True):
+    """
+    Thread-safe X-Bogus signature using the shared warm JS signer pool.
+    Signatures are cached by msStub, so reconnects with the same unique_id
+    skip the JS call entirely. Raises SignerError if the JS SDK fails.
+    """
+    return sign_many([(room_id, unique_id)], use_cache)[(room_id, unique_id)]
+
+def sign_many(pairs, use_cache=True):
+    """
+    Signs many (room_id, unique_id) pairs at once.
+    Cache misses are sent to JS in batches (one call per pool worker) and
+    the '-'/'=' retry loop runs inside JS, so N rooms cost a handful of
+    IPC round-trips instead of N or more.
+    Returns {(room_id, unique_id): signature}.
+    """
+    stubs = {pair: get_ms_stub(*pair) for pair in pairs}
+    signatures = sign_stubs(list(dict.fromkeys(stubs.values())), use_cache)
+    return {pair: signatures[ms_stub] for pair, ms_stub in stubs.items()}
+
+def sign_stubs(ms_stubs, use_cache=True):
+    """
+    Signs msStubs, serving valid ones from the signature cache.
+    Misses go to the signer daemon when it is running, otherwise to the
+    in-process signer pool. Returns {ms_stub: signature}.
+    """
+    cache = get_signature_cache()
+    signatures = {}
+    missing = []
+    for ms_stub in ms_stubs:
+        signature = cache.get(ms_stub) if use_cache else None
+        if signature:
+            signatures[ms_stub] = signature
+        else:
+            missing.append(ms_stub)
+
+    if missing:
+        try:
+            fresh = get_signer_client().request("ms_sdk", ms_stubs=missing, use_cache=use_cache)
+            # the daemon owns the cache file; keep its results in memory only
+            cache.put_many(fresh, persist=False)
+        except SignerUnavailable:
+            fresh = _sign_stubs_local(missing)
+            cache.put_many(fresh)
+        signatures.update(fresh)
+
+    return signatures
+
+def _sign_stubs_local(ms_stubs):
+    """Runs getMSSDKSignatureBatch, split evenly across the pool workers."""
+    pool = get_signer_pool()
+    chunk_count = min(pool.size, len(ms_stubs))
+    chunks = [ms_stubs[i::chunk_count] for i in range(chunk_count)]
+
+    def run(chunk):
+        results = pool.call("getMSSDKSignatureBatch", chunk, DEFAULT_USER_AGENT)
+        return {ms_stub: signature for ms_stub, (signature, _) in zip(chunk, results)}
+
+    if len(chunks) == 1:
+        return run(chunks[0])
+
+    fresh = {}
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        for result in executor.map(run, chunks):
+            fresh.update(result)
+    return fresh
+
 def get_signature(room_id, unique_id):
     """
     Generates the X-Bogus signature using the extracted JS SDK.
     """
-    js_path = os.path.join(os.path.dirname(__file__), 'douyin_sdk.js')
-    
-    if not os.path.exists(js_path):
-        raise FileNotFoundError(f"JS SDK file not found at {js_path}. Please run extract_js.py first.")
-        
-    with open(js_path, 'r', encoding='utf-8') as f:
-        js_code = f.read()
-    
-    # Initialize JS runtime
-    ctx = execjs.compile(js_code)
-    
-    ms_stub = get_ms_stub(room_id, unique_id)
-    
     print(f"Generating signature for Room ID: {room_id}, User ID: {unique_id}")
-    print(f"Calculated msStub: {ms_stub}")
-    
+    print(f"Calculated msStub: {get_ms_stub(room_id, unique_id)}")
+
     try:
-        signature = ctx.call("getMSSDKSignature", ms_stub, DEFAULT_USER_AGENT)
-        
-        # Retry logic if signature contains '-' or '=' (matching Dart implementation)
-        while '-' in signature or '=' in signature:
-            print("Signature contained invalid chars, retrying...")
-            signature = ctx.call("getMSSDKSignature", ms_stub, DEFAULT_USER_AGENT)
-            
-        return signature
-    except Exception as e:
+        return sign(room_id, unique_id)
+    except SignerError as e:
         print(f"JS Execution Error: {e}")
         return None
 
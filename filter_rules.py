@@ -0,0 +1,361 @@
+"""
+弹幕过滤规则
+规则分为全局规则和只对指定直播间生效的规则，每条规则是包含（include）或排除（exclude），
+内容为正则表达式（pattern）或关键词列表（keywords）。弹幕通过过滤的条件：不命中任何排除规则，
+并且没有包含规则或命中任意一条包含规则。
+
+规则修改时一次性编译成每个直播间的执行计划：同类正则合并为一个分支表达式、关键词合并后
+用子串判断或一个转义后的分支表达式，先执行开销小的关键词判断；新计划整体替换旧计划，
+正在过滤的线程不会看到一半的规则。
+
+同类规则中的正则都能确定必需字面量时（见 literal_prefilter），先判断弹幕是否含有其中任何一个，
+不含时跳过这一类的全部正则，大部分普通弹幕不用执行正则。
+
+正则执行中无法中断，灾难性回溯的正则会卡住读取弹幕的线程：加载时拒绝含嵌套量词等结构的正则（见 regex_safety），
+运行中单条弹幕超过时间预算的正则交给复核线程，在子进程中复核后自动停用
+"""
+import queue
+import re
+import threading
+import time
+
+from literal_prefilter import required_literals, literal_matcher
+from regex_safety import FILTER_BUDGET_MS, check_pattern, measure_isolated
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+MODES = ('include', 'exclude')
+
+# 旧配置的单个 filter 字符串迁移后的规则名，/api/filter 的 pattern 参数也读写这条规则
+LEGACY_RULE = 'filter'
+
+# 关键词不超过这个数量时逐个用 in 判断，更多时合并成一个正则
+_KEYWORD_IN_LIMIT = 4
+
+# 单条弹幕执行一个正则的时间预算（秒）
+_BUDGET = FILTER_BUDGET_MS / 1000
+
+
+def normalize_rule(rule, index=0, disable_unsafe=False):
+    """校验并规范化一条规则，返回新的字典；规则不合法时抛出 ValueError。
+    正则可能灾难性回溯时同样抛出 ValueError，disable_unsafe 为真时改为保留并停用这条规则"""
+    if not isinstance(rule, dict):
+        raise ValueError(f"第 {index + 1} 条规则格式错误")
+    name = str(rule.get('name') or f"rule{index + 1}")
+    mode = rule.get('mode', 'include')
+    if mode not in MODES:
+        raise ValueError(f"规则 {name}: 未知的 mode {mode!r}（可选 include、exclude）")
+
+    normalized = {'name': name, 'mode': mode}
+    pattern = rule.get('pattern')
+    keywords = rule.get('keywords')
+    if pattern and keywords:
+        raise ValueError(f"规则 {name}: pattern 和 keywords 只能选一个")
+    if pattern:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"规则 {name}: 正则表达式错误: {e}") from None
+        normalized['pattern'] = pattern
+        problem = check_pattern(pattern) if rule.get('enabled') is not False else None
+        if problem and not disable_unsafe:
+            raise ValueError(f"规则 {name}: 正则可能出现灾难性回溯（{problem}）")
+        if problem:
+            rule = dict(rule, enabled=False, disabled_reason=f"正则可能出现灾难性回溯（{problem}）")
+    elif keywords:
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        keywords = [str(keyword) for keyword in keywords if str(keyword)]
+        if not keywords:
+            raise ValueError(f"规则 {name}: 关键词为空")
+        normalized['keywords'] = keywords
+    else:
+        raise ValueError(f"规则 {name}: 需要 pattern 或 keywords")
+
+    rooms = rule.get('rooms')
+    if rooms:
+        normalized['rooms'] = [str(room_id) for room_id in rooms]
+    if rule.get('enabled') is False:
+        normalized['enabled'] = False
+        if rule.get('disabled_reason'):
+            normalized['disabled_reason'] = str(rule['disabled_reason'])
+    return normalized
+
+
+def migrate_filter(pattern):
+    """旧配置的单个正则字符串 -> 规则列表"""
+    if not pattern:
+        return []
+    return [{'name': LEGACY_RULE, 'mode': 'include', 'pattern': pattern}]
+
+
+def _subpatterns(av):
+    """sre_parse 节点参数中嵌套的子表达式"""
+    if isinstance(av, sre_parse.SubPattern):
+        yield av
+    elif isinstance(av, (list, tuple)):
+        for item in av:
+            yield from _subpatterns(item)
+
+
+def _has_groupref(parsed):
+    for op, av in parsed:
+        if op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            return True
+        if any(_has_groupref(sub) for sub in _subpatterns(av)):
+            return True
+    return False
+
+
+def _mergeable(pattern):
+    """能否和其他正则合并成 (?:a)|(?:b)：含全局内联标志（如 (?i)）、反向引用或命名分组
+    （合并后可能重名）时不能合并"""
+    parsed = sre_parse.parse(pattern)
+    return not (parsed.state.flags & ~re.UNICODE or parsed.state.groupdict or _has_groupref(parsed))
+
+
+def _compile_matchers(rules, sources):
+    """同一类（包含或排除）的规则 -> (关键词判断函数, 正则判断函数)，都按开销从小到大排列，任一返回真即命中。
+    sources 中记录每个正则判断函数来自哪些规则"""
+    keywords = []
+    merged = []
+    separate = []
+    for rule in rules:
+        if 'keywords' in rule:
+            keywords.extend(rule['keywords'])
+        elif _mergeable(rule['pattern']):
+            merged.append(rule)
+        else:
+            separate.append(rule)
+
+    keyword_matchers = []
+    keywords = list(dict.fromkeys(keywords))
+    if keywords and len(keywords) <= _KEYWORD_IN_LIMIT:
+        words = tuple(keywords)
+        keyword_matchers.append(lambda message: any(word in message for word in words))
+    elif keywords:
+        keyword_matchers.append(re.compile('|'.join(map(re.escape, keywords))).search)
+    pattern_matchers = []
+    if merged:
+        pattern_matchers.append(re.compile('|'.join(f"(?:{rule['pattern']})" for rule in merged)).search)
+        sources[pattern_matchers[-1]] = tuple(merged)
+    for rule in separate:
+        pattern_matchers.append(re.compile(rule['pattern']).search)
+        # 相同的正则来自 re 的缓存，判断函数相等
+        sources[pattern_matchers[-1]] = sources.get(pattern_matchers[-1], ()) + (rule,)
+    return tuple(keyword_matchers), tuple(pattern_matchers)
+
+
+def _has_literal_prefix(pattern):
+    """正则以字面量开头时 sre 自己会先查找这个前缀；多个正则合并成分支后就没有共同前缀了"""
+    parsed = sre_parse.parse(pattern)
+    return bool(parsed) and parsed[0][0] is sre_parse.LITERAL and not parsed.state.flags & re.IGNORECASE
+
+
+def _compile_prefilter(rules):
+    """同一类规则中正则的字面量预过滤：返回 f(message)，为假时这些正则都不可能命中。
+    没有正则、只有一个以字面量开头的正则，或有正则确定不了必需字面量时返回 None"""
+    patterns = [rule['pattern'] for rule in rules if 'pattern' in rule]
+    if not patterns or len(patterns) == 1 and _has_literal_prefix(patterns[0]):
+        return None
+    literals = set()
+    for pattern in patterns:
+        required = required_literals(pattern)
+        if not required:
+            return None
+        literals.update(required)
+    return literal_matcher(literals)
+
+
+class FilterPlan:
+    """一个直播间的执行计划；on_slow(rules, message, elapsed) 在某个正则单条弹幕超过时间预算后调用"""
+
+    __slots__ = ('exclude', 'exclude_patterns', 'exclude_prefilter',
+                 'include', 'include_patterns', 'include_prefilter', 'prefiltered', 'sources', 'on_slow')
+
+    def __init__(self, rules, prefilter=True, on_slow=None):
+        active = [rule for rule in rules if rule.get('enabled', True)]
+        exclude = [rule for rule in active if rule['mode'] == 'exclude']
+        include = [rule for rule in active if rule['mode'] == 'include']
+        self.sources = {}  # {正则判断函数: 来源规则}
+        self.exclude, self.exclude_patterns = _compile_matchers(exclude, self.sources)
+        self.include, self.include_patterns = _compile_matchers(include, self.sources)
+        self.exclude_prefilter = _compile_prefilter(exclude) if prefilter else None
+        self.include_prefilter = _compile_prefilter(include) if prefilter else None
+        self.prefiltered = 0  # 包含规则的预过滤直接拒绝（没执行正则）的弹幕数
+        self.on_slow = on_slow
+
+    def _search(self, matchers, message):
+        """依次执行正则，记录超过时间预算的正则"""
+        for match in matchers:
+            start = time.perf_counter()
+            hit = match(message)
+            elapsed = time.perf_counter() - start
+            if elapsed > _BUDGET and self.on_slow is not None:
+                self.on_slow(self.sources[match], message, elapsed)
+            if hit:
+                return True
+        return False
+
+    def allows(self, message):
+        for match in self.exclude:
+            if match(message):
+                return False
+        if self.exclude_patterns and (self.exclude_prefilter is None or self.exclude_prefilter(message)):
+            if self._search(self.exclude_patterns, message):
+                return False
+        if not (self.include or self.include_patterns):
+            return True
+        for match in self.include:
+            if match(message):
+                return True
+        if not self.include_patterns:
+            return False
+        if self.include_prefilter is not None and not self.include_prefilter(message):
+            self.prefiltered += 1
+            return False
+        return self._search(self.include_patterns, message)
+
+
+class FilterEngine:
+    """过滤规则（线程安全）：set_rules 编译新计划后整体替换，allows 无锁读取。
+    超时规则被自动停用后在复核线程中调用 on_disable(规则名列表)，用于保存配置"""
+
+    def __init__(self, rules=()):
+        self._lock = threading.RLock()
+        self._state = ([], {}, FilterPlan([]))  # (规则, {room_id: 计划}, 全局计划)
+        self.checked = 0
+        self.rejected = 0
+        self.slow = 0  # 正则超过时间预算的次数
+        self.auto_disabled = []  # 自动停用的规则名
+        self.on_disable = None
+        self._reviews = queue.Queue()  # 等待复核的 (来源规则, 弹幕, 耗时)
+        self._reviewing = set()  # 已在等待或正在复核的规则（id）
+        self._reviewer = None
+        self.set_rules(rules)
+
+    def set_rules(self, rules, disable_unsafe=False):
+        """替换全部规则，任意一条不合法时抛出 ValueError 且不修改当前规则；
+        disable_unsafe 为真时可能灾难性回溯的正则规则保留但停用（加载已保存的配置时使用）"""
+        rules = [normalize_rule(rule, i, disable_unsafe) for i, rule in enumerate(rules or [])]
+        global_rules = [rule for rule in rules if 'rooms' not in rule]
+        room_ids = {room_id for rule in rules for room_id in rule.get('rooms', ())}
+        plans = {room_id: FilterPlan(global_rules + [rule for rule in rules if room_id in rule.get('rooms', ())],
+                                     on_slow=self._on_slow)
+                 for room_id in room_ids}
+        with self._lock:
+            self._state = (rules, plans, FilterPlan(global_rules, on_slow=self._on_slow))
+        return rules
+
+    def _on_slow(self, sources, message, elapsed):
+        """正则单条弹幕超过时间预算（在过滤弹幕的线程中调用）：只交给复核线程，同一条规则同时只复核一次"""
+        self.slow += 1
+        with self._lock:
+            sources = tuple(rule for rule in sources if id(rule) not in self._reviewing)
+            if not sources:
+                return
+            self._reviewing.update(id(rule) for rule in sources)
+            if self._reviewer is None:
+                self._reviewer = threading.Thread(target=self._run_reviewer, daemon=True)
+                self._reviewer.start()
+        self._reviews.put((sources, message, elapsed))
+
+    def _run_reviewer(self):
+        while True:
+            sources, message, elapsed = self._reviews.get()
+            try:
+                self._review(sources, message, elapsed)
+            except Exception as e:
+                print(f"❌ 复核过滤规则失败: {e}")
+            finally:
+                with self._lock:
+                    self._reviewing.difference_update(id(rule) for rule in sources)
+
+    def _review(self, sources, message, elapsed):
+        """在复核线程中用子进程逐条复核这条弹幕，确实超时的规则停用后整体替换计划。
+        只在过滤线程中测得的耗时可能包含等待 GIL 的时间，复核不超时的规则保留"""
+        timed_out = []
+        for rule in sources:
+            try:
+                if measure_isolated(rule['pattern'], [message], _BUDGET) is None:
+                    timed_out.append(rule)
+            except (OSError, RuntimeError) as e:
+                print(f"⚠️  无法复核过滤规则 {rule['name']}: {e}")
+        if not timed_out:
+            names = [rule['name'] for rule in sources]
+            print(f"⚠️  过滤规则 {', '.join(names)} 耗时 {elapsed * 1000:.0f}ms 超过预算，复核未超时，保留")
+            return
+
+        reason = f"单条弹幕执行超过 {FILTER_BUDGET_MS:g}ms，已自动停用"
+        with self._lock:
+            # 复核期间规则可能已被替换，只停用仍在使用的规则
+            current = self._state[0]
+            timed_out = [rule for rule in timed_out if any(rule is active for active in current)]
+            if not timed_out:
+                return
+            self.set_rules([dict(rule, enabled=False, disabled_reason=reason)
+                            if any(rule is slow for slow in timed_out) else rule for rule in current])
+            names = [rule['name'] for rule in timed_out]
+            self.auto_disabled.extend(names)
+        print(f"🚫 过滤规则 {', '.join(names)} {reason}")
+        if self.on_disable is not None:
+            self.on_disable(names)
+
+    def set_legacy_pattern(self, pattern):
+        """设置或清除 LEGACY_RULE 这条全局正则规则，保留其他规则"""
+        with self._lock:
+            rules = [rule for rule in self._state[0] if rule['name'] != LEGACY_RULE]
+            if pattern:
+                rules.insert(0, migrate_filter(pattern)[0])
+            return self.set_rules(rules)
+
+    def legacy_pattern(self):
+        """LEGACY_RULE 规则的正则，没有时为 None（兼容只认识单个过滤器的前端）"""
+        for rule in self._state[0]:
+            if rule['name'] == LEGACY_RULE and 'pattern' in rule and 'rooms' not in rule:
+                return rule['pattern']
+        return None
+
+    @property
+    def rules(self):
+        return [dict(rule) for rule in self._state[0]]
+
+    def allows(self, message, room_id=None):
+        """弹幕能否通过 room_id 所在直播间的规则"""
+        _, plans, default = self._state
+        plan = plans.get(room_id, default)
+        self.checked += 1
+        if plan.allows(message):
+            return True
+        self.rejected += 1
+        return False
+
+    def stats(self):
+        rules, plans, default = self._state
+        return {
+            'rules': len(rules),
+            'room_plans': len(plans),
+            'checked': self.checked,
+            'rejected': self.rejected,
+            'prefiltered': default.prefiltered + sum(plan.prefiltered for plan in plans.values()),
+            'budget_ms': FILTER_BUDGET_MS,
+            'slow': self.slow,
+            'auto_disabled': list(self.auto_disabled),
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_filter_engine():
+    """获取进程内共享的过滤规则"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = FilterEngine()
+    return _engine
@@ -0,0 +1,87 @@
+"""
+共享定时刷新线程
+礼物连击合并、点赞窗口合并等需要按时间把缓存的数据交出去，所有直播间共用一个线程
+每隔 tick 秒调用一次登记的回调，代替每个直播间一个定时器
+"""
+import os
+import threading
+import time
+
+# 刷新间隔（秒）
+FLUSH_TICK = float(os.environ.get('DOUYIN_FLUSH_TICK', 0.2))
+
+
+class FlushHandle:
+    """定时器中的一个回调，cancel() 后不再调用"""
+
+    __slots__ = ('callback', 'cancelled', '_timer')
+
+    def __init__(self, timer, callback):
+        self._timer = timer
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        """取消（可以重复调用）"""
+        if not self.cancelled:
+            self.cancelled = True
+            self._timer.remove(self)
+
+
+class FlushTimer:
+    """共享定时刷新线程（线程安全）"""
+
+    def __init__(self, tick=FLUSH_TICK):
+        self.tick = tick
+        self._handles = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.errors = 0
+
+    def add(self, callback):
+        """登记回调，每个 tick 调用一次 callback(time.monotonic())，返回 FlushHandle"""
+        handle = FlushHandle(self, callback)
+        with self._lock:
+            self._handles.add(handle)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="flush-timer", daemon=True)
+                self._thread.start()
+        return handle
+
+    def remove(self, handle):
+        with self._lock:
+            self._handles.discard(handle)
+
+    def stats(self):
+        with self._lock:
+            active = len(self._handles)
+        return {'active': active, 'tick': self.tick, 'errors': self.errors}
+
+    def _run(self):
+        while True:
+            time.sleep(self.tick)
+            with self._lock:
+                handles = list(self._handles)
+            now = time.monotonic()
+            for handle in handles:
+                if handle.cancelled:
+                    continue
+                try:
+                    handle.callback(now)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"❌ 定时刷新失败: {e}")
+
+
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def get_flush_timer():
+    """获取进程内共享的定时刷新线程"""
+    global _timer
+    if _timer is None:
+        with _timer_lock:
+            if _timer is None:
+                _timer = FlushTimer()
+    return _timer
@@ -1,18 +1,24 @@
 """
 获取抖音直播间的真实 room_id
 """
-import json
 import hashlib
 import random
 import string
-from urllib.request import Request, urlopen
 from urllib.parse import urlencode
-import execjs
-import os
+from signer_pool import get_signer_pool
+from signer_client import get_signer_client, SignerUnavailable
+from room_cache import get_room_cache
+from http_client import get_http_client
 
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.5845.97 Safari/537.36 Core/1.116.567.400 QQBrowser/19.7.6764.400"
 DEFAULT_COOKIE = "ttwid=1%7CB1qls3GdnZhUov9o2NxOMxxYS2ff6OSvEWbv0ytbES4%7C1680522049%7C280d802d6d478e3e78d0c807f7c487e7ffec0ae4e5fdd6a0fe74c3c6af149511"
 
+# live.douyin.com 接口请求共用的请求头
+API_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Cookie": DEFAULT_COOKIE,
+}
+
 
 def generate_ms_token(length=107):
     """生成随机 msToken"""
@@ -20,30 +26,27 @@ def generate_ms_token(length=107):
     return ''.join(random.choice(characters) for _ in range(length))
 
 
+def compute_abogus(query, user_agent):
+    """计算 a_bogus（优先使用本机的签名守护进程，没有时在进程内计算）"""
+    try:
+        return get_signer_client().request("a_bogus", query=query, user_agent=user_agent)
+    except SignerUnavailable:
+        return get_signer_pool().call("getABogus", query, user_agent)
+
+
 def get_abogus_signature(url, user_agent):
     """
     生成 a_bogus 签名（用于 API 请求）
     """
-    js_path = os.path.join(os.path.dirname(__file__), 'douyin_sdk.js')
-
-    if not os.path.exists(js_path):
-        raise FileNotFoundError(f"JS SDK file not found at {js_path}")
-
-    with open(js_path, 'r', encoding='utf-8') as f:
-        js_code = f.read()
-
-    # 加载 JS SDK 中的 getABogus 函数
     # 注意：douyin_sdk.js 中应该包含 getABogus 函数
     # 如果没有，需要从 pure_live 的 douyin_sign.dart 中提取 kABogus 部分
 
-    ctx = execjs.compile(js_code)
-
     ms_token = generate_ms_token(107)
     params = f'{url}&msToken={ms_token}'.split('?')[1]
     query = params.split("?")[1] if "?" in params else params
 
     try:
-        a_bogus = ctx.call("getABogus", query, user_agent)
+        a_bogus = compute_abogus(query, user_agent)
         new_url = f'{url}&msToken={ms_token}&a_bogus={a_bogus}'
         return new_url
     except Exception as e:
@@ -52,12 +55,16 @@ def get_abogus_signature(url, user_agent):
         return url
 
 
-def get_real_room_id(web_rid):
+def get_real_room_id(web_rid, use_cache=True, need_status=True, quiet=False):
     """
     通过 web_rid 获取真实的 room_id
 
     Args:
         web_rid: 网页 URL 中的 ID（如 4253196531）
+        use_cache: 是否使用房间缓存（False 时强制请求接口并刷新缓存）
+        need_status: 是否需要最新的直播状态；只需要 room_id/主播时传 False，
+                     缓存的稳定字段有效就直接返回
+        quiet: 状态轮询用：只打印错误，结果只写入内存中的房间缓存（由调用方统一保存）
 
     Returns:
         dict: {
@@ -68,8 +75,16 @@ def get_real_room_id(web_rid):
             'owner': 主播信息
         }
     """
-    print(f"🔍 正在获取房间信息...")
-    print(f"📺 Web RID: {web_rid}")
+    if use_cache:
+        cached = get_room_cache().get(web_rid, need_status)
+        if cached:
+            if not quiet:
+                print(f"✅ 命中房间缓存: {web_rid} -> {cached['room_id']}")
+            return cached
+
+    if not quiet:
+        print(f"🔍 正在获取房间信息...")
+        print(f"📺 Web RID: {web_rid}")
 
     # 构建 API URL
     api_url = "https://live.douyin.com/webcast/room/web/enter/"
@@ -98,53 +113,51 @@ def get_real_room_id(web_rid):
     # 尝试添加 a_bogus 签名
     try:
         url = get_abogus_signature(url, USER_AGENT)
-        print(f"✅ 已添加 a_bogus 签名")
+        if not quiet:
+            print(f"✅ 已添加 a_bogus 签名")
     except Exception as e:
         print(f"⚠️  跳过 a_bogus 签名: {e}")
 
-    # 发送请求
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Cookie": DEFAULT_COOKIE,
-        "Referer": f"https://live.douyin.com/{web_rid}",
-    }
+    # 发送请求（复用 keep-alive 连接和默认请求头）
+    headers = dict(API_HEADERS, Referer=f"https://live.douyin.com/{web_rid}")
 
     try:
-        req = Request(url, headers=headers)
-        with urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode('utf-8'))
-
-            if data.get("status_code") != 0:
-                print(f"❌ API 返回错误: {data.get('status_msg', 'Unknown error')}")
-                return None
+        data = get_http_client().get_json(url, headers)
+        if data.get("status_code") != 0:
+            print(f"❌ API 返回错误 ({web_rid}): {data.get('status_msg', 'Unknown error')}")
+            return None
 
-            room_data = data["data"]["data"][0]
-            user_data = data["data"]["user"]
+        room_data = data["data"]["data"][0]
+        user_data = data["data"]["user"]
 
-            room_id = room_data["id_str"]
-            title = room_data.get("title", "")
-            status = room_data.get("status", 0)  # 2 = 直播中
-            owner = room_data.get("owner", {})
+        room_id = room_data["id_str"]
+        title = room_data.get("title", "")
+        status = room_data.get("status", 0)  # 2 = 直播中
+        owner = room_data.get("owner", {})
 
+        if not quiet:
             print(f"✅ 获取成功！")
             print(f"📺 真实 room_id: {room_id}")
             print(f"📝 标题: {title}")
             print(f"👤 主播: {owner.get('nickname', 'Unknown')}")
             print(f"🔴 状态: {'直播中' if status == 2 else '未开播'}")
 
-            return {
-                "room_id": room_id,
-                "web_rid": web_rid,
-                "title": title,
-                "status": status,
-                "owner": owner,
-                "user_data": user_data,
-            }
+        result = {
+            "room_id": room_id,
+            "web_rid": web_rid,
+            "title": title,
+            "status": status,
+            "owner": owner,
+            "user_data": user_data,
+        }
+        get_room_cache().put(result, persist=not quiet)
+        return result
 
     except Exception as e:
-        print(f"❌ 请求失败: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"❌ 请求失败 ({web_rid}): {e}")
+        if not quiet:
+            import traceback
+            traceback.print_exc()
         return None
 
 
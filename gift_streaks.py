@@ -0,0 +1,184 @@
+"""
+礼物连击合并
+连击礼物的每一下都是一条 GiftMessage（repeatCount 为当前累计次数，最后一条 repeatEnd=1），
+这里把同一用户、同一礼物、同一 groupId 的连击合并为一个事件：连击期间原地更新，
+收到 repeatEnd 或超过 GIFT_STREAK_TIMEOUT 秒没有新消息时交出一次
+"""
+import itertools
+import os
+import threading
+import time
+
+# 连击超过这个时间（秒）没有新消息就视为结束
+GIFT_STREAK_TIMEOUT = float(os.environ.get('DOUYIN_GIFT_STREAK_TIMEOUT', 3))
+
+_streak_ids = itertools.count(1)
+
+
+def gift_fields(gift_msg):
+    """GiftMessage 中连击合并用到的字段（GiftStreakAggregator.add 的参数），解码进程池中也用它提取"""
+    gift = gift_msg.gift
+    return {
+        'user_id': gift_msg.user.id,
+        'user': gift_msg.user.nickName,
+        'gift_id': gift_msg.giftId or gift.id,
+        'group_id': gift_msg.groupId,
+        'repeat_count': gift_msg.repeatCount,
+        'group_count': gift_msg.groupCount,
+        'repeat_end': gift_msg.repeatEnd == 1,
+        'combo': gift.combo,
+        'gift_name': gift.name,
+        'diamonds': gift.diamondCount,
+    }
+
+
+class GiftStreak:
+    """一次连击，连击期间原地更新"""
+
+    __slots__ = ('streak_id', 'user_id', 'user', 'gift_id', 'gift_name', 'diamonds', 'group_id',
+                 'group_count', 'repeat_count', 'messages', 'started_at', 'updated_at', 'ended', 'reason',
+                 'emitted_count')
+
+    def __init__(self, user_id, user, gift_id, gift_name, diamonds, group_id, group_count, now):
+        self.streak_id = next(_streak_ids)
+        self.user_id = user_id
+        self.user = user
+        self.gift_id = gift_id
+        self.gift_name = gift_name
+        self.diamonds = diamonds
+        self.group_id = group_id
+        self.group_count = group_count
+        self.repeat_count = 0
+        self.messages = 0
+        self.started_at = now
+        self.updated_at = now
+        self.ended = False
+        self.reason = None
+        self.emitted_count = 0  # 上次交出时的累计次数
+
+    @property
+    def count(self):
+        """礼物总个数（连击次数 × 每次个数）"""
+        return self.repeat_count * self.group_count
+
+    def to_dict(self):
+        return {
+            'streak_id': self.streak_id,
+            'user_id': self.user_id,
+            'user': self.user,
+            'gift_id': self.gift_id,
+            'gift_name': self.gift_name,
+            'group_count': self.group_count,
+            'repeat_count': self.repeat_count,
+            'count': self.count,
+            'diamonds': self.diamonds * self.count,
+            'messages': self.messages,
+            'duration': round(self.updated_at - self.started_at, 3),
+            'ended': self.ended,
+            'reason': self.reason,
+        }
+
+
+class GiftStreakAggregator:
+    """一个直播间的连击合并（线程安全），连击结束时在调用 add / flush 的线程中调用 on_streak(GiftStreak)"""
+
+    def __init__(self, on_streak, timeout=GIFT_STREAK_TIMEOUT):
+        self.on_streak = on_streak
+        self.timeout = timeout
+        self.messages = 0
+        self.emitted = 0
+        self.timeouts = 0
+        self.reopened = 0
+        self._active = {}  # (user_id, gift_id, group_id) -> GiftStreak
+        # 超时交出的连击保留一个超时周期：之后到达的同一连击继续累计，次数增加时用同一 streak_id 再交出一次
+        self._recent = {}
+        self._lock = threading.Lock()
+
+    def add_message(self, gift_msg, now=None):
+        """加入一条 GiftMessage"""
+        self.add(now=now, **gift_fields(gift_msg))
+
+    def add(self, user_id, user, gift_id, group_id, repeat_count, group_count=1, repeat_end=False,
+            combo=True, gift_name='', diamonds=0, now=None):
+        """加入连击中的一下，repeat_count 为当前累计次数；非连击礼物立即交出"""
+        now = time.monotonic() if now is None else now
+        key = (user_id, gift_id, group_id)
+        with self._lock:
+            self.messages += 1
+            streak = self._active.get(key)
+            if streak is None:
+                streak = self._recent.pop(key, None)
+                if streak is not None and (repeat_count or 1) >= streak.repeat_count:
+                    streak.ended = False
+                    self.reopened += 1
+                else:
+                    streak = GiftStreak(user_id, user, gift_id, gift_name, diamonds, group_id,
+                                        group_count or 1, now)
+                self._active[key] = streak
+
+            # 消息可能乱序到达，只取更大的累计次数
+            streak.repeat_count = max(streak.repeat_count, repeat_count or 1)
+            streak.messages += 1
+            streak.updated_at = now
+            if combo and not repeat_end:
+                return
+            del self._active[key]
+            if not self._finish(streak, 'end'):
+                return
+
+        self.on_streak(streak)
+
+    def flush_expired(self, now=None):
+        """交出超时的连击（由共享定时线程调用）"""
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._lock:
+            for key, streak in list(self._active.items()):
+                if now - streak.updated_at >= self.timeout:
+                    del self._active[key]
+                    self._recent[key] = streak
+                    if self._finish(streak, 'timeout'):
+                        self.timeouts += 1
+                        expired.append(streak)
+            for key, streak in list(self._recent.items()):
+                if now - streak.updated_at >= 2 * self.timeout:
+                    del self._recent[key]
+
+        for streak in expired:
+            self.on_streak(streak)
+
+    def flush_all(self):
+        """交出全部未结束的连击（关闭连接时）"""
+        with self._lock:
+            streaks = [streak for streak in self._active.values() if self._finish(streak, 'close')]
+            self._active.clear()
+            self._recent.clear()
+
+        for streak in streaks:
+            self.on_streak(streak)
+
+    def _finish(self, streak, reason):
+        """结束连击，返回是否需要交出：超时交出后次数没有增加的（例如随后到达的 repeatEnd）不再交出"""
+        streak.ended = True
+        if streak.repeat_count <= streak.emitted_count:
+            return False
+        streak.reason = reason
+        streak.emitted_count = streak.repeat_count
+        self.emitted += 1
+        return True
+
+    def active(self):
+        """正在进行的连击"""
+        with self._lock:
+            return [streak.to_dict() for streak in self._active.values()]
+
+    def stats(self):
+        with self._lock:
+            active = len(self._active)
+        return {
+            'messages': self.messages,
+            'emitted': self.emitted,
+            'active': active,
+            'timeouts': self.timeouts,
+            'reopened': self.reopened,
+        }
@@ -0,0 +1,112 @@
+"""
+共享心跳调度器
+一个时间轮线程为所有线程版接收器发送心跳，代替每个连接一个 sleep 循环的心跳线程。
+心跳间隔被分成若干格，新连接放进当前最空的格子，发送均匀分散在整个间隔内
+"""
+import os
+import threading
+import time
+
+# 时间轮每格的时长（秒），心跳间隔 / 每格时长 = 格数
+HEARTBEAT_TICK = float(os.environ.get('DOUYIN_HEARTBEAT_TICK', 0.5))
+
+
+class HeartbeatHandle:
+    """调度器中的一条心跳任务，cancel() 后不再发送"""
+
+    __slots__ = ('receiver', 'slot', 'cancelled', '_scheduler')
+
+    def __init__(self, scheduler, receiver, slot):
+        self._scheduler = scheduler
+        self.receiver = receiver
+        self.slot = slot
+        self.cancelled = False
+
+    def cancel(self):
+        """取消心跳（可以重复调用）"""
+        if not self.cancelled:
+            self.cancelled = True
+            self._scheduler.remove(self)
+
+
+class HeartbeatScheduler:
+    """时间轮心跳调度器（线程安全）"""
+
+    def __init__(self, interval, tick=HEARTBEAT_TICK):
+        self.interval = interval
+        self.tick = tick
+        self._slots = [set() for _ in range(max(1, round(interval / tick)))]
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self.sent = 0
+        self.errors = 0
+
+    def add(self, receiver):
+        """登记接收器，每个心跳间隔调用一次 receiver.heartbeat()，返回 HeartbeatHandle"""
+        with self._lock:
+            # 放进最空的格子；格子数相同时选离下一次转到最远的，新连接刚发过 hb 帧
+            count = len(self._slots)
+            slot = min(range(count),
+                       key=lambda i: (len(self._slots[i]), -((i - self._cursor) % count)))
+            handle = HeartbeatHandle(self, receiver, slot)
+            self._slots[slot].add(handle)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return handle
+
+    def remove(self, handle):
+        with self._lock:
+            self._slots[handle.slot].discard(handle)
+
+    def stats(self):
+        with self._lock:
+            active = sum(len(slot) for slot in self._slots)
+            busiest = max(len(slot) for slot in self._slots)
+        return {
+            'active': active,
+            'slots': len(self._slots),
+            'busiest_slot': busiest,
+            'sent': self.sent,
+            'errors': self.errors,
+        }
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.tick
+            with self._lock:
+                due = list(self._slots[self._cursor])
+                self._cursor = (self._cursor + 1) % len(self._slots)
+
+            for handle in due:
+                if handle.cancelled:
+                    continue
+                try:
+                    handle.receiver.heartbeat()
+                    self.sent += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"❌ 心跳发送失败: {e}")
+
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # 落后太多（例如进程被挂起）时不补发，从现在重新计时
+                next_tick = time.monotonic()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_heartbeat_scheduler(interval):
+    """获取进程内共享的心跳调度器（interval 只在第一次创建时生效）"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = HeartbeatScheduler(interval)
+    return _scheduler
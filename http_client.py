@@ -0,0 +1,202 @@
+"""
+共享 HTTP 客户端
+按域名维护 keep-alive 连接池，复用 TCP/TLS 连接以及默认的请求头和 Cookie，
+live.douyin.com 的接口请求（房间解析、状态轮询）都通过它发送。
+
+和 urlopen 一样读取 HTTP_PROXY / HTTPS_PROXY / NO_PROXY（urllib.request.getproxies）：
+HTTPS 通过代理的 CONNECT 隧道，HTTP 向代理发送完整 URL；只支持 http:// 代理
+"""
+import base64
+import gzip
+import http.client
+import json
+import os
+import queue
+import ssl
+import threading
+import time
+import urllib.request
+from urllib.parse import urlsplit, unquote
+
+# 每个域名保留的空闲连接数
+HTTP_POOL_SIZE = int(os.environ.get('DOUYIN_HTTP_POOL_SIZE', 8))
+
+# 连接和读取超时（秒）
+HTTP_TIMEOUT = float(os.environ.get('DOUYIN_HTTP_TIMEOUT', 10))
+
+# 连接失败或网关错误时的重试次数
+HTTP_RETRIES = int(os.environ.get('DOUYIN_HTTP_RETRIES', 1))
+
+# 这些状态码视为临时错误，GET 请求会重试
+RETRY_STATUSES = (502, 503, 504)
+
+# keep-alive 连接被服务端关闭时会抛出这些异常，换一条新连接重试
+_CONNECTION_ERRORS = (http.client.HTTPException, OSError)
+
+
+class HttpError(Exception):
+    """HTTP 状态码不是 2xx"""
+
+    def __init__(self, status, reason, body=b''):
+        super().__init__(f"HTTP {status} {reason}")
+        self.status = status
+        self.body = body
+
+
+class HttpClient:
+    """带 keep-alive 连接池的 HTTP 客户端（线程安全）"""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES,
+                 headers=None, ssl_context=None, proxies=None):
+        """
+        headers: 每个请求都带上的默认请求头（如 User-Agent、Cookie）
+        proxies: {scheme: 代理 URL}，默认读取环境变量
+        """
+        self.proxies = urllib.request.getproxies() if proxies is None else proxies
+        self._routes = {}  # {(scheme, host, port): (代理主机, 代理端口, 代理认证头) 或 None}
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.headers = {"Accept-Encoding": "gzip"}
+        if headers:
+            self.headers.update(headers)
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._pools = {}  # {(scheme, host, port): LifoQueue[连接]}
+        self._lock = threading.Lock()
+
+    def _pool(self, key):
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue(maxsize=self.pool_size)
+            return self._pools[key]
+
+    def _route(self, key):
+        """目标地址使用的代理，直连时返回 None"""
+        if key not in self._routes:
+            scheme, host, _ = key
+            proxy = self.proxies.get(scheme)
+            if proxy and 'no' in self.proxies and urllib.request.proxy_bypass_environment(host, self.proxies):
+                proxy = None
+            route = None
+            if proxy:
+                parts = urlsplit(proxy if '://' in proxy else f"http://{proxy}")
+                if parts.scheme != 'http':
+                    raise ValueError(f"不支持的代理: {proxy}（只支持 http:// 代理）")
+                auth = {}
+                if parts.username:
+                    credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+                    auth['Proxy-Authorization'] = 'Basic ' + base64.b64encode(credentials.encode()).decode()
+                route = (parts.hostname, parts.port or 80, auth)
+            self._routes[key] = route
+        return self._routes[key]
+
+    def _connect(self, key):
+        scheme, host, port = key
+        route = self._route(key)
+        if route is None:
+            if scheme == 'https':
+                return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self.ssl_context)
+            return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+        proxy_host, proxy_port, auth = route
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=self.timeout,
+                                               context=self.ssl_context)
+            conn.set_tunnel(host, port, headers=auth)
+            return conn
+        return http.client.HTTPConnection(proxy_host, proxy_port, timeout=self.timeout)
+
+    def _release(self, key, conn):
+        try:
+            self._pool(key).put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method, url, headers=None, body=None):
+        """发送请求，返回 (状态码, 响应头, 响应体)"""
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'https'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        merged = dict(self.headers)
+        if headers:
+            merged.update(headers)
+        route = self._route(key)
+        if route is not None and scheme == 'http':
+            # 经过代理的 HTTP 请求使用完整 URL
+            path = f"http://{parts.netloc}{path}"
+            merged.update(route[2])
+
+        for attempt in range(self.retries + 1):
+            try:
+                conn = self._pool(key).get_nowait()
+            except queue.Empty:
+                conn = self._connect(key)
+
+            try:
+                conn.request(method, path, body=body, headers=merged)
+                response = conn.getresponse()
+                data = response.read()
+            except _CONNECTION_ERRORS:
+                conn.close()
+                # 只有幂等请求才重试
+                if attempt == self.retries or method not in ('GET', 'HEAD'):
+                    raise
+                # 空闲连接可能已被服务端关闭，第一次立即换新连接重试
+                if attempt:
+                    time.sleep(0.2 * 2 ** (attempt - 1))
+                continue
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+
+            if response.getheader('Content-Encoding') == 'gzip':
+                data = gzip.decompress(data)
+
+            if response.status in RETRY_STATUSES and method == 'GET' and attempt < self.retries:
+                time.sleep(0.2 * 2 ** attempt)
+                continue
+
+            return response.status, response.headers, data
+
+    def get(self, url, headers=None):
+        """GET 请求，非 2xx 时抛出 HttpError，返回响应体"""
+        status, response_headers, data = self.request('GET', url, headers)
+        if not 200 <= status < 300:
+            raise HttpError(status, http.client.responses.get(status, ''), data)
+        return data
+
+    def get_json(self, url, headers=None):
+        """GET 请求并解析 JSON"""
+        return json.loads(self.get(url, headers).decode('utf-8'))
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """获取进程内共享的 HTTP 客户端"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,69 @@
+"""
+JSON 缓存文件的保存
+多个线程（以及共用同一路径的多个进程）会同时保存同一个缓存文件：每次写入同目录下唯一的临时文件
+再原子替换，读取方不会看到写了一半的文件；短时间内的多次修改合并为一次保存
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+
+# 缓存修改后延迟保存的时间（秒），期间的修改合并为一次写入；0 表示每次修改立即保存
+CACHE_SAVE_DELAY = float(os.environ.get('DOUYIN_CACHE_SAVE_DELAY', 1))
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """写入 JSON：先写同目录下唯一的临时文件，再用 os.replace 替换"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DebouncedSaver:
+    """合并保存请求：request() 后 delay 秒内的请求只调用一次 save()；进程退出时保存未保存的修改"""
+
+    def __init__(self, save, delay=CACHE_SAVE_DELAY):
+        self.save = save
+        self.delay = delay
+        self.requests = 0
+        self.saves = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        atexit.register(self.flush)
+
+    def request(self):
+        """标记有修改，delay 秒后保存"""
+        with self._lock:
+            self.requests += 1
+            self._dirty = True
+            if self._timer is not None:
+                return
+            if self.delay > 0:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """立即保存未保存的修改"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+        self.save()
+        self.saves += 1
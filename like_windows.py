@@ -0,0 +1,106 @@
+"""
+点赞按时间窗口合并
+热门直播间每秒有大量 LikeMessage，逐条推送代价很高。这里按固定窗口（默认 1 秒）累加一个直播间的
+点赞数，每个窗口只交出一个汇总事件；自开始以来的精确累计值一直保存在内存中
+"""
+import os
+import threading
+import time
+
+# 点赞合并窗口（秒）
+LIKE_WINDOW = float(os.environ.get('DOUYIN_LIKE_WINDOW', 1.0))
+
+
+def like_fields(like_msg):
+    """LikeMessage 中窗口合并用到的字段（LikeWindowAggregator.add 的参数），解码进程池中也用它提取"""
+    return {'count': like_msg.count, 'total': like_msg.total, 'user_id': like_msg.user.id}
+
+
+class LikeWindowAggregator:
+    """一个直播间的点赞窗口合并（线程安全），窗口结束时在调用 add / flush 的线程中调用 on_window(dict)"""
+
+    def __init__(self, on_window, window=LIKE_WINDOW):
+        self.on_window = on_window
+        self.window = window
+        # 精确累计：收到的点赞消息数、点赞数，以及服务器下发的直播间总点赞数（取最大值）
+        self.messages = 0
+        self.likes = 0
+        self.room_total = 0
+        self.windows = 0
+        self._start = None  # 当前窗口的开始时间（monotonic），没有数据时为 None
+        self._started_at = None  # 当前窗口的开始时间（time.time）
+        self._count = 0
+        self._window_messages = 0
+        self._users = set()
+        self._lock = threading.Lock()
+
+    def add_message(self, like_msg, now=None):
+        """加入一条 LikeMessage"""
+        self.add(now=now, **like_fields(like_msg))
+
+    def add(self, count, total=0, user_id=0, now=None):
+        now = time.monotonic() if now is None else now
+        closed = None
+        with self._lock:
+            if self._start is not None and now - self._start >= self.window:
+                closed = self._close_window()
+            if self._start is None:
+                # 窗口对齐到 window 的整数倍，所有直播间的窗口边界一致
+                self._start = now - now % self.window
+                self._started_at = time.time() - (now - self._start)
+            self._count += count
+            self._window_messages += 1
+            if user_id:
+                self._users.add(user_id)
+            self.messages += 1
+            self.likes += count
+            if total > self.room_total:
+                self.room_total = total
+
+        if closed is not None:
+            self.on_window(closed)
+
+    def flush(self, now=None):
+        """交出已经结束的窗口（由共享定时线程调用）"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._start is None or now - self._start < self.window:
+                return
+            closed = self._close_window()
+        self.on_window(closed)
+
+    def flush_all(self):
+        """交出当前窗口（关闭连接时）"""
+        with self._lock:
+            if self._start is None:
+                return
+            closed = self._close_window()
+        self.on_window(closed)
+
+    def _close_window(self):
+        """结束当前窗口并返回汇总（调用方持有 self._lock）"""
+        closed = {
+            'start': self._started_at,
+            'window': self.window,
+            'count': self._count,
+            'messages': self._window_messages,
+            'users': len(self._users),
+            'room_total': self.room_total,
+            'likes': self.likes,
+        }
+        self._start = None
+        self._count = 0
+        self._window_messages = 0
+        self._users = set()
+        self.windows += 1
+        return closed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'messages': self.messages,
+                'likes': self.likes,
+                'room_total': self.room_total,
+                'windows': self.windows,
+                'window': self.window,
+            }
@@ -0,0 +1,123 @@
+"""
+正则字面量预过滤
+从正则的语法树（sre_parse）中找出匹配结果必定包含的字面量（例如 王者荣耀【[^】]+】.*?今天\\d+块
+必定包含 "王者荣耀【"），一条弹幕不含任何一个字面量时，对应的正则不可能匹配，不用执行。
+
+判断是否含有字面量：字面量不多时用一个转义后的分支正则（在 C 中执行，短文本上最快）；
+字面量很多时分支正则的耗时随数量线性增长，改用 Aho-Corasick 自动机（耗时只和文本长度有关）
+"""
+import re
+from collections import deque
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# 字面量达到这个数量时改用 Aho-Corasick 自动机（见 benchmarks/prefilter.py）
+AUTOMATON_MIN_LITERALS = 500
+
+_REPEATS = tuple(getattr(sre_parse, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+                 if hasattr(sre_parse, name))
+_ATOMIC_GROUP = getattr(sre_parse, 'ATOMIC_GROUP', None)
+
+
+def required_literals(pattern):
+    """匹配结果必定包含其中至少一个的字面量集合（frozenset），无法确定时返回 None"""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    return _required(parsed)
+
+
+def _required(items):
+    """一段顺序执行的语法节点中最有区分度的必需字面量集合"""
+    candidates = []
+    run = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            candidates.append(frozenset([''.join(run)]))
+            run = []
+
+        if op is sre_parse.SUBPATTERN:
+            _, add_flags, _, sub = av
+            found = None if add_flags & re.IGNORECASE else _required(sub)
+        elif op in _REPEATS:
+            low, _, sub = av
+            found = _required(sub) if low >= 1 else None
+        elif op is sre_parse.BRANCH:
+            branches = [_required(branch) for branch in av[1]]
+            found = frozenset().union(*branches) if all(branches) else None
+        elif op is _ATOMIC_GROUP:
+            found = _required(av)
+        else:
+            # 字符集、任意字符、断言、反向引用等不提供字面量
+            found = None
+        if found:
+            candidates.append(found)
+    if run:
+        candidates.append(frozenset([''.join(run)]))
+
+    # 最短字面量越长越少命中；一样长时选字面量少的
+    return max(candidates, key=lambda literals: (min(map(len, literals)), -len(literals)), default=None)
+
+
+class AhoCorasick:
+    """Aho-Corasick 自动机，contains_any(text) 判断文本是否含有任意一个字面量"""
+
+    def __init__(self, literals):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [False]
+        for literal in literals:
+            state = 0
+            for ch in literal:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(False)
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._output[state] = True
+
+        # 按层构建失败指针
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._output[nxt] = self._output[nxt] or self._output[self._fail[nxt]]
+
+    def contains_any(self, text):
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                return True
+        return False
+
+
+def literal_matcher(literals):
+    """返回判断函数 f(text)：text 含有任意一个字面量时返回值为真"""
+    literals = sorted(set(literals))
+    if len(literals) >= AUTOMATON_MIN_LITERALS:
+        return AhoCorasick(literals).contains_any
+    return re.compile('|'.join(map(re.escape, literals))).search
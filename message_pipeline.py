@@ -0,0 +1,155 @@
+"""
+消息处理流水线
+WebSocket 读取线程只负责收帧、解压和 ACK，把消息放进直播间自己的有界队列后立即返回；
+共享的处理线程按直播间依次取出消息执行 handle_*（解析、过滤、推送）。
+处理慢时只会让队列变长或按策略丢弃，不会拖慢读取和 ACK
+"""
+import os
+import queue
+import threading
+from collections import deque
+
+# 每个直播间队列最多缓存的帧数
+PIPELINE_QUEUE_SIZE = int(os.environ.get('DOUYIN_PIPELINE_QUEUE_SIZE', 1000))
+
+# 队列满时的处理：drop_oldest 丢弃最早的帧，drop_newest 丢弃新来的帧，block 让读取线程等待
+PIPELINE_FULL_POLICY = os.environ.get('DOUYIN_PIPELINE_FULL_POLICY', 'drop_oldest')
+
+# 共享处理线程数
+PIPELINE_WORKERS = int(os.environ.get('DOUYIN_PIPELINE_WORKERS', 2))
+
+FULL_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+# 处理线程每次从一个直播间最多取出的帧数，取完后让给其他直播间
+_BATCH = 32
+
+
+class RoomQueue:
+    """一个直播间的有界消息队列，同一时间最多一个处理线程在处理，保证消息顺序"""
+
+    def __init__(self, dispatcher, handler, maxsize=PIPELINE_QUEUE_SIZE, policy=PIPELINE_FULL_POLICY):
+        if policy not in FULL_POLICIES:
+            raise ValueError(f"未知的队列满处理策略: {policy}（可选 {', '.join(FULL_POLICIES)}）")
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_depth = 0
+        self.dropped = 0
+        self.processed = 0
+        self._dispatcher = dispatcher
+        self._items = deque()
+        self._scheduled = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+
+    def put(self, item):
+        """放入一帧，按策略丢弃时返回 False"""
+        with self._lock:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                if self.policy == 'drop_oldest':
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._not_full.wait()
+                    if self._closed:
+                        return False
+
+            self._items.append(item)
+            self.max_depth = max(self.max_depth, len(self._items))
+            if self._scheduled:
+                return True
+            self._scheduled = True
+
+        self._dispatcher.schedule(self)
+        return True
+
+    def run_batch(self):
+        """处理一批（由处理线程调用）"""
+        with self._lock:
+            batch = [self._items.popleft() for _ in range(min(_BATCH, len(self._items)))]
+            self._not_full.notify_all()
+
+        for item in batch:
+            try:
+                self.handler(item)
+            except Exception as e:
+                print(f"❌ 消息处理错误: {e}")
+        self.processed += len(batch)
+
+        with self._lock:
+            if not self._items or self._closed:
+                self._scheduled = False
+                return
+        self._dispatcher.schedule(self)
+
+    def close(self):
+        """关闭队列，丢弃未处理的帧"""
+        with self._lock:
+            self._closed = True
+            self._items.clear()
+            self._not_full.notify_all()
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def stats(self):
+        return {
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'maxsize': self.maxsize,
+            'policy': self.policy,
+            'dropped': self.dropped,
+            'processed': self.processed,
+        }
+
+
+class PipelineDispatcher:
+    """所有直播间共享的处理线程"""
+
+    def __init__(self, workers=PIPELINE_WORKERS):
+        self.workers = max(1, workers)
+        self._ready = queue.SimpleQueue()  # 有待处理消息的 RoomQueue
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def create_queue(self, handler, maxsize=PIPELINE_QUEUE_SIZE, policy=PIPELINE_FULL_POLICY):
+        """为一个直播间创建队列，handler(item) 在处理线程中调用"""
+        with self._lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f"pipeline-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+        return RoomQueue(self, handler, maxsize, policy)
+
+    def schedule(self, room_queue):
+        self._ready.put(room_queue)
+
+    def stats(self):
+        return {'workers': len(self._threads), 'ready_rooms': self._ready.qsize()}
+
+    def _run(self):
+        while True:
+            self._ready.get().run_batch()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_pipeline_dispatcher():
+    """获取进程内共享的处理线程"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = PipelineDispatcher()
+    return _dispatcher
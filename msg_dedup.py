@@ -0,0 +1,70 @@
+"""
+消息去重
+断线重连从 cursor 继续、或服务器重复推送时，同一条消息（Message.msgId 相同）会收到多次。
+每个直播间记住最近一段时间的 msgId：按时间分成若干桶（每桶一个 set），过期的整桶丢弃；
+单桶达到上限时提前换桶，因此每个直播间最多保存 DEDUP_MAX_IDS 个 ID，内存可预估
+"""
+import os
+import sys
+import time
+from collections import deque
+
+# 记住 msgId 的时长（秒）和分桶数
+DEDUP_WINDOW = float(os.environ.get('DOUYIN_DEDUP_WINDOW', 300))
+DEDUP_BUCKETS = int(os.environ.get('DOUYIN_DEDUP_BUCKETS', 10))
+
+# 每个直播间最多记住的 msgId 数
+DEDUP_MAX_IDS = int(os.environ.get('DOUYIN_DEDUP_MAX_IDS', 20000))
+
+# 一个 msgId（19 位整数）对象的内存
+_ID_BYTES = sys.getsizeof(2 ** 62)
+
+
+class MsgIdDeduper:
+    """一个直播间的 msgId 去重（不加锁：同一直播间的消息同一时间只在一个线程中处理）"""
+
+    def __init__(self, window=DEDUP_WINDOW, buckets=DEDUP_BUCKETS, max_ids=DEDUP_MAX_IDS):
+        self.window = window
+        self.bucket_seconds = window / max(1, buckets)
+        self.bucket_size = max(1, max_ids // max(1, buckets))
+        self.checked = 0
+        self.duplicates = 0
+        self._buckets = deque([set()], maxlen=max(1, buckets))  # 最新的桶在右端
+        self._bucket_start = time.monotonic()
+
+    def is_duplicate(self, msg_id, now=None):
+        """msg_id 最近出现过时返回 True，否则记住它并返回 False；msg_id 为 0 时不去重"""
+        if not msg_id:
+            return False
+        self.checked += 1
+        for bucket in reversed(self._buckets):
+            if msg_id in bucket:
+                self.duplicates += 1
+                return True
+
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._bucket_start
+        if elapsed >= self.bucket_seconds:
+            # 换桶，deque 满时自动丢弃最早的桶；空闲了多个桶的时长就补上同样多的空桶
+            for _ in range(min(int(elapsed // self.bucket_seconds), self._buckets.maxlen)):
+                self._buckets.append(set())
+            self._bucket_start = now
+        elif len(self._buckets[-1]) >= self.bucket_size:
+            self._buckets.append(set())
+            self._bucket_start = now
+        self._buckets[-1].add(msg_id)
+        return False
+
+    @property
+    def size(self):
+        return sum(len(bucket) for bucket in self._buckets)
+
+    def stats(self):
+        size = self.size
+        return {
+            'checked': self.checked,
+            'duplicates': self.duplicates,
+            'ids': size,
+            'max_ids': self.bucket_size * self._buckets.maxlen,
+            'approx_bytes': sum(sys.getsizeof(bucket) for bucket in self._buckets) + size * _ID_BYTES,
+        }
@@ -0,0 +1,272 @@
+"""
+正则安全检查
+re 是回溯实现，匹配失败前会尝试同一段文本的所有分法，执行中既不能中断也不释放 GIL，
+读取弹幕的线程（asyncio 版是所有直播间共用的事件循环）会一直卡住：
+- 嵌套量词的内外两层能互相替代时（如 (a+)+、(\\w+\\s?)*、(a{1,3})+），分法随长度指数增长
+- 重复的分支能互相替代时（如 (a|aa)*、(a|ab|b)*），同样指数增长
+- 字符集有重叠的量词连在一起时（如 a*a*a*b、.*a.*a.*b），每多一个量词耗时多乘一个长度，
+  三个以上在两三百字的弹幕上就会超过时间预算
+
+加载规则时在语法树中查找这三类结构，找到就拒绝。内外两层不能互相替代的嵌套量词是线性的，不拒绝：
+(\\d+,)*\\d+、(?:[a-z]+\\.)+com 中每一轮都必须匹配一个内层量词匹配不了的分隔符。
+字符集是否重叠用一组代表字符判断：正则中出现的字符、字符范围的端点，再加上常见字符。
+占有量词和原子组（Python 3.11+）不回溯，可以用来改写。
+
+运行中单条弹幕超过 FILTER_BUDGET_MS 的正则只能在执行结束后发现，复核（在子进程中重新执行，
+避免把其他线程争抢 GIL 造成的耗时算到正则头上）同样超时的才停用
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# 单条弹幕执行一个正则的时间预算（毫秒）
+FILTER_BUDGET_MS = float(os.environ.get('DOUYIN_FILTER_BUDGET_MS', 50))
+
+# 子进程启动的额外时间（秒），不计入超时
+_WORKER_STARTUP = 1
+
+# 可能失败的位置前面最多允许连着几个字符集有重叠的量词
+# （两个：200 字约 10ms；三个：200 字约 200ms，见模块说明）
+MAX_OVERLAPPING_QUANTIFIERS = 2
+
+_REPEATS = tuple(getattr(sre_parse, name) for name in ('MAX_REPEAT', 'MIN_REPEAT') if hasattr(sre_parse, name))
+_POSSESSIVE_REPEAT = getattr(sre_parse, 'POSSESSIVE_REPEAT', None)
+_ATOMIC_GROUP = getattr(sre_parse, 'ATOMIC_GROUP', None)
+_ATOMS = (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.ANY, sre_parse.IN)
+_ZERO_WIDTH = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+
+# 代表字符中总会加入的常见字符
+_COMMON_CHARS = "aZ09_ \t\n中。，！!,.-:"
+
+_CATEGORIES = {getattr(sre_parse, name): re.compile(regex).match for name, regex in (
+    ('CATEGORY_DIGIT', r'\d'), ('CATEGORY_NOT_DIGIT', r'\D'), ('CATEGORY_SPACE', r'\s'),
+    ('CATEGORY_NOT_SPACE', r'\S'), ('CATEGORY_WORD', r'\w'), ('CATEGORY_NOT_WORD', r'\W'))}
+
+_WORKER = r'''
+import json, re, sys, time
+job = json.loads(sys.stdin.read())
+search = re.compile(job['pattern']).search
+worst = 0.0
+for text in job['texts']:
+    start = time.perf_counter()
+    search(text)
+    worst = max(worst, time.perf_counter() - start)
+print(json.dumps({'worst': worst}))
+'''
+
+
+
+def _children(op, av):
+    """节点中嵌套的子序列"""
+    if op is sre_parse.SUBPATTERN:
+        return [av[3]]
+    if op in _REPEATS or op is _POSSESSIVE_REPEAT:
+        return [av[2]]
+    if op is sre_parse.BRANCH:
+        return list(av[1])
+    if op is _ATOMIC_GROUP:
+        return [av]
+    if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return [av[1]]
+    if op is sre_parse.GROUPREF_EXISTS:
+        return [sub for sub in av[1:] if sub]
+    return []
+
+
+def _is_quantifier(op, av):
+    """会回溯的、次数不定的量词（占有量词不算）"""
+    return op in _REPEATS and av[0] < av[1] and av[1] > 1
+
+
+class _Analysis:
+    """一个正则的语法树分析，字符集用代表字符的 frozenset 表示"""
+
+    def __init__(self, pattern):
+        self.parsed = sre_parse.parse(pattern)
+        self.ignorecase = bool(self.parsed.state.flags & re.IGNORECASE)
+        chars = set(_COMMON_CHARS)
+        self._collect(self.parsed, chars)
+        if self.ignorecase:
+            chars |= {ch.swapcase() for ch in chars}
+        self.reps = frozenset(chars)
+
+    def _collect(self, items, chars):
+        """收集正则中出现的字符和字符范围端点；有局部忽略大小写时按整体忽略处理"""
+        for op, av in items:
+            if op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL):
+                chars.add(chr(av))
+            elif op is sre_parse.IN:
+                for item_op, value in av:
+                    if item_op is sre_parse.LITERAL:
+                        chars.add(chr(value))
+                    elif item_op is sre_parse.RANGE:
+                        chars.update((chr(value[0]), chr(value[1])))
+            elif op is sre_parse.SUBPATTERN and av[1] & re.IGNORECASE:
+                self.ignorecase = True
+            for sub in _children(op, av):
+                self._collect(sub, chars)
+
+    def _atom_chars(self, op, av):
+        variants = (lambda ch: (ch, ch.lower(), ch.upper())) if self.ignorecase else (lambda ch: (ch,))
+        return frozenset(ch for ch in self.reps if any(_atom_matches(op, av, c) for c in variants(ch)))
+
+    def chars(self, items):
+        """items 可能匹配的字符"""
+        result = frozenset()
+        for op, av in items:
+            if op in _ATOMS:
+                result |= self._atom_chars(op, av)
+            elif op is sre_parse.GROUPREF:
+                return self.reps
+            else:
+                for sub in _children(op, av):
+                    result |= self.chars(sub)
+        return result
+
+    def within(self, items, chars):
+        """items 能否只用 chars 中的字符匹配（包括匹配空串）"""
+        for op, av in items:
+            if op in _ATOMS:
+                ok = bool(self._atom_chars(op, av) & chars)
+            elif op in _REPEATS or op is _POSSESSIVE_REPEAT:
+                ok = av[0] == 0 or self.within(av[2], chars)
+            elif op is sre_parse.BRANCH:
+                ok = any(self.within(branch, chars) for branch in av[1])
+            elif op in (sre_parse.SUBPATTERN, _ATOMIC_GROUP):
+                ok = self.within(_children(op, av)[0], chars)
+            else:
+                # 断言、反向引用等不消耗或无法确定字符
+                ok = True
+            if not ok:
+                return False
+        return True
+
+    def nullable(self, op, av):
+        """节点能否匹配空串"""
+        return self.within([(op, av)], frozenset())
+
+    def find(self, items):
+        """items（以及嵌套在其中的序列）中可能灾难性回溯的结构的说明，没有时返回 None"""
+        if self._chain(items) > MAX_OVERLAPPING_QUANTIFIERS:
+            return "相邻的量词有重叠"
+        for op, av in items:
+            if op in _REPEATS and av[1] > 1:
+                problem = self._nested(av[2])
+                if problem:
+                    return problem
+            for sub in _children(op, av):
+                problem = self.find(sub)
+                if problem:
+                    return problem
+        return None
+
+    def _flatten(self, items):
+        """展开不重复的分组，得到一段顺序执行的节点"""
+        for op, av in items:
+            if op is sre_parse.SUBPATTERN:
+                yield from self._flatten(av[3])
+            else:
+                yield op, av
+
+    def _chain(self, items):
+        """可能失败的位置前面最多连着几个字符集有重叠的量词（中间的节点也要能用这些字符匹配）"""
+        chains = {}  # {字符集交集: 量词数}
+        worst = 0
+        for op, av in self._flatten(items):
+            if op in _ZERO_WIDTH or not self.nullable(op, av):
+                worst = max(worst, max(chains.values(), default=0))
+            item = [(op, av)]
+            kept = {chars: count for chars, count in chains.items() if self.within(item, chars)}
+            if _is_quantifier(op, av):
+                item_chars = self.chars(item)
+                for chars, count in chains.items():
+                    overlap = chars & item_chars
+                    if overlap:
+                        kept[overlap] = max(kept.get(overlap, 0), count + 1)
+                kept[item_chars] = max(kept.get(item_chars, 0), 1)
+            chains = kept
+        return worst
+
+    def _contexts(self, items, before, after):
+        """重复体中的每个节点（包括嵌套在分组、分支、量词中的）和它前后的节点"""
+        for i, (op, av) in enumerate(items):
+            node_before = before + list(items[:i])
+            node_after = list(items[i + 1:]) + after
+            yield op, av, node_before, node_after
+            if op in (sre_parse.SUBPATTERN, sre_parse.BRANCH) or op in _REPEATS:
+                for sub in _children(op, av):
+                    yield from self._contexts(sub, node_before, node_after)
+
+    def _nested(self, body):
+        """重复体中能和下一轮互相替代的量词或分支：从它之后到下一轮回到它之前的部分，
+        都能只用它的字符匹配时，同一段文本可以有多种分法"""
+        for op, av, before, after in self._contexts(body, [], []):
+            loop = after + before
+            if _is_quantifier(op, av):
+                if self.within(loop, self.chars([(op, av)])):
+                    return "嵌套量词"
+            elif op is sre_parse.BRANCH:
+                branch_chars = [self.chars(branch) for branch in av[1]]
+                if not self.within(loop, frozenset().union(*branch_chars)):
+                    continue
+                for i, branch in enumerate(av[1]):
+                    others = frozenset().union(*(chars for j, chars in enumerate(branch_chars) if j != i))
+                    if self.within(branch, others):
+                        return "重复的分支有重叠"
+        return None
+
+
+def _atom_matches(op, av, ch):
+    if op is sre_parse.LITERAL:
+        return ch == chr(av)
+    if op is sre_parse.NOT_LITERAL:
+        return ch != chr(av)
+    if op is sre_parse.ANY:
+        return True
+    negate = bool(av) and av[0][0] is sre_parse.NEGATE
+    for item_op, value in av:
+        if item_op is sre_parse.LITERAL and ch == chr(value):
+            break
+        if item_op is sre_parse.RANGE and value[0] <= ord(ch) <= value[1]:
+            break
+        if item_op is sre_parse.CATEGORY and _CATEGORIES.get(value, bool)(ch):
+            break
+    else:
+        return negate
+    return not negate
+
+
+def find_risky_construct(pattern):
+    """正则中可能灾难性回溯的结构的说明，没有时返回 None"""
+    analysis = _Analysis(pattern)
+    return analysis.find(analysis.parsed)
+
+
+def measure_isolated(pattern, texts, timeout):
+    """在子进程中对每段文本执行一次 pattern.search，返回最长一次的耗时（秒）；
+    超过 timeout 时结束子进程并返回 None"""
+    job = json.dumps({'pattern': pattern, 'texts': list(texts)})
+    try:
+        result = subprocess.run([sys.executable, '-S', '-c', _WORKER], input=job, capture_output=True,
+                                text=True, encoding='utf-8', timeout=timeout + _WORKER_STARTUP)
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0:
+        raise RuntimeError(f"正则检查子进程失败: {result.stderr.strip()[-200:]}")
+    worst = json.loads(result.stdout.strip().splitlines()[-1])['worst']
+    return None if worst > timeout else worst
+
+
+def check_pattern(pattern):
+    """加载时检查：含可能灾难性回溯的结构时返回问题说明，否则返回 None"""
+    construct = find_risky_construct(pattern)
+    if construct is None:
+        return None
+    return f"{construct}，需要改写正则，或用占有量词 (a+)++、原子组 (?>...) 避免回溯"
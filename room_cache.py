@@ -0,0 +1,153 @@
+"""
+直播间信息缓存
+web_rid -> room_id / 主播 / 标题 / 直播状态，稳定字段和易变字段分别设置 TTL，
+重启后重新添加已知直播间不需要再请求接口
+"""
+import json
+import os
+import threading
+import time
+
+from json_store import DebouncedSaver, write_json_atomic
+
+# 稳定字段（room_id、主播）的有效期（秒）
+ROOM_STABLE_TTL = int(os.environ.get('DOUYIN_ROOM_STABLE_TTL', 12 * 3600))
+
+# 易变字段（直播状态、标题）的有效期（秒）
+ROOM_STATUS_TTL = int(os.environ.get('DOUYIN_ROOM_STATUS_TTL', 60))
+
+# 缓存文件路径，设置为空字符串则只缓存在内存中
+ROOM_CACHE_FILE = os.environ.get('DOUYIN_ROOM_CACHE_FILE', 'douyin_room_cache.json')
+
+# 主播信息只保存这些字段（接口返回的头像等数据很大且用不到）
+OWNER_FIELDS = ('nickname', 'id_str', 'sec_uid')
+
+
+class RoomInfoCache:
+    """web_rid -> 直播间信息 的缓存（线程安全，可持久化到磁盘）"""
+
+    def __init__(self, stable_ttl=ROOM_STABLE_TTL, status_ttl=ROOM_STATUS_TTL, path=ROOM_CACHE_FILE):
+        self.stable_ttl = stable_ttl
+        self.status_ttl = status_ttl
+        self.path = path or None
+        self.hits = 0
+        self.misses = 0
+        # {web_rid: {'room_id', 'owner', 'title', 'status', 'stable_at', 'status_at'}}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # 保存串行执行
+        # 批量解析、状态轮询会连续写入很多条，合并为一次保存
+        self._saver = DebouncedSaver(self.save) if self.path else None
+        if self.path:
+            self.load()
+
+    def get(self, web_rid, need_status=True):
+        """
+        获取缓存的直播间信息，没有或已过期返回 None
+
+        need_status=False 时只要求稳定字段有效（例如添加直播间只需要 room_id），
+        此时返回的 status/title 可能是旧的
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(web_rid)
+            fresh = (entry is not None
+                     and now - entry['stable_at'] < self.stable_ttl
+                     and (not need_status or now - entry['status_at'] < self.status_ttl))
+            if not fresh:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return {
+                'room_id': entry['room_id'],
+                'web_rid': web_rid,
+                'title': entry['title'],
+                'status': entry['status'],
+                'owner': dict(entry['owner']),
+                'user_data': None,
+            }
+
+    def put(self, room_info, persist=True):
+        """写入 get_real_room_id 的结果；persist=False 时只写内存，由调用方之后调用 request_save()"""
+        now = time.time()
+        owner = room_info.get('owner') or {}
+        with self._lock:
+            self._entries[room_info['web_rid']] = {
+                'room_id': room_info['room_id'],
+                'owner': {k: owner[k] for k in OWNER_FIELDS if k in owner},
+                'title': room_info.get('title', ''),
+                'status': room_info.get('status', 0),
+                'stable_at': now,
+                'status_at': now,
+            }
+        if persist:
+            self.request_save()
+
+    def request_save(self):
+        """安排一次保存（短时间内的多次请求合并）"""
+        if self._saver:
+            self._saver.request()
+
+    def invalidate(self, web_rid):
+        """移除直播间（例如 room_id 已失效）"""
+        with self._lock:
+            self._entries.pop(web_rid, None)
+
+    def load(self):
+        """从磁盘加载"""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  房间缓存读取失败: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for web_rid, entry in data.items():
+                if now - entry.get('stable_at', 0) < self.stable_ttl:
+                    self._entries[web_rid] = entry
+
+    def save(self):
+        """保存到磁盘（先写唯一的临时文件再替换，避免写坏）"""
+        with self._save_lock:
+            with self._lock:
+                data = dict(self._entries)
+            try:
+                write_json_atomic(self.path, data, ensure_ascii=False)
+            except OSError as e:
+                print(f"⚠️  房间缓存保存失败: {e}")
+
+    def flush(self):
+        """立即保存尚未保存的修改"""
+        if self._saver:
+            self._saver.flush()
+
+    def stats(self):
+        """命中统计"""
+        with self._lock:
+            size = len(self._entries)
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': size,
+            'stable_ttl': self.stable_ttl,
+            'status_ttl': self.status_ttl,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_room_cache():
+    """获取进程内共享的房间缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RoomInfoCache()
+    return _cache
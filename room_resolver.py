@@ -0,0 +1,104 @@
+"""
+批量解析直播间
+并发调用 get_real_room_id，限制并发数，并对同一域名做请求速率限制
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from get_real_room_id import get_real_room_id
+from room_cache import get_room_cache
+
+# 同时解析的直播间数量
+RESOLVE_CONCURRENCY = int(os.environ.get('DOUYIN_RESOLVE_CONCURRENCY', 16))
+
+# 调用方指定的并发数上限
+MAX_RESOLVE_CONCURRENCY = RESOLVE_CONCURRENCY * 4
+
+# 每个域名每秒最多请求数
+RESOLVE_RATE = float(os.environ.get('DOUYIN_RESOLVE_RATE', 20))
+
+API_HOST = 'live.douyin.com'
+
+
+class RateLimiter:
+    """令牌桶限速器（线程安全）"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，没有时等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host=API_HOST):
+    """获取某个域名共享的限速器"""
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = RateLimiter(RESOLVE_RATE)
+        return _limiters[host]
+
+
+def resolve_many(web_rids, concurrency=None, need_status=False, use_cache=True, quiet=False):
+    """
+    并发解析多个 web_rid，按完成顺序逐个产出 (web_rid, room_info, error)
+
+    命中房间缓存的直接返回，不占用请求配额；其余的最多 concurrency 个同时请求，
+    并受 live.douyin.com 的速率限制。room_info 为 None 时 error 为失败原因。
+    use_cache=False 时全部重新请求（例如轮询直播状态）；quiet 见 get_real_room_id。
+    """
+    cache = get_room_cache()
+    limiter = get_rate_limiter()
+    pending = []
+
+    for web_rid in dict.fromkeys(web_rids):
+        cached = cache.get(web_rid, need_status) if use_cache else None
+        if cached:
+            yield web_rid, cached, None
+        else:
+            pending.append(web_rid)
+
+    if not pending:
+        return
+
+    def resolve(web_rid):
+        limiter.acquire()
+        return get_real_room_id(web_rid, use_cache=False, quiet=quiet)
+
+    workers = min(concurrency or RESOLVE_CONCURRENCY, len(pending))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(resolve, web_rid): web_rid for web_rid in pending}
+        for future in as_completed(futures):
+            web_rid = futures[future]
+            try:
+                room_info = future.result()
+            except Exception as e:
+                yield web_rid, None, str(e)
+                continue
+            if room_info and room_info.get('room_id'):
+                yield web_rid, room_info, None
+            else:
+                yield web_rid, None, '无法获取房间信息'
+    finally:
+        # 调用方提前关闭生成器（例如客户端断开）时取消尚未开始的解析，不等待进行中的请求
+        executor.shutdown(wait=False, cancel_futures=True)
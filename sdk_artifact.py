@@ -0,0 +1,146 @@
+"""
+签名 SDK 预处理产物
+把 douyin_sdk.js 精简后按文件哈希缓存，Node 后端额外缓存 V8 代码缓存（code cache），
+冷启动时不必再完整解析 625 KB 的混淆源码
+
+用法:
+  python sdk_artifact.py          # 预先构建产物
+"""
+import functools
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+SDK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'douyin_sdk.js')
+
+# 产物目录，可通过环境变量修改
+ARTIFACT_DIR = os.environ.get(
+    'DOUYIN_SDK_ARTIFACT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sdk_cache')
+)
+
+# 签名只需要这些函数，构建后会校验它们都存在
+# （getABogus 目前不在 douyin_sdk.js 中，提取进来后再加到这里）
+REQUIRED_FUNCTIONS = ('getMSSDKSignature',)
+
+_LINE_COMMENT = re.compile(r'^//')
+_BLOCK_COMMENT_LINE = re.compile(r'^/\*.*\*/$')
+
+
+def sdk_hash(sdk_path=SDK_PATH):
+    """SDK 文件的 sha256，作为产物的缓存键"""
+    digest = hashlib.sha256()
+    with open(sdk_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def strip_source(source):
+    """
+    保守地精简 JS 源码：去掉整行注释、空行和缩进
+
+    只处理整行，不改动行内内容；保留换行，自动分号插入（ASI）的行为不变。
+    SDK 中没有模板字符串和跨行字符串，按行处理是安全的。
+    """
+    lines = []
+    for line in source.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if _LINE_COMMENT.match(stripped) or _BLOCK_COMMENT_LINE.match(stripped):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+def artifact_paths(digest, cache_dir=ARTIFACT_DIR):
+    """返回 (精简后的 JS 路径, V8 代码缓存路径)"""
+    base = os.path.join(cache_dir, digest[:16])
+    # V8 代码缓存只对同一 Node 版本有效，文件名里带上版本号
+    node_version = _node_version() or 'none'
+    return os.path.join(base, 'sdk.min.js'), os.path.join(base, f'sdk.node-{node_version}.v8cache')
+
+
+def build_artifact(sdk_path=SDK_PATH, cache_dir=ARTIFACT_DIR):
+    """
+    构建（或复用）SDK 产物，返回 (精简后的 JS 路径, V8 代码缓存路径)
+
+    代码缓存本身由 Node 签名进程在第一次加载时生成（需要先执行一次签名，
+    缓存里才会包含惰性编译的内部函数），这里只负责精简和校验。
+    """
+    digest = sdk_hash(sdk_path)
+    js_path, code_cache_path = artifact_paths(digest, cache_dir)
+
+    if not os.path.exists(js_path):
+        with open(sdk_path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        stripped = strip_source(source)
+
+        missing = [name for name in REQUIRED_FUNCTIONS if f'function {name}(' not in stripped]
+        if missing:
+            raise ValueError(f"精简后的 SDK 缺少函数: {', '.join(missing)}")
+
+        os.makedirs(os.path.dirname(js_path), exist_ok=True)
+        tmp_path = f"{js_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(stripped)
+        _verify(tmp_path)
+        os.replace(tmp_path, js_path)
+        print(f"✅ SDK 产物已生成: {js_path} ({len(source)} -> {len(stripped)} 字节)")
+
+    return js_path, code_cache_path
+
+
+def load_artifact(sdk_path=SDK_PATH, cache_dir=ARTIFACT_DIR):
+    """获取 SDK 产物，失败时退回原始 SDK（代码缓存路径为 None）"""
+    try:
+        return build_artifact(sdk_path, cache_dir)
+    except (OSError, ValueError, subprocess.SubprocessError) as e:
+        print(f"⚠️  SDK 产物不可用，使用原始 SDK: {e}")
+        return sdk_path, None
+
+
+def _verify(js_path):
+    """用 Node 检查精简后的 SDK 仍然定义了需要的函数（没有 Node 时跳过）"""
+    node_path = shutil.which('node') or shutil.which('nodejs')
+    if not node_path:
+        return
+
+    check = ' && '.join(f"typeof {name} === 'function'" for name in REQUIRED_FUNCTIONS)
+    script = (
+        "const vm = require('vm');"
+        f"vm.runInThisContext(require('fs').readFileSync({js_path!r}, 'utf-8'));"
+        f"process.exit(({check}) ? 0 : 1);"
+    )
+    result = subprocess.run([node_path, '-e', script], capture_output=True, timeout=30)
+    if result.returncode != 0:
+        raise ValueError(f"精简后的 SDK 校验失败: {result.stderr.decode('utf-8', 'replace')[:200]}")
+
+
+@functools.lru_cache(maxsize=None)
+def _node_version():
+    node_path = shutil.which('node') or shutil.which('nodejs')
+    if not node_path:
+        return None
+    try:
+        return subprocess.run(
+            [node_path, '--version'], capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    """构建 SDK 产物"""
+    sdk_path = sys.argv[1] if len(sys.argv) > 1 else SDK_PATH
+    js_path, code_cache_path = build_artifact(sdk_path)
+    print(f"📦 精简 SDK: {js_path}")
+    print(f"📦 V8 代码缓存: {code_cache_path}（首次签名时由 Node 生成）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+签名缓存
+msStub 由 room_id 和 unique_id 决定，同一个 msStub 的签名在 TTL 内可以直接复用，
+重连和重启时不必再调用 JS
+"""
+import json
+import os
+import threading
+import time
+
+from json_store import DebouncedSaver, write_json_atomic
+
+# 签名有效期（秒）
+SIGNATURE_TTL = int(os.environ.get('DOUYIN_SIGNATURE_TTL', 6 * 3600))
+
+# 缓存文件路径，设置为空字符串则只缓存在内存中
+SIGNATURE_CACHE_FILE = os.environ.get('DOUYIN_SIGNATURE_CACHE_FILE', 'douyin_signature_cache.json')
+
+
+class SignatureCache:
+    """msStub -> 签名 的 TTL 缓存（线程安全，可持久化到磁盘）"""
+
+    def __init__(self, ttl=SIGNATURE_TTL, path=SIGNATURE_CACHE_FILE):
+        self.ttl = ttl
+        self.path = path or None
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # {ms_stub: (signature, expires_at)}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # 保存串行执行
+        self._saver = DebouncedSaver(self.save) if self.path else None
+        if self.path:
+            self.load()
+
+    def get(self, ms_stub):
+        """获取未过期的签名，没有则返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(ms_stub)
+            if entry and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self._entries[ms_stub]
+            self.misses += 1
+            return None
+
+    def put(self, ms_stub, signature):
+        """写入签名"""
+        self.put_many({ms_stub: signature})
+
+    def put_many(self, signatures, persist=True):
+        """批量写入签名，只落盘一次；persist=False 时只写内存
+        （签名来自守护进程时由守护进程保存文件，避免多个进程同时写同一个文件）"""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for ms_stub, signature in signatures.items():
+                self._entries[ms_stub] = (signature, expires_at)
+        if persist and self._saver:
+            self._saver.request()
+
+    def invalidate(self, ms_stub):
+        """移除签名（例如服务端拒绝了该签名）"""
+        with self._lock:
+            self._entries.pop(ms_stub, None)
+
+    def load(self):
+        """从磁盘加载未过期的签名"""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  签名缓存读取失败: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for ms_stub, (signature, expires_at) in data.items():
+                if expires_at > now:
+                    self._entries[ms_stub] = (signature, expires_at)
+
+    def save(self):
+        """保存到磁盘（先写唯一的临时文件再替换，避免写坏）"""
+        with self._save_lock:
+            now = time.time()
+            with self._lock:
+                data = {k: v for k, v in self._entries.items() if v[1] > now}
+            try:
+                write_json_atomic(self.path, data)
+            except OSError as e:
+                print(f"⚠️  签名缓存保存失败: {e}")
+
+    def flush(self):
+        """立即保存尚未保存的修改"""
+        if self._saver:
+            self._saver.flush()
+
+    def stats(self):
+        """命中统计，用于调整 TTL"""
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'size': size,
+            'ttl': self.ttl,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_signature_cache():
+    """获取进程内共享的签名缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SignatureCache()
+    return _cache
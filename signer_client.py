@@ -0,0 +1,100 @@
+"""
+签名守护进程客户端
+守护进程（signer_daemon.py）在运行时，签名请求通过 Unix 套接字转发给它；
+守护进程不存在时由调用方退回进程内签名
+"""
+import json
+import os
+import socket
+import threading
+import time
+
+from signer_pool import SignerError, JSExecutionError
+
+# 守护进程套接字路径，设置为空字符串则不使用守护进程
+SIGNER_SOCKET = os.environ.get('DOUYIN_SIGNER_SOCKET', '/tmp/douyin_signer.sock')
+
+# 连接失败后多久再尝试守护进程（秒）
+RETRY_INTERVAL = 5
+
+
+class SignerUnavailable(SignerError):
+    """守护进程不可用（调用方应退回进程内签名）"""
+
+
+class SignerClient:
+    """
+    守护进程客户端（线程安全）
+
+    协议：每行一个 JSON 请求 {"op": ..., ...}，守护进程每行回复一个 JSON：
+    {"result": ...} 或 {"error": ..., "js": true/false}
+    """
+
+    def __init__(self, path=SIGNER_SOCKET, timeout=30):
+        self.path = path or None
+        self.timeout = timeout
+        self.enabled = self.path is not None
+        self._local = threading.local()  # 每个线程一条长连接
+        self._down_until = 0
+
+    def available(self):
+        """守护进程是否可能可用（不发起连接）"""
+        return (self.enabled and time.monotonic() >= self._down_until
+                and os.path.exists(self.path))
+
+    def request(self, op, **params):
+        """发送请求并返回结果，守护进程不可用时抛出 SignerUnavailable"""
+        if not self.available():
+            raise SignerUnavailable("签名守护进程未运行")
+
+        try:
+            stream = self._stream()
+            stream.write(json.dumps(dict(params, op=op)).encode('utf-8') + b'\n')
+            stream.flush()
+            line = stream.readline()
+            if not line:
+                raise OSError("守护进程关闭了连接")
+        except OSError as e:
+            self._reset()
+            self._down_until = time.monotonic() + RETRY_INTERVAL
+            raise SignerUnavailable(f"签名守护进程连接失败: {e}")
+
+        reply = json.loads(line)
+        if 'error' in reply:
+            if reply.get('js'):
+                raise JSExecutionError(reply['error'])
+            raise SignerError(reply['error'])
+        return reply['result']
+
+    def _stream(self):
+        stream = getattr(self._local, 'stream', None)
+        if stream is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            stream = sock.makefile('rwb')
+            self._local.sock = sock
+            self._local.stream = stream
+        return stream
+
+    def _reset(self):
+        for name in ('stream', 'sock'):
+            obj = getattr(self._local, name, None)
+            if obj is not None:
+                try:
+                    obj.close()
+                except OSError:
+                    pass
+                setattr(self._local, name, None)
+
+
+_client = SignerClient()
+
+
+def get_signer_client():
+    """获取进程内共享的守护进程客户端"""
+    return _client
@@ -0,0 +1,111 @@
+"""
+本机签名守护进程
+持有常驻 JS 签名池和签名缓存，通过 Unix 套接字为同一台机器上的所有进程
+（多个 web_server_multi.py、采集脚本等）提供 msSDK 和 a_bogus 签名
+
+用法:
+  python signer_daemon.py [套接字路径]
+
+协议（每行一个 JSON）:
+  {"op": "ms_sdk", "ms_stubs": [...], "use_cache": true}  -> {"result": {ms_stub: 签名}}
+  {"op": "a_bogus", "query": "...", "user_agent": "..."}  -> {"result": "a_bogus"}
+  {"op": "stats"}                                          -> {"result": {...}}
+  出错时返回 {"error": "...", "js": true/false}
+"""
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+
+from douyin_sign import sign_stubs
+from signature_cache import get_signature_cache
+from signer_client import SIGNER_SOCKET, get_signer_client
+from signer_pool import get_signer_pool, SignerError, JSExecutionError
+
+
+class SignerRequestHandler(socketserver.StreamRequestHandler):
+    """处理一个客户端连接（连接上可以连续发送多个请求）"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                reply = {'result': self.dispatch(json.loads(line))}
+            except JSExecutionError as e:
+                reply = {'error': str(e), 'js': True}
+            except (SignerError, OSError, ValueError, KeyError, TypeError) as e:
+                reply = {'error': str(e), 'js': False}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+    def dispatch(self, request):
+        op = request['op']
+        if op == 'ms_sdk':
+            return sign_stubs(request['ms_stubs'], request.get('use_cache', True))
+        if op == 'a_bogus':
+            return get_signer_pool().call("getABogus", request['query'], request['user_agent'])
+        if op == 'stats':
+            pool = get_signer_pool()
+            return {
+                'backend': pool.backend,
+                'pool_size': pool.size,
+                'signature_cache': get_signature_cache().stats(),
+            }
+        raise ValueError(f"未知操作: {op}")
+
+
+class SignerDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """多线程 Unix 套接字服务器"""
+    daemon_threads = True
+
+
+def _is_running(path):
+    """套接字上是否已有守护进程在监听"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def serve(path=SIGNER_SOCKET):
+    """启动守护进程（阻塞）"""
+    # 守护进程自己就是签名方，不能再把请求转发给自己
+    get_signer_client().enabled = False
+
+    if os.path.exists(path):
+        if _is_running(path):
+            print(f"❌ 签名守护进程已在运行: {path}")
+            return
+        os.unlink(path)  # 上次异常退出留下的套接字文件
+
+    server = SignerDaemon(path, SignerRequestHandler)
+    os.chmod(path, 0o660)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    pool = get_signer_pool()
+    pool.warm_up()
+    print(f"✅ 签名守护进程已启动: {path}（{pool.backend} × {pool.size}）")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️ 用户中断")
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+        pool.close()
+
+
+def main():
+    """主函数"""
+    path = sys.argv[1] if len(sys.argv) > 1 else SIGNER_SOCKET
+    serve(path)
+
+
+if __name__ == "__main__":
+    main()
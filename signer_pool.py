@@ -0,0 +1,303 @@
+"""
+常驻 JS 签名池
+douyin_sdk.js 只加载一次，多个常驻 JS 上下文并行提供签名服务
+"""
+import atexit
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import execjs
+from sdk_artifact import SDK_PATH, load_artifact
+
+# 签名池大小（常驻 JS 上下文数量），可通过环境变量配置
+SIGNER_POOL_SIZE = int(os.environ.get('DOUYIN_SIGNER_POOL_SIZE', min(4, os.cpu_count() or 1)))
+
+# 等待 Node 进程返回一次结果的最长时间（秒，含首次加载 SDK），超时的进程被结束，下次使用时重建
+SIGNER_CALL_TIMEOUT = float(os.environ.get('DOUYIN_SIGNER_TIMEOUT', 30))
+
+# 批量签名辅助函数，追加在 SDK 之后执行：
+# 一次调用签完多个 msStub，包含 '-' 或 '=' 的重试也在 JS 内完成，返回 [签名, 尝试次数]
+HELPER_JS = r"""
+function getMSSDKSignatureBatch(msStubs, userAgent) {
+    var results = [];
+    for (var i = 0; i < msStubs.length; i++) {
+        var attempts = 1;
+        var signature = getMSSDKSignature(msStubs[i], userAgent);
+        while (signature.indexOf('-') !== -1 || signature.indexOf('=') !== -1) {
+            attempts++;
+            signature = getMSSDKSignature(msStubs[i], userAgent);
+        }
+        results.push([signature, attempts]);
+    }
+    return results;
+}
+"""
+
+# Node 常驻进程脚本：加载一次 SDK，然后按行读取 JSON 请求并返回结果
+_NODE_DRIVER_JS = r"""
+const fs = require('fs');
+const vm = require('vm');
+const readline = require('readline');
+
+// SDK 内部的 console 输出不能污染 stdout（stdout 是通信通道）
+console.log = console.info = console.warn = console.debug = (...args) => process.stderr.write(args.join(' ') + '\n');
+
+const [sdkPath, helperSource, codeCachePath] = process.argv.slice(1);
+
+// 有 V8 代码缓存时直接复用编译结果，跳过 SDK 的完整解析
+let cachedData;
+if (codeCachePath) {
+    try { cachedData = fs.readFileSync(codeCachePath); } catch (e) { }
+}
+const script = new vm.Script(fs.readFileSync(sdkPath, 'utf-8'), { filename: sdkPath, cachedData });
+script.runInThisContext();
+vm.runInThisContext(helperSource, { filename: 'helper.js' });
+
+if (codeCachePath && (!cachedData || script.cachedDataRejected)) {
+    // 先签一次，让惰性编译的内部函数也进入代码缓存
+    try { getMSSDKSignature('0'.repeat(32), 'warmup'); } catch (e) { }
+    try {
+        const tmpPath = codeCachePath + '.' + process.pid;
+        fs.writeFileSync(tmpPath, script.createCachedData());
+        fs.renameSync(tmpPath, codeCachePath);
+    } catch (e) { }
+}
+
+const rl = readline.createInterface({ input: process.stdin });
+rl.on('line', (line) => {
+    let reply;
+    try {
+        const req = JSON.parse(line);
+        const fn = globalThis[req.fn];
+        if (typeof fn !== 'function') {
+            throw new Error(req.fn + ' is not defined');
+        }
+        reply = { result: fn.apply(null, req.args) };
+    } catch (e) {
+        reply = { error: String(e && e.message || e) };
+    }
+    process.stdout.write(JSON.stringify(reply) + '\n');
+});
+rl.on('close', () => process.exit(0));
+"""
+
+
+class SignerError(RuntimeError):
+    """JS 签名执行失败"""
+
+
+class JSExecutionError(SignerError):
+    """JS 函数本身抛出异常（上下文仍然可用）"""
+
+
+class NodeSigner:
+    """常驻 Node 进程，SDK 只解析一次（可复用 V8 代码缓存）"""
+
+    def __init__(self, node_path, sdk_path=SDK_PATH, code_cache_path=None, timeout=SIGNER_CALL_TIMEOUT):
+        self.proc = subprocess.Popen(
+            [node_path, '-e', _NODE_DRIVER_JS, sdk_path, HELPER_JS, code_cache_path or ''],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            encoding='utf-8',
+            bufsize=1,
+        )
+        self.timeout = timeout
+        # readline 没有超时，由后台线程读取 stdout，call 带超时等待
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read_replies, daemon=True).start()
+
+    def _read_replies(self):
+        """逐行读取 Node 进程的回复，进程退出时放入空字符串"""
+        try:
+            for line in self.proc.stdout:
+                self._replies.put(line)
+        except (OSError, ValueError):
+            pass
+        self._replies.put('')
+
+    def call(self, fn, *args):
+        """调用 JS 全局函数，超过 timeout 没有返回时结束进程并抛出 SignerError"""
+        try:
+            self.proc.stdin.write(json.dumps({'fn': fn, 'args': args}) + '\n')
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise SignerError(f"JS 进程通信失败: {e}")
+        try:
+            line = self._replies.get(timeout=self.timeout)
+        except queue.Empty:
+            self.proc.kill()
+            raise SignerError(f"JS 进程 {self.timeout:g} 秒没有返回，已结束")
+
+        if not line:
+            raise SignerError(f"JS 进程已退出 (code={self.proc.poll()})")
+
+        try:
+            reply = json.loads(line)
+        except ValueError:
+            raise SignerError(f"JS 进程返回了无法解析的数据: {line[:200]!r}")
+        if 'error' in reply:
+            raise JSExecutionError(reply['error'])
+        return reply.get('result')
+
+    def close(self):
+        """结束 Node 进程"""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+class ExecJSSigner:
+    """没有 Node 时退回 PyExecJS（只编译一次）"""
+
+    def __init__(self, sdk_path=SDK_PATH, runtime=None):
+        runtime = runtime or execjs.get()
+        with open(sdk_path, 'r', encoding='utf-8') as f:
+            self.ctx = runtime.compile(f.read() + '\n' + HELPER_JS)
+
+    def call(self, fn, *args):
+        """调用 JS 全局函数"""
+        try:
+            return self.ctx.call(fn, *args)
+        except Exception as e:
+            raise JSExecutionError(str(e))
+
+    def close(self):
+        pass
+
+
+class SignerPool:
+    """
+    线程安全的签名池
+
+    池中预放 size 个空位（None），取到空位时才真正创建 JS 上下文，
+    所以冷启动只付出实际用到的上下文开销；上下文出错时归还空位，下次自动重建。
+    """
+
+    def __init__(self, size=None, sdk_path=SDK_PATH, use_artifact=True, backend=None):
+        """
+        backend: None 自动选择（有 Node 时用常驻 Node 进程），
+                 'node' 强制常驻 Node 进程，其他值为 PyExecJS 运行时名称
+        """
+        self.size = max(1, size or SIGNER_POOL_SIZE)
+        self.sdk_path = sdk_path
+        self.use_artifact = use_artifact
+        self._artifact = None  # (加载用的 JS 路径, V8 代码缓存路径)
+        self.node_path = shutil.which('node') or shutil.which('nodejs')
+        self.runtime = None
+        if backend == 'node' and not self.node_path:
+            raise SignerError("找不到 Node.js")
+        if backend not in (None, 'node'):
+            self.node_path = None
+            self.runtime = execjs.get(backend)
+        self._slots = queue.LifoQueue()  # LIFO：优先复用刚用过的热上下文
+        self._workers = []
+        self._lock = threading.Lock()
+        for _ in range(self.size):
+            self._slots.put(None)
+
+    @property
+    def backend(self):
+        """当前使用的 JS 后端"""
+        return 'node' if self.node_path else f'execjs:{(self.runtime or execjs.get()).name}'
+
+    def _load_source(self):
+        """确定要加载的 SDK（优先使用预处理产物），只解析一次"""
+        with self._lock:
+            if self._artifact is None:
+                if not os.path.exists(self.sdk_path):
+                    raise FileNotFoundError(f"JS SDK file not found at {self.sdk_path}. Please run extract_js.py first.")
+                if self.use_artifact:
+                    self._artifact = load_artifact(self.sdk_path)
+                else:
+                    self._artifact = (self.sdk_path, None)
+            return self._artifact
+
+    def _create_worker(self):
+        js_path, code_cache_path = self._load_source()
+
+        if self.node_path:
+            worker = NodeSigner(self.node_path, js_path, code_cache_path)
+        else:
+            worker = ExecJSSigner(js_path, self.runtime)
+
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _discard_worker(self, worker):
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.close()
+
+    def call(self, fn, *args):
+        """在任一空闲 JS 上下文中调用函数（阻塞直到有空闲上下文）"""
+        worker = self._slots.get()
+        try:
+            if worker is None:
+                worker = self._create_worker()
+            result = worker.call(fn, *args)
+        except JSExecutionError:
+            self._slots.put(worker)
+            raise
+        except SignerError:
+            # 上下文可能已损坏，丢弃后归还空位
+            if worker is not None:
+                self._discard_worker(worker)
+            self._slots.put(None)
+            raise
+        except BaseException:
+            self._slots.put(worker)
+            raise
+        self._slots.put(worker)
+        return result
+
+    def warm_up(self):
+        """预先创建全部 JS 上下文（Node 进程在后台加载 SDK，不阻塞）"""
+        taken = [self._slots.get() for _ in range(self.size)]
+        try:
+            for i, worker in enumerate(taken):
+                if worker is None:
+                    taken[i] = self._create_worker()
+        finally:
+            for worker in taken:
+                self._slots.put(worker)
+
+    def close(self):
+        """关闭所有 JS 上下文"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def set_signer_pool(pool):
+    """替换进程内共享的签名池（基准测试用），返回原来的签名池"""
+    global _pool
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    return previous
+
+
+def get_signer_pool():
+    """获取进程内共享的签名池（首次调用时创建）"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SignerPool()
+                atexit.register(_pool.close)
+    return _pool
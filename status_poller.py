@@ -0,0 +1,188 @@
+"""
+直播状态轮询
+后台线程按批查询已配置直播间的开播状态，开播时自动启动弹幕接收，下播时停止，
+未开播的直播间不再占用 WebSocket 连接和心跳线程
+"""
+import os
+import threading
+import time
+
+from room_cache import get_room_cache
+from room_resolver import resolve_many
+
+# 轮询间隔下限 / 上限（秒）：有直播间状态变化时回到下限，否则逐步放宽到上限
+POLL_MIN_INTERVAL = float(os.environ.get('DOUYIN_POLL_MIN_INTERVAL', 15))
+POLL_MAX_INTERVAL = float(os.environ.get('DOUYIN_POLL_MAX_INTERVAL', 120))
+
+# 每批查询的直播间数量
+POLL_BATCH_SIZE = int(os.environ.get('DOUYIN_POLL_BATCH_SIZE', 20))
+
+# 间隔放宽的倍数
+POLL_BACKOFF = 1.5
+
+# get_real_room_id 返回的 status == 2 表示直播中
+LIVE_STATUS = 2
+
+
+class LiveStatusPoller:
+    """直播状态轮询器"""
+
+    def __init__(self, get_rooms, on_live, on_offline, on_change=None,
+                 min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL,
+                 batch_size=POLL_BATCH_SIZE):
+        """
+        get_rooms: 返回 {room_id: web_rid}，每轮调用一次（直播间可能被添加/删除）
+        on_live / on_offline: on_live(room_id) 在直播间开播时调用，on_offline(room_id) 在下播时调用；
+            第一次查询到的状态也视为一次变化，以便和当前的接收状态对齐
+        on_change: 可选，on_change(room_id, status_dict) 在每次状态变化后调用（用于推送到前端）
+        """
+        self.get_rooms = get_rooms
+        self.on_live = on_live
+        self.on_offline = on_offline
+        self.on_change = on_change
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.batch_size = max(1, batch_size)
+        self.interval = min_interval
+        self.last_poll = None
+        # {room_id: {'live', 'status', 'title', 'checked_at', 'changed_at', 'error'}}
+        self._status = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动后台轮询线程"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._wake_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"📡 直播状态轮询已启动（间隔 {self.min_interval:g}~{self.max_interval:g} 秒）")
+
+    def stop(self):
+        """停止轮询（已启动的弹幕接收不受影响）"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        print("📡 直播状态轮询已停止")
+
+    def poll_now(self):
+        """立即进行下一轮查询（例如添加了新直播间）"""
+        self.interval = self.min_interval
+        self._wake_event.set()
+
+    def get_status(self, room_id):
+        """直播间最近一次查询到的状态，还没查询过返回 None"""
+        with self._lock:
+            status = self._status.get(room_id)
+            return dict(status) if status else None
+
+    def forget(self, room_id):
+        """移除直播间的状态记录（直播间被删除时调用）"""
+        with self._lock:
+            self._status.pop(room_id, None)
+
+    def stats(self):
+        with self._lock:
+            live = sum(1 for s in self._status.values() if s['live'])
+            tracked = len(self._status)
+        return {
+            'enabled': self.running,
+            'interval': self.interval,
+            'last_poll': self.last_poll,
+            'tracked': tracked,
+            'live': live,
+        }
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                changed = self.poll_once()
+            except Exception as e:
+                print(f"⚠️  直播状态轮询出错: {e}")
+                changed = 0
+
+            # 有变化说明正处于开播/下播的时段，尽快再查；否则逐步放宽间隔
+            if changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.max_interval, self.interval * POLL_BACKOFF)
+
+            self._wake_event.wait(self.interval)
+            self._wake_event.clear()
+
+    def poll_once(self):
+        """查询所有直播间一次，返回状态发生变化的直播间数量"""
+        rooms = self.get_rooms()
+        by_web_rid = {}
+        for room_id, web_rid in rooms.items():
+            by_web_rid.setdefault(web_rid, []).append(room_id)
+
+        web_rids = list(by_web_rid)
+        changed = 0
+        for i in range(0, len(web_rids), self.batch_size):
+            if self._stop_event.is_set():
+                break
+            batch = web_rids[i:i + self.batch_size]
+            # 每个直播间的结果只写入内存缓存、不打印，本轮结束后保存一次
+            for web_rid, room_info, error in resolve_many(batch, need_status=True, use_cache=False, quiet=True):
+                for room_id in by_web_rid[web_rid]:
+                    if self._update(room_id, room_info, error):
+                        changed += 1
+
+        if web_rids:
+            get_room_cache().request_save()
+        self.last_poll = time.time()
+        return changed
+
+    def _update(self, room_id, room_info, error):
+        """记录查询结果，状态变化时触发回调，返回是否变化"""
+        now = time.time()
+        with self._lock:
+            previous = self._status.get(room_id)
+            if room_info is None:
+                # 查询失败时保持原状态，不启停接收
+                if previous:
+                    previous['error'] = error
+                    previous['checked_at'] = now
+                else:
+                    self._status[room_id] = {'live': None, 'status': None, 'title': '',
+                                             'checked_at': now, 'changed_at': None, 'error': error}
+                return False
+
+            live = room_info.get('status') == LIVE_STATUS
+            is_change = previous is None or previous['live'] != live
+            status = {
+                'live': live,
+                'status': room_info.get('status'),
+                'title': room_info.get('title', ''),
+                'checked_at': now,
+                'changed_at': now if is_change else previous['changed_at'],
+                'error': None,
+            }
+            self._status[room_id] = status
+
+        if not is_change:
+            return False
+
+        print(f"📡 直播间 {room_id} {'开播' if live else '未开播/已下播'}")
+        try:
+            if live:
+                self.on_live(room_id)
+            else:
+                self.on_offline(room_id)
+        except Exception as e:
+            print(f"⚠️  直播间 {room_id} 自动{'启动' if live else '停止'}失败: {e}")
+
+        if self.on_change:
+            self.on_change(room_id, dict(status))
+        return True
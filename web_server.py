@@ -85,7 +85,8 @@ def start_danmaku():
     try:
         # 获取真实 room_id
         print(f"正在获取房间信息: {web_rid}")
-        room_info = get_real_room_id(web_rid)
+        # 只需要 room_id 和主播，缓存的稳定字段有效即可
+        room_info = get_real_room_id(web_rid, need_status=False)
 
         if not room_info:
             return jsonify({'error': '无法获取房间信息'}), 400
@@ -2,18 +2,31 @@
 抖音弹幕 Web 服务器 - 多直播间并发版本
 支持同时监控多个直播间的弹幕
 """
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 import threading
-import re
 import time
 from datetime import datetime, timezone, timedelta
 import json
 import os
 from collections import deque
-from douyin_danmaku import DouyinDanmaku
+from douyin_danmaku import DouyinDanmaku, HEARTBEAT_INTERVAL, PIPELINE
+from message_pipeline import get_pipeline_dispatcher
+from decode_pool import get_decode_pool
+from chat_parser import parse_chat
+from danmaku_event import DanmakuEvent, get_room_descriptor
+from heartbeat_scheduler import get_heartbeat_scheduler
+from flush_timer import get_flush_timer
+from async_danmaku import AsyncDouyinDanmaku, get_room_host
+from douyin_sign import generate_ms_token, sign_many
+from signer_pool import SignerError
 from get_real_room_id import get_real_room_id
+from signature_cache import get_signature_cache
+from room_cache import get_room_cache
+from room_resolver import resolve_many, MAX_RESOLVE_CONCURRENCY
+from status_poller import LiveStatusPoller
+from filter_rules import get_filter_engine, migrate_filter
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'douyin_danmaku_multi_secret'
@@ -26,28 +39,45 @@ CONFIG_FILE = 'douyin_config.json'
 # 北京时区
 BEIJING_TZ = timezone(timedelta(hours=8))
 
+# 弹幕接收引擎：thread 每个直播间两个线程；async 所有直播间共用一个事件循环线程
+DANMAKU_ENGINE = os.environ.get('DOUYIN_DANMAKU_ENGINE', 'thread')
+
+# 每个直播间默认订阅的消息类型（逗号分隔，见 douyin_danmaku.SUBSCRIPTION_ALIASES），
+# 网页只展示聊天消息，其余类型只计数、不解析；单个直播间可以在配置中用 subscriptions 覆盖
+SUBSCRIPTIONS = [name.strip() for name in os.environ.get('DOUYIN_SUBSCRIPTIONS', 'chat').split(',') if name.strip()]
+
+# 启动时开启直播状态轮询（只为正在直播的直播间保持连接）
+AUTO_POLL = os.environ.get('DOUYIN_AUTO_POLL', '0') == '1'
+
 # 全局变量
-rooms = {}  # 存储所有直播间：{room_id: {receiver, thread, info, buffer}}
-current_filter = None  # 全局正则表达式过滤器
-global_buffer = deque(maxlen=200)  # 全局弹幕缓冲区
+rooms = {}  # 存储所有直播间：{room_id: {receiver, thread, info, buffer}}，buffer 中为 DanmakuEvent
+filter_engine = get_filter_engine()  # 过滤规则（全局规则 + 各直播间规则）
+global_buffer = deque(maxlen=200)  # 全局弹幕缓冲区（DanmakuEvent）
+
+
+def room_config(room_id, room_data):
+    """直播间的配置（不含运行时数据），保存和导出共用"""
+    info = room_data['info']
+    config = {
+        'room_id': room_id,
+        'web_rid': info['web_rid'],
+        'title': info['title'],
+        'owner': info['owner'],
+        'unique_id': info['unique_id']
+    }
+    # 单个直播间自定义的消息订阅
+    if info.get('subscriptions'):
+        config['subscriptions'] = info['subscriptions']
+    return config
 
 
 def save_config():
     """保存配置到文件"""
     config = {
-        'filter': current_filter,
-        'rooms': []
+        'filter_rules': filter_engine.rules,
+        'rooms': [room_config(room_id, room_data) for room_id, room_data in rooms.items()]
     }
 
-    # 保存直播间信息（不保存运行时数据）
-    for room_id, room_data in rooms.items():
-        config['rooms'].append({
-            'room_id': room_id,
-            'web_rid': room_data['info']['web_rid'],
-            'title': room_data['info']['title'],
-            'owner': room_data['info']['owner']
-        })
-
     try:
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
@@ -56,10 +86,21 @@ def save_config():
         print(f"❌ 保存配置失败: {e}")
 
 
+def presign_rooms(room_ids):
+    """批量预签名（一次 JS 调用签完所有房间，结果进入签名缓存）"""
+    pairs = [(room_id, rooms[room_id]['info']['unique_id']) for room_id in room_ids if room_id in rooms]
+    if not pairs:
+        return
+
+    try:
+        sign_many(pairs)
+    except (SignerError, FileNotFoundError) as e:
+        # 预签名失败不影响启动，每个房间连接时还会单独签名
+        print(f"⚠️  批量签名失败: {e}")
+
+
 def load_config():
     """从文件加载配置"""
-    global current_filter
-
     if not os.path.exists(CONFIG_FILE):
         print(f"ℹ️  配置文件不存在，将使用默认配置")
         return
@@ -68,14 +109,31 @@ def load_config():
         with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
             config = json.load(f)
 
-        # 恢复过滤器
-        current_filter = config.get('filter')
-        if current_filter:
-            print(f"✅ 已恢复过滤器: {current_filter}")
+        # 恢复过滤规则，旧配置的单个 filter 字符串迁移为一条全局规则
+        needs_save = False
+        rules = config.get('filter_rules')
+        if rules is None and 'filter' in config:
+            rules = migrate_filter(config['filter'])
+            needs_save = True
+        try:
+            # 可能灾难性回溯的正则不让整份规则失效，保留但停用
+            filter_engine.set_rules(rules, disable_unsafe=True)
+            if filter_engine.rules:
+                print(f"✅ 已恢复过滤规则 {len(filter_engine.rules)} 条")
+            for rule, saved in zip(filter_engine.rules, rules or []):
+                if rule.get('enabled') is False and saved.get('enabled') is not False:
+                    print(f"🚫 过滤规则 {rule['name']} 已停用: {rule['disabled_reason']}")
+                    needs_save = True
+        except ValueError as e:
+            print(f"❌ 过滤规则错误，已忽略: {e}")
 
         # 恢复直播间列表
         for room_info in config.get('rooms', []):
             room_id = room_info['room_id']
+            # 固定 unique_id，重启后可以直接复用缓存的签名
+            if not room_info.get('unique_id'):
+                room_info['unique_id'] = generate_ms_token(12)
+                needs_save = True
             rooms[room_id] = {
                 'info': room_info,
                 'receiver': None,
@@ -87,6 +145,13 @@ def load_config():
 
         print(f"✅ 配置加载完成，共 {len(rooms)} 个直播间")
 
+        # 旧配置没有 unique_id 或还是单个 filter 字符串，补上后立即保存
+        if needs_save:
+            save_config()
+
+        # 后台预热签名，启动全部时直接命中缓存
+        threading.Thread(target=presign_rooms, args=(list(rooms.keys()),), daemon=True).start()
+
     except Exception as e:
         print(f"❌ 加载配置失败: {e}")
         import traceback
@@ -97,57 +162,174 @@ class MultiRoomDanmakuReceiver(DouyinDanmaku):
     """多直播间弹幕接收器"""
 
     def __init__(self, room_id, room_info, cookie=None):
-        super().__init__(room_id, cookie)
+        super().__init__(room_id, cookie, unique_id=room_info.get('unique_id'),
+                         subscriptions=room_info.get('subscriptions') or SUBSCRIPTIONS)
         self.room_info = room_info
         self.web_rid = room_info.get('web_rid', room_id)
         self.title = room_info.get('title', '未知')
         # owner 现在是字符串，不是字典
         self.owner = room_info.get('owner', '未知')
+        # 本直播间所有弹幕共用的描述
+        self.room = get_room_descriptor(room_id, self.web_rid, self.title, self.owner)
+
+    def set_title(self, title):
+        """直播间改了标题：之后的弹幕使用新的描述（已在缓冲区中的弹幕保留原标题）"""
+        self.title = title
+        self.room = get_room_descriptor(self.room_id, self.web_rid, title, self.owner)
 
     def handle_chat_message(self, payload):
         """处理聊天消息 - 重写以发送到 Web"""
-        from douyin_pb2 import ChatMessage
-        chat_msg = ChatMessage()
-        chat_msg.ParseFromString(payload)
-
-        message = chat_msg.content
-        username = chat_msg.user.nickName
-        # 使用北京时间
-        timestamp = datetime.now(BEIJING_TZ).strftime('%H:%M:%S')
-
-        # 应用正则表达式过滤
-        if current_filter:
-            try:
-                if not re.search(current_filter, message):
-                    # 不匹配，跳过（可选：打印调试信息）
-                    # print(f"[过滤] [{self.title}] {message}")
-                    return
-            except re.error:
-                pass  # 正则表达式错误，不过滤
-
-        # 构建弹幕数据
-        danmaku_data = {
-            'message': message,
-            'username': username,
-            'timestamp': timestamp,
-            'room_id': self.room_id,
-            'web_rid': self.web_rid,
-            'room_title': self.title,
-            'room_owner': self.owner
-        }
+        chat = parse_chat(payload)
+        self.emit_chat(chat.nickname, chat.content)
+
+    def handle_event(self, event):
+        """处理多进程解码得到的事件"""
+        if event.method == "WebcastChatMessage":
+            self.emit_chat(event.user, event.content)
+        else:
+            super().handle_event(event)
+
+    def emit_chat(self, username, message):
+        """过滤后把弹幕写入缓冲区并推送到 Web"""
+        # 应用过滤规则（全局规则 + 本直播间的规则）
+        if not filter_engine.allows(message, self.room_id):
+            return
+
+        # 缓冲区只保存紧凑的事件，全局和房间缓冲区共用同一个对象
+        event = DanmakuEvent(message, username, time.time(), self.room)
 
         # 添加到全局缓冲区
-        global_buffer.append(danmaku_data)
+        global_buffer.append(event)
 
         # 添加到房间缓冲区
         if self.room_id in rooms:
-            rooms[self.room_id]['buffer'].append(danmaku_data)
+            rooms[self.room_id]['buffer'].append(event)
 
-        # 发送到所有连接的客户端
+        # 发送到所有连接的客户端（使用北京时间）
+        danmaku_data = event.to_dict(BEIJING_TZ)
         socketio.emit('new_danmaku', danmaku_data, namespace='/')
 
         # 控制台输出
-        print(f"[{timestamp}] [{self.title}] {message}")
+        print(f"[{danmaku_data['timestamp']}] [{self.title}] {message}")
+
+    def on_gift_streak(self, streak):
+        """礼物连击结束：每次连击向 Web 推送一个事件"""
+        gift_data = streak.to_dict()
+        gift_data.update({
+            'timestamp': datetime.now(BEIJING_TZ).strftime('%H:%M:%S'),
+            'room_id': self.room_id,
+            'web_rid': self.web_rid,
+            'room_title': self.title,
+            'room_owner': self.owner
+        })
+        socketio.emit('gift_streak', gift_data, namespace='/')
+        print(f"[{gift_data['timestamp']}] [{self.title}] 🎁 {streak.user} 送出 "
+              f"{streak.gift_name or streak.gift_id} x{streak.count}")
+
+    def on_like_window(self, window):
+        """点赞窗口结束：每个窗口向 Web 推送一个汇总事件（不打印，避免刷屏）"""
+        like_data = dict(window, room_id=self.room_id, web_rid=self.web_rid,
+                         room_title=self.title, room_owner=self.owner)
+        socketio.emit('like_window', like_data, namespace='/')
+
+
+class AsyncMultiRoomDanmakuReceiver(MultiRoomDanmakuReceiver, AsyncDouyinDanmaku):
+    """多直播间弹幕接收器（asyncio 版）"""
+
+
+def start_receiver(room_id):
+    """在后台启动直播间的弹幕接收，已在运行时返回 False"""
+    room_data = rooms[room_id]
+    if room_data['is_running']:
+        return False
+
+    # 创建弹幕接收器
+    receiver_class = AsyncMultiRoomDanmakuReceiver if DANMAKU_ENGINE == 'async' else MultiRoomDanmakuReceiver
+    receiver = receiver_class(room_id, room_data['info'])
+    room_data['receiver'] = receiver
+    room_data['is_running'] = True
+
+    def finished():
+        # 期间可能已被停止并重新启动，只在仍是当前接收器时更新状态
+        if room_data['receiver'] in (receiver, None):
+            room_data['is_running'] = False
+
+    if DANMAKU_ENGINE == 'async':
+        def on_done(future):
+            if not future.cancelled() and future.exception():
+                print(f"直播间 {room_id} 弹幕接收错误: {future.exception()}")
+            finished()
+
+        get_room_host().submit(receiver).add_done_callback(on_done)
+        room_data['thread'] = None
+        return True
+
+    def run_receiver():
+        try:
+            receiver.connect()
+        except Exception as e:
+            print(f"直播间 {room_id} 弹幕接收错误: {e}")
+        finally:
+            finished()
+
+    thread = threading.Thread(target=run_receiver, daemon=True)
+    thread.start()
+    room_data['thread'] = thread
+    return True
+
+
+def stop_receiver(room_id):
+    """停止直播间的弹幕接收"""
+    room_data = rooms[room_id]
+    if room_data['receiver']:
+        room_data['receiver'].close()
+        room_data['receiver'] = None
+    room_data['is_running'] = False
+
+
+def on_room_live(room_id):
+    """轮询发现直播间开播：自动启动弹幕接收"""
+    if room_id in rooms:
+        start_receiver(room_id)
+
+
+def on_room_offline(room_id):
+    """轮询发现直播间下播：停止弹幕接收，释放连接和心跳线程"""
+    if room_id in rooms and rooms[room_id]['is_running']:
+        stop_receiver(room_id)
+
+
+def on_room_status_change(room_id, status):
+    """直播状态变化时更新标题并推送到前端"""
+    room_data = rooms.get(room_id)
+    if room_data is None:
+        return
+    if status['title']:
+        room_data['info']['title'] = status['title']
+        receiver = room_data['receiver']
+        if receiver is not None and receiver.title != status['title']:
+            receiver.set_title(status['title'])
+    socketio.emit('room_status', {
+        'room_id': room_id,
+        'web_rid': room_data['info']['web_rid'],
+        'live': status['live'],
+        'is_running': room_data['is_running'],
+        'changed_at': status['changed_at']
+    }, namespace='/')
+
+
+status_poller = LiveStatusPoller(
+    lambda: {room_id: room_data['info']['web_rid'] for room_id, room_data in list(rooms.items())},
+    on_room_live, on_room_offline, on_room_status_change)
+
+
+def on_filter_rules_disabled(names):
+    """过滤规则执行超时被自动停用：保存配置并通知前端"""
+    save_config()
+    socketio.emit('filter_rules_disabled', {'names': names, 'rules': filter_engine.rules}, namespace='/')
+
+
+filter_engine.on_disable = on_filter_rules_disabled
 
 
 @app.route('/')
@@ -161,17 +343,82 @@ def get_rooms():
     """获取所有直播间列表"""
     room_list = []
     for room_id, room_data in rooms.items():
+        # 直播状态来自轮询器，未开启轮询或还没查询过时为 None
+        live_status = status_poller.get_status(room_id) or {}
+        receiver = room_data['receiver']
         room_list.append({
             'room_id': room_id,
             'web_rid': room_data['info']['web_rid'],
             'title': room_data['info']['title'],
             'owner': room_data['info']['owner'],
             'is_running': room_data['is_running'],
-            'danmaku_count': len(room_data['buffer'])
+            'danmaku_count': len(room_data['buffer']),
+            # 流水线模式下的队列深度、丢弃数等
+            'queue': receiver.message_queue.stats() if receiver and receiver.message_queue else None,
+            'subscriptions': receiver.subscriptions if receiver else None,
+            'method_counts': dict(receiver.method_counts) if receiver else {},
+            'gift_streaks': receiver.gift_streaks.stats() if receiver else None,
+            'likes': receiver.like_windows.stats() if receiver else None,
+            'dedup': receiver.dedup.stats() if receiver and receiver.dedup else None,
+            'live': live_status.get('live'),
+            'status_checked_at': live_status.get('checked_at'),
+            'status_changed_at': live_status.get('changed_at')
         })
     return jsonify({'rooms': room_list})
 
 
+def register_room(web_rid, room_info):
+    """把 get_real_room_id 的结果登记为监控直播间，已存在或信息不完整时抛出 ValueError"""
+    room_id = room_info.get('room_id')
+    if not room_id:
+        raise ValueError('无法获取 room_id')
+
+    # 检查是否已存在
+    if room_id in rooms:
+        raise ValueError('该直播间已在监控中')
+
+    # 获取主播名称（兼容多种数据格式）
+    owner_info = room_info.get('owner', {})
+    if isinstance(owner_info, dict):
+        owner_name = owner_info.get('nickname', 'Unknown')
+    elif isinstance(owner_info, str):
+        owner_name = owner_info
+    else:
+        owner_name = 'Unknown'
+
+    # 获取标题
+    title = room_info.get('title', '未知直播间')
+
+    # 创建房间数据
+    rooms[room_id] = {
+        'info': {
+            'room_id': room_id,
+            'web_rid': web_rid,
+            'title': title,
+            'owner': owner_name,
+            'unique_id': generate_ms_token(12)
+        },
+        'receiver': None,
+        'thread': None,
+        'is_running': False,
+        'buffer': deque(maxlen=100)
+    }
+
+    print(f"✅ 添加成功: {title} - {owner_name}")
+
+    # 开启了轮询时尽快查询新直播间的状态
+    if status_poller.running:
+        status_poller.poll_now()
+
+    return {
+        'success': True,
+        'room_id': room_id,
+        'web_rid': web_rid,
+        'title': title,
+        'owner': owner_name
+    }
+
+
 @app.route('/api/add_room', methods=['POST'])
 def add_room():
     """添加一个直播间"""
@@ -184,57 +431,21 @@ def add_room():
     try:
         # 获取真实 room_id
         print(f"正在获取房间信息: {web_rid}")
-        room_info = get_real_room_id(web_rid)
+        # 添加直播间只需要 room_id 和主播，缓存的稳定字段有效即可
+        room_info = get_real_room_id(web_rid, need_status=False)
 
         if not room_info:
             return jsonify({'error': '无法获取房间信息'}), 400
 
-        room_id = room_info.get('room_id')
-        if not room_id:
-            return jsonify({'error': '无法获取 room_id'}), 400
-
-        # 检查是否已存在
-        if room_id in rooms:
-            return jsonify({'error': '该直播间已在监控中'}), 400
-
-        # 获取主播名称（兼容多种数据格式）
-        owner_info = room_info.get('owner', {})
-        if isinstance(owner_info, dict):
-            owner_name = owner_info.get('nickname', 'Unknown')
-        elif isinstance(owner_info, str):
-            owner_name = owner_info
-        else:
-            owner_name = 'Unknown'
-
-        # 获取标题
-        title = room_info.get('title', '未知直播间')
-
-        # 创建房间数据
-        rooms[room_id] = {
-            'info': {
-                'room_id': room_id,
-                'web_rid': web_rid,
-                'title': title,
-                'owner': owner_name
-            },
-            'receiver': None,
-            'thread': None,
-            'is_running': False,
-            'buffer': deque(maxlen=100)
-        }
-
-        print(f"✅ 添加成功: {title} - {owner_name}")
+        try:
+            result = register_room(web_rid, room_info)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         # 保存配置
         save_config()
 
-        return jsonify({
-            'success': True,
-            'room_id': room_id,
-            'web_rid': web_rid,
-            'title': title,
-            'owner': owner_name
-        })
+        return jsonify(result)
 
     except Exception as e:
         print(f"❌ 添加失败: {str(e)}")
@@ -243,6 +454,66 @@ def add_room():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/add_rooms', methods=['POST'])
+def add_rooms():
+    """
+    批量添加直播间
+
+    并发解析（数量由 concurrency 或 DOUYIN_RESOLVE_CONCURRENCY 控制，并对
+    live.douyin.com 限速），以 NDJSON 流式返回：每解析完一个直播间输出一行，
+    最后一行是汇总。进度同时通过 socket 事件 add_rooms_progress 推送。
+    """
+    data = request.json or {}
+    web_rids = [str(web_rid).strip() for web_rid in data.get('web_rids', []) if str(web_rid).strip()]
+    concurrency = data.get('concurrency')
+
+    if not web_rids:
+        return jsonify({'error': '请提供 web_rids'}), 400
+    # 开始流式返回后再出错只能截断响应，参数在这里校验
+    if concurrency is not None:
+        try:
+            if isinstance(concurrency, bool) or isinstance(concurrency, float) and not concurrency.is_integer():
+                raise ValueError(concurrency)
+            concurrency = int(concurrency)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'concurrency 必须是正整数'}), 400
+        if concurrency <= 0:
+            return jsonify({'error': 'concurrency 必须是正整数'}), 400
+        concurrency = min(concurrency, MAX_RESOLVE_CONCURRENCY)
+
+    def generate():
+        added = skipped = failed = 0
+        total = len(set(web_rids))
+        results = resolve_many(web_rids, concurrency)
+
+        try:
+            for done, (web_rid, room_info, error) in enumerate(results, 1):
+                if room_info:
+                    try:
+                        result = register_room(web_rid, room_info)
+                        added += 1
+                    except ValueError as e:
+                        result = {'web_rid': web_rid, 'room_id': room_info.get('room_id'), 'error': str(e)}
+                        skipped += 1
+                else:
+                    result = {'web_rid': web_rid, 'error': error}
+                    failed += 1
+
+                result['progress'] = {'done': done, 'total': total}
+                socketio.emit('add_rooms_progress', result, namespace='/')
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+        finally:
+            # 客户端中途断开（GeneratorExit）时也保存已添加的直播间，并取消尚未开始的解析
+            results.close()
+            if added:
+                save_config()
+
+        summary = {'done': True, 'added': added, 'skipped': skipped, 'failed': failed}
+        yield json.dumps(summary, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route('/api/start_room/<room_id>', methods=['POST'])
 def start_room(room_id):
     """启动指定直播间的弹幕接收"""
@@ -255,24 +526,7 @@ def start_room(room_id):
         return jsonify({'error': '该直播间已在运行中'}), 400
 
     try:
-        # 创建弹幕接收器
-        receiver = MultiRoomDanmakuReceiver(room_id, room_data['info'])
-        room_data['receiver'] = receiver
-
-        # 在后台线程中运行
-        def run_receiver():
-            room_data['is_running'] = True
-            try:
-                receiver.connect()
-            except Exception as e:
-                print(f"直播间 {room_id} 弹幕接收错误: {e}")
-            finally:
-                room_data['is_running'] = False
-
-        thread = threading.Thread(target=run_receiver, daemon=True)
-        thread.start()
-        room_data['thread'] = thread
-
+        start_receiver(room_id)
         return jsonify({'success': True})
 
     except Exception as e:
@@ -285,13 +539,7 @@ def stop_room(room_id):
     if room_id not in rooms:
         return jsonify({'error': '直播间不存在'}), 404
 
-    room_data = rooms[room_id]
-
-    if room_data['receiver']:
-        room_data['receiver'].close()
-        room_data['receiver'] = None
-
-    room_data['is_running'] = False
+    stop_receiver(room_id)
 
     return jsonify({'success': True})
 
@@ -303,12 +551,11 @@ def remove_room(room_id):
         return jsonify({'error': '直播间不存在'}), 404
 
     # 先停止
-    room_data = rooms[room_id]
-    if room_data['receiver']:
-        room_data['receiver'].close()
+    stop_receiver(room_id)
 
     # 删除
     del rooms[room_id]
+    status_poller.forget(room_id)
 
     # 保存配置
     save_config()
@@ -322,30 +569,12 @@ def start_all():
     started = []
     errors = []
 
+    # 先批量签名，各房间连接时直接命中签名缓存
+    presign_rooms([room_id for room_id, room_data in rooms.items() if not room_data['is_running']])
+
     for room_id in list(rooms.keys()):
         try:
-            if not rooms[room_id]['is_running']:
-                # 直接调用启动逻辑，而不是调用 start_room 函数
-                room_data = rooms[room_id]
-
-                # 创建弹幕接收器
-                receiver = MultiRoomDanmakuReceiver(room_id, room_data['info'])
-                room_data['receiver'] = receiver
-
-                # 在后台线程中运行
-                def run_receiver(rid=room_id):
-                    rooms[rid]['is_running'] = True
-                    try:
-                        receiver.connect()
-                    except Exception as e:
-                        print(f"直播间 {rid} 弹幕接收错误: {e}")
-                    finally:
-                        rooms[rid]['is_running'] = False
-
-                thread = threading.Thread(target=run_receiver, daemon=True)
-                thread.start()
-                room_data['thread'] = thread
-
+            if start_receiver(room_id):
                 started.append(room_id)
         except Exception as e:
             errors.append({'room_id': room_id, 'error': str(e)})
@@ -360,45 +589,36 @@ def start_all():
 @app.route('/api/stop_all', methods=['POST'])
 def stop_all():
     """停止所有直播间"""
-    for room_id, room_data in rooms.items():
-        if room_data['receiver']:
-            room_data['receiver'].close()
-            room_data['receiver'] = None
-        room_data['is_running'] = False
+    for room_id in list(rooms.keys()):
+        stop_receiver(room_id)
 
     return jsonify({'success': True})
 
 
-@app.route('/api/filter', methods=['POST'])
+@app.route('/api/filter', methods=['GET', 'POST'])
 def set_filter():
-    """设置正则表达式过滤器"""
-    global current_filter
-
-    data = request.json
-    filter_pattern = data.get('pattern', '')
-
-    if filter_pattern:
-        try:
-            # 验证正则表达式
-            re.compile(filter_pattern)
-            current_filter = filter_pattern
-            print(f"✅ 过滤器已设置: {filter_pattern}")
-
-            # 保存配置
-            save_config()
+    """查询或设置过滤规则：rules 替换全部规则；pattern 只设置（为空时清除）全局正则过滤器这一条规则"""
+    if request.method == 'GET':
+        return jsonify({'rules': filter_engine.rules, 'pattern': filter_engine.legacy_pattern(),
+                        'stats': filter_engine.stats()})
 
-            return jsonify({'success': True, 'pattern': filter_pattern})
-        except re.error as e:
-            print(f"❌ 正则表达式错误: {str(e)}")
-            return jsonify({'error': f'正则表达式错误: {str(e)}'}), 400
-    else:
-        current_filter = None
-        print("✅ 过滤器已清除")
+    data = request.json or {}
+    try:
+        if 'rules' in data:
+            rules = filter_engine.set_rules(data['rules'])
+            print(f"✅ 过滤规则已设置: {len(rules)} 条")
+        else:
+            filter_pattern = data.get('pattern', '')
+            rules = filter_engine.set_legacy_pattern(filter_pattern)
+            print(f"✅ 过滤器已设置: {filter_pattern}" if filter_pattern else "✅ 过滤器已清除")
+    except ValueError as e:
+        print(f"❌ 过滤规则错误: {str(e)}")
+        return jsonify({'error': str(e)}), 400
 
-        # 保存配置
-        save_config()
+    # 保存配置
+    save_config()
 
-        return jsonify({'success': True, 'pattern': None})
+    return jsonify({'success': True, 'pattern': filter_engine.legacy_pattern(), 'rules': rules})
 
 
 @app.route('/api/history', methods=['GET'])
@@ -414,7 +634,7 @@ def get_history():
         # 获取全局历史
         history = list(global_buffer)[-count:]
 
-    return jsonify({'danmaku': history})
+    return jsonify({'danmaku': [event.to_dict(BEIJING_TZ) for event in history]})
 
 
 @app.route('/api/status', methods=['GET'])
@@ -425,36 +645,50 @@ def get_status():
     return jsonify({
         'total_rooms': len(rooms),
         'running_rooms': running_count,
-        'filter': current_filter,
-        'global_buffer_size': len(global_buffer)
+        'filter': filter_engine.legacy_pattern(),
+        'filter_rules': filter_engine.stats(),
+        'global_buffer_size': len(global_buffer),
+        'signature_cache': get_signature_cache().stats(),
+        'room_cache': get_room_cache().stats(),
+        'poller': status_poller.stats(),
+        'heartbeat': get_heartbeat_scheduler(HEARTBEAT_INTERVAL).stats(),
+        'pipeline': dict(get_pipeline_dispatcher().stats(), enabled=PIPELINE),
+        'decode_pool': get_decode_pool().stats() if get_decode_pool() else None,
+        'flush_timer': get_flush_timer().stats(),
+        'engine': DANMAKU_ENGINE,
+        'threads': threading.active_count()
     })
 
 
+@app.route('/api/poller', methods=['GET', 'POST'])
+def poller_control():
+    """查询或开关直播状态轮询，POST {"enabled": true/false}"""
+    if request.method == 'POST':
+        data = request.json or {}
+        if data.get('enabled'):
+            status_poller.start()
+        else:
+            status_poller.stop()
+
+    return jsonify(status_poller.stats())
+
+
 @app.route('/api/export', methods=['GET'])
 def export_config():
     """导出配置"""
     config = {
-        'filter': current_filter,
-        'rooms': []
+        'filter': filter_engine.legacy_pattern(),
+        'filter_rules': filter_engine.rules,
+        # 带上 unique_id（导入后继续命中签名缓存）和单个直播间的消息订阅
+        'rooms': [room_config(room_id, room_data) for room_id, room_data in rooms.items()]
     }
 
-    # 导出直播间信息
-    for room_id, room_data in rooms.items():
-        config['rooms'].append({
-            'room_id': room_id,
-            'web_rid': room_data['info']['web_rid'],
-            'title': room_data['info']['title'],
-            'owner': room_data['info']['owner']
-        })
-
     return jsonify(config)
 
 
 @app.route('/api/import', methods=['POST'])
 def import_config():
     """导入配置"""
-    global current_filter
-
     try:
         data = request.json
 
@@ -465,18 +699,17 @@ def import_config():
         skipped_count = 0
         errors = []
 
-        # 导入过滤器
-        if 'filter' in data:
-            filter_pattern = data['filter']
-            if filter_pattern:
-                try:
-                    re.compile(filter_pattern)
-                    current_filter = filter_pattern
-                    print(f"✅ 已导入过滤器: {filter_pattern}")
-                except re.error as e:
-                    errors.append(f"过滤器错误: {str(e)}")
-            else:
-                current_filter = None
+        # 导入过滤规则，只有旧格式 filter 字符串时迁移为一条全局规则
+        try:
+            if 'filter_rules' in data:
+                filter_engine.set_rules(data['filter_rules'])
+                print(f"✅ 已导入过滤规则 {len(filter_engine.rules)} 条")
+            elif 'filter' in data:
+                filter_engine.set_legacy_pattern(data['filter'])
+                if data['filter']:
+                    print(f"✅ 已导入过滤器: {data['filter']}")
+        except ValueError as e:
+            errors.append(f"过滤器错误: {str(e)}")
 
         # 导入直播间
         for room_info in data.get('rooms', []):
@@ -495,13 +728,17 @@ def import_config():
                 continue
 
             # 添加直播间
+            info = {
+                'room_id': room_id,
+                'web_rid': web_rid,
+                'title': title,
+                'owner': owner,
+                'unique_id': room_info.get('unique_id') or generate_ms_token(12)
+            }
+            if room_info.get('subscriptions'):
+                info['subscriptions'] = room_info['subscriptions']
             rooms[room_id] = {
-                'info': {
-                    'room_id': room_id,
-                    'web_rid': web_rid,
-                    'title': title,
-                    'owner': owner
-                },
+                'info': info,
                 'receiver': None,
                 'thread': None,
                 'is_running': False,
@@ -532,7 +769,7 @@ def handle_connect():
     """客户端连接"""
     # 发送最近20条弹幕
     history = list(global_buffer)[-20:]
-    emit('history', {'danmaku': history})
+    emit('history', {'danmaku': [event.to_dict(BEIJING_TZ) for event in history]})
     # 发送房间列表
     emit('rooms_update', {'rooms': [
         {
@@ -560,6 +797,9 @@ if __name__ == '__main__':
     # 加载配置
     load_config()
 
+    if AUTO_POLL:
+        status_poller.start()
+
     # 从环境变量获取端口（Railway/Render 等平台需要）
     port = int(os.environ.get('PORT', 8080))
 